@@ -1,28 +1,39 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, request, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
-from pymongo import MongoClient
 from dotenv import load_dotenv
 import os
 from bson import ObjectId
-import subprocess
 import json
 from werkzeug.utils import secure_filename
 from upload import process_pdf
-from pinecone_utils import chat_person, advanced_resume_search
+import ingest
+import database
+import pagination
+import search
+import stats
+import chat_sessions
+import score_cache
+import rescore
+import llm
+import call_sessions
+import campaigns
+import openings
+from lazy import lazy
+import warmup
+from uid_allocator import allocator
+from pinecone_utils import chat_person, advanced_resume_search, stream_resume_search
 
 # Load environment variables
 load_dotenv()
 
+# Background work this process starts on its own
+WARM_UP_ON_START = warmup.WARM_UP_ON_START
+# Run the call campaign scheduler inside this process (or run `python campaigns.py run` separately)
+CAMPAIGN_SCHEDULER_ENABLED = os.getenv("CAMPAIGN_SCHEDULER_ENABLED", "false").lower() == "true"
+
 app = Flask(__name__)
 CORS(app)
 
-# MongoDB connection
-client = MongoClient(os.getenv('DATABASE_URL'))
-db = client[os.getenv('DATABASE_NAME')]
-resumes_collection = db.data
-jobs_collection = db.job_information
-
-# Initialize default job if not present
 default_job = {
     "job_title": "Software Engineer I",
     "job_description": """
@@ -60,15 +71,167 @@ Submit your **resume**, **cover letter**, and **portfolio** at [careers.coca-col
 """
 }
 
-if jobs_collection.count_documents({}) == 0:
-    jobs_collection.insert_one(default_job)
+
+def bootstrap():
+    """One-time database setup, deferred until the first request so startup needs no network."""
+    database.ensure_indexes()
+    # Initialize default job if not present
+    jobs_collection = database.get_jobs_collection()
+    if jobs_collection.count_documents({}) == 0:
+        jobs_collection.insert_one(dict(default_job))
+    # Scores stored on resumes before multi-job support become the default job's entries
+    openings.migrate_if_needed()
+    if CAMPAIGN_SCHEDULER_ENABLED:
+        campaigns.start_scheduler()
+    return True
+
+
+ensure_bootstrapped = lazy(bootstrap)
+
+
+@app.before_request
+def bootstrap_once():
+    try:
+        ensure_bootstrapped()
+    except Exception as e:
+        print(f"Database bootstrap failed, will retry: {e}")
+
+
+if WARM_UP_ON_START:
+    warmup.start_background_warm_up()
+
+
+def requested_job_id():
+    """The `job_id` query parameter, validated; None means no job scope."""
+    job_id = request.args.get('job_id')
+    if job_id:
+        openings.get_job(job_id)
+    return job_id or None
+
+
+def requested_query():
+    """The JSON body and its non-empty `query`; query is None when missing."""
+    data = request.get_json(silent=True) or {}
+    query = data.get('query')
+    if not isinstance(query, str) or not query.strip():
+        return data, None
+    return data, query
+
+
+def join_resumes(entries, job_id):
+    """Replace a page of candidate_scores entries with their resumes, keeping order and per-job fields."""
+    uids = [entry['UID'] for entry in entries]
+    found = {resume['UID']: resume for resume in database.get_resumes_collection().find({'UID': {'$in': uids}})}
+    scores = {entry['UID']: entry for entry in entries}
+    missing = [uid for uid in uids if uid not in found]
+    if missing:
+        print(f"Score entries without a resume (deleted?): {missing}")
+    return openings.merge_scores([found[uid] for uid in uids if uid in found], scores, job_id)
+
+
+def list_resumes(filter_query, job_id=None):
+    """Page through resumes matching `filter_query`.
+
+    Uses keyset pagination (`cursor`, `direction`, `sort`) by default. `page` jumps
+    straight to a numbered page with a skip (capped at pagination.MAX_SKIP) and
+    returns a `next_cursor` to continue from. Totals are cached and can be skipped
+    entirely with `include_total=false`.
+
+    With a `job_id` the filters apply to that job's candidate_scores entries, so the
+    query only ever touches candidates who applied to it.
+    """
+    per_page = int(request.args.get('per_page', 5))
+    sort_name = request.args.get('sort', pagination.DEFAULT_SORT)
+    cursor = request.args.get('cursor')
+    direction = request.args.get('direction', 'next')
+    page = request.args.get('page')
+    include_total = request.args.get('include_total', 'true').lower() != 'false'
+    if job_id:
+        collection = database.get_candidate_scores_collection()
+        filter_query = dict(filter_query, job_id=job_id)
+    else:
+        collection = database.get_resumes_collection()
+
+    response = {'per_page': per_page, 'sort': sort_name}
+
+    if page and not cursor:
+        page = int(page)
+        resumes, next_cursor = pagination.skip_page(collection, filter_query, sort_name, page, per_page)
+        response['page'] = page
+        prev_cursor = None
+    else:
+        resumes, next_cursor, prev_cursor = pagination.paginate(
+            collection, filter_query, sort_name, cursor, direction, per_page
+        )
+
+    if job_id:
+        resumes = join_resumes(resumes, job_id)
+    for resume in resumes:
+        resume['_id'] = str(resume['_id'])
+
+    response.update({
+        'resumes': resumes,
+        'next_cursor': next_cursor,
+        'prev_cursor': prev_cursor
+    })
+    if include_total:
+        total_resumes = pagination.cached_total(collection, filter_query)
+        response['total'] = total_resumes
+        response['total_pages'] = (total_resumes + per_page - 1) // per_page
+    return jsonify(response)
+
+
+def list_search_results(search_query, filter_query, job_id=None):
+    """Keyword search over name, education, skills and notes, ranked by relevance.
+
+    Every match is ranked before the page is cut, so pages are plain offsets and
+    `total` counts all matches. With a `job_id` the filters are checked against
+    that job's scores instead, and only its applicants are searched.
+    """
+    page = int(request.args.get('page', 1))
+    per_page = int(request.args.get('per_page', 5))
+    skip = (page - 1) * per_page
+
+    if job_id:
+        scope = dict(filter_query, job_id=job_id)
+        applicants = [entry['UID'] for entry in database.get_candidate_scores_collection().find(scope, {'UID': 1})]
+        filter_query = {'UID': {'$in': applicants}}
+    ranked, total = search.search_resumes(database.get_resumes_collection(), search_query, filter_query, limit=skip + per_page)
+    resumes = ranked[skip:]
+    if job_id:
+        resumes = openings.merge_scores(resumes, openings.load_scores(job_id, [resume['UID'] for resume in resumes]), job_id)
+    for resume in resumes:
+        resume['_id'] = str(resume['_id'])
+
+    return jsonify({
+        'resumes': resumes,
+        'total': total,
+        'page': page,
+        'per_page': per_page,
+        'total_pages': (total + per_page - 1) // per_page,
+        'sort': 'relevance'
+    })
+
+
+@app.route('/api/resumes/suggest', methods=['GET'])
+def suggest_resumes():
+    """Typeahead suggestions for the dashboard search box."""
+    try:
+        query = request.args.get('q', '')
+        limit = int(request.args.get('limit', 8))
+        projection = {'_id': 1, 'UID': 1, 'name': 1, 'education': 1, 'technical_skills': 1, 'notes': 1}
+        matches, _ = search.search_resumes(database.get_resumes_collection(), query, limit=limit, projection=projection)
+        return jsonify({'suggestions': [
+            {'_id': str(match['_id']), 'UID': match.get('UID'), 'name': match.get('name'), 'score': match['search_score']}
+            for match in matches
+        ]})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/resumes', methods=['GET'])
 def get_resumes():
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 5))
         search_query = request.args.get('search', '').strip()
         status = request.args.get('status')
         min_score = request.args.get('min_score')
@@ -76,8 +239,6 @@ def get_resumes():
         phone_screen = request.args.get('phone_screen')
 
         filter_query = {}
-        if search_query:
-            filter_query['name'] = {'$regex': search_query, '$options': 'i'}
         if status:
             filter_query['status'] = status
         if min_score:
@@ -87,20 +248,14 @@ def get_resumes():
         if phone_screen:
             filter_query['phone_screen'] = phone_screen
 
-        skip = (page - 1) * per_page
-        total_resumes = resumes_collection.count_documents(filter_query)
-        resumes = list(resumes_collection.find(filter_query).skip(skip).limit(per_page))
-
-        for resume in resumes:
-            resume['_id'] = str(resume['_id'])
-
-        return jsonify({
-            'resumes': resumes,
-            'total': total_resumes,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total_resumes + per_page - 1) // per_page
-        })
+        job_id = requested_job_id()
+        if search_query:
+            return list_search_results(search_query, filter_query, job_id)
+        return list_resumes(filter_query, job_id)
+    except pagination.InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -108,22 +263,11 @@ def get_resumes():
 @app.route('/api/resumes/<status>', methods=['GET'])
 def get_resumes_by_status(status):
     try:
-        page = int(request.args.get('page', 1))
-        per_page = int(request.args.get('per_page', 5))
-        skip = (page - 1) * per_page
-        total_resumes = resumes_collection.count_documents({'status': status})
-        resumes = list(resumes_collection.find({'status': status}).skip(skip).limit(per_page))
-
-        for resume in resumes:
-            resume['_id'] = str(resume['_id'])
-
-        return jsonify({
-            'resumes': resumes,
-            'total': total_resumes,
-            'page': page,
-            'per_page': per_page,
-            'total_pages': (total_resumes + per_page - 1) // per_page
-        })
+        return list_resumes({'status': status}, requested_job_id())
+    except pagination.InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -131,7 +275,7 @@ def get_resumes_by_status(status):
 @app.route('/api/resume/<id>', methods=['GET'])
 def get_resume(id):
     try:
-        resume = resumes_collection.find_one({'_id': ObjectId(id)})
+        resume = database.get_resumes_collection().find_one({'_id': ObjectId(id)})
         if resume:
             resume['_id'] = str(resume['_id'])
             return jsonify(resume)
@@ -148,14 +292,23 @@ def update_resume_status(id):
         if not new_status:
             return jsonify({'error': 'Status is required'}), 400
 
-        result = resumes_collection.update_one(
-            {'_id': ObjectId(id)},
-            {'$set': {'status': new_status}}
-        )
-
-        if result.modified_count:
+        resumes_collection = database.get_resumes_collection()
+        resume = resumes_collection.find_one({'_id': ObjectId(id)}, {'UID': 1})
+        if not resume:
+            return jsonify({'error': 'Resume not found'}), 404
+
+        # Status is per job; the default job's status is mirrored on the resume itself
+        default_job_id = openings.get_default_job_id()
+        job_id = data.get('job_id') or default_job_id
+        updated = openings.update_candidate(resume['UID'], {'status': new_status}, job_id)
+        if job_id == default_job_id:
+            resumes_collection.update_one({'_id': resume['_id']}, {'$set': {'status': new_status}})
+            updated = True
+
+        if updated:
+            stats.invalidate_resume_caches()
             return jsonify({'message': 'Status updated successfully'})
-        return jsonify({'error': 'Resume not found'}), 404
+        return jsonify({'error': 'Candidate has not applied to this job'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -174,28 +327,177 @@ def create_resume():
         data['status'] = data.get('status', 'new')
         data['phone_screen'] = data.get('phone_screen', 'not completed')
         data['notes'] = data.get('notes', '')
-
-        result = resumes_collection.insert_one(data)
-        created_resume = resumes_collection.find_one({'_id': result.inserted_id})
+        job_id = str(openings.get_job(data.pop('job_id', None))['_id'])
+        data['UID'] = allocator.allocate()
+        data['search_tokens'] = search.build_search_tokens(data)
+
+        result = database.get_resumes_collection().insert_one(data)
+        openings.upsert_scores(job_id, [(data, data, None)])
+        stats.invalidate_resume_caches()
+        created_resume = database.get_resumes_collection().find_one({'_id': result.inserted_id})
         created_resume['_id'] = str(created_resume['_id'])
 
         return jsonify(created_resume), 201
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs', methods=['GET'])
+def list_jobs():
+    try:
+        return jsonify({'jobs': openings.list_jobs()})
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """Open a new role; score_existing=true also scores every stored resume against it."""
+    try:
+        data = request.json
+        if not data.get('job_title') or not data.get('job_description'):
+            return jsonify({'error': 'job_title and job_description are required'}), 400
+
+        job_id = openings.create_job(data['job_title'], data['job_description'])
+        response = {'_id': job_id, 'message': 'Job created successfully'}
+        if data.get('score_existing'):
+            response['rescore_id'] = rescore.start_rescore(job_id, all_candidates=True)
+        return jsonify(response), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/api/job', methods=['GET'])
-def get_job():
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id=None):
+    """A job by id; /api/job is the default job."""
+    try:
+        return jsonify(openings.serialize_job(openings.get_job(job_id)))
+    except openings.JobNotFound:
+        return jsonify({'error': 'Job not found'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/job', methods=['PUT'])
+@app.route('/api/jobs/<job_id>', methods=['PUT'])
+def update_job(job_id=None):
+    """Edit a job and, unless rescore=false, re-score its candidates against it."""
     try:
-        job = jobs_collection.find_one()
-        if job:
-            job['_id'] = str(job['_id'])
-            return jsonify(job)
+        data = request.json
+        changes = {field: data[field] for field in ('job_title', 'job_description') if field in data}
+        if not changes:
+            return jsonify({'error': 'job_title or job_description is required'}), 400
+
+        job = openings.update_job(str(openings.get_job(job_id)['_id']), changes)
+
+        response = {'message': 'Job updated successfully'}
+        description_changed = changes.get('job_description', job.get('job_description')) != job.get('job_description')
+        if description_changed and data.get('rescore', True):
+            response['rescore_id'] = rescore.start_rescore(str(job['_id']))
+        return jsonify(response)
+    except openings.JobNotFound:
         return jsonify({'error': 'Job not found'}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/rescore/<rescore_id>', methods=['GET'])
+def get_rescore(rescore_id):
+    status = rescore.get_rescore_status(rescore_id)
+    if status is None:
+        return jsonify({'error': 'Re-score not found'}), 404
+    if status.get('last_id') is not None:
+        status['last_id'] = str(status['last_id'])
+    return jsonify(status)
+
+
+@app.route('/api/rescore/<rescore_id>/resume', methods=['POST'])
+def resume_rescore(rescore_id):
+    try:
+        if rescore.resume_rescore(rescore_id):
+            return jsonify({'message': 'Re-score resumed'}), 202
+        return jsonify({'error': 'Re-score not found or already finished'}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/calls/<call_sid>', methods=['GET'])
+def get_call(call_sid):
+    """A phone screen's status and transcript."""
+    try:
+        call = call_sessions.get_call(call_sid)
+        if call is None:
+            return jsonify({'error': 'Call not found'}), 404
+        return jsonify(call)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/campaigns', methods=['POST'])
+def create_campaign():
+    """Queue phone screens for every candidate matching the filter, e.g. {"status": "new", "min_score": 7}."""
+    try:
+        data = request.get_json(silent=True) or {}
+        if not data.get('name'):
+            return jsonify({'error': 'Campaign name is required'}), 400
+        campaign_id = campaigns.create_campaign(
+            data['name'],
+            job_id=data.get('job_id'),
+            criteria=data.get('filter'),
+            max_concurrent=data.get('max_concurrent'),
+            max_attempts=data.get('max_attempts'),
+            retry_delay_minutes=data.get('retry_delay_minutes'),
+            window=data.get('window')
+        )
+        return jsonify(campaigns.get_campaign(campaign_id)), 201
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except campaigns.CampaignError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/campaigns', methods=['GET'])
+def list_campaigns():
+    try:
+        return jsonify(campaigns.list_campaigns())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/campaigns/<campaign_id>', methods=['GET'])
+def get_campaign(campaign_id):
+    """A campaign's settings plus how many targets are in each state."""
+    try:
+        campaign = campaigns.get_campaign(campaign_id)
+        if campaign is None:
+            return jsonify({'error': 'Campaign not found'}), 404
+        return jsonify(campaign)
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/campaigns/<campaign_id>/<action>', methods=['POST'])
+def control_campaign(campaign_id, action):
+    actions = {
+        'pause': campaigns.pause_campaign,
+        'resume': campaigns.resume_campaign,
+        'cancel': campaigns.cancel_campaign
+    }
+    if action not in actions:
+        return jsonify({'error': f'Unknown action: {action}'}), 404
+    try:
+        if actions[action](campaign_id):
+            return jsonify(campaigns.get_campaign(campaign_id))
+        return jsonify({'error': f'Campaign not found or cannot {action} it in its current state'}), 409
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/api/resume/file/<filename>', methods=['GET'])
 def get_resume_file(filename):
     try:
@@ -208,37 +510,13 @@ def get_resume_file(filename):
 def prepare_call(id):
     """Prepare Carla to call this candidate."""
     try:
-        # Get candidate from MongoDB
-        candidate = resumes_collection.find_one({"UID": id})
-        if not candidate:
+        # Candidate details reach Carla through the call record created when dialing
+        if not database.get_resumes_collection().count_documents({"UID": id}, limit=1):
             return jsonify({'error': 'Candidate not found'}), 404
 
-        # Remove _id for JSON serialization
-        if '_id' in candidate:
-            del candidate['_id']
-
-        # Save candidate info so Carla can access it
-        with open('candidate.json', 'w') as f:
-            json.dump(candidate, f, indent=4)
-
-        print("Downloaded candidate info...")
-
-        # Start Carla agent if not already running
-        script_dir = os.path.dirname(os.path.abspath(__file__))
-        script_name = "call.py"
-
-        command = f'start cmd /k "cd /d "{script_dir}" && python "{script_name}"'
-
-        # Run Carla in new terminal window (Windows only)
-        try:
-            subprocess.run(['tasklist'], capture_output=True, text=True)
-            if 'python.exe' not in subprocess.check_output(['tasklist']).decode():
-                process = subprocess.Popen(command, shell=True)
-                print("Started Carla:", process.pid)
-            else:
-                print("Carla is already running")
-        except Exception as e:
-            return jsonify({'error': str(e)}), 500
+        # Start Carla's voice server unless it is already answering
+        if call_sessions.ensure_voice_server() == "running":
+            print("Carla is already running")
 
         return jsonify({'message': 'Call preparation done'})
 
@@ -255,7 +533,7 @@ def process_resume():
             os.makedirs('temp')
         temp_path = os.path.join('temp', secure_filename(pdf_file.filename))
         pdf_file.save(temp_path)
-        result = process_pdf(temp_path)
+        result = process_pdf(temp_path, request.form.get('job_id') or None)
         os.remove(temp_path)
         return str(result)
     except Exception as e:
@@ -264,52 +542,192 @@ def process_resume():
         return str(e), 400
 
 
+@app.route('/process-resumes', methods=['POST'])
+def process_resumes():
+    """Queue a batch of PDFs (or zip archives of PDFs) for background ingestion."""
+    try:
+        files = request.files.getlist('files') + request.files.getlist('file')
+        if not files:
+            return jsonify({'error': 'No files uploaded'}), 400
+
+        job_id = ingest.create_job(files, request.form.get('job_id') or None)
+        return jsonify(ingest.get_job_status(job_id)), 202
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/process-resumes/<job_id>', methods=['GET'])
+def process_resumes_status(job_id):
+    status = ingest.get_job_status(job_id)
+    if status is None:
+        return jsonify({'error': 'Ingestion job not found'}), 404
+    return jsonify(status)
+
+
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
+    """Dashboard counters, for one job's candidates when `job_id` is given."""
     try:
-        total_candidates = resumes_collection.count_documents({})
-        completed_screens = resumes_collection.count_documents({'phone_screen': 'completed'})
-        high_potential = resumes_collection.count_documents({'initial_score': {'$gte': 7}})
-        return jsonify({
-            'total_candidates': total_candidates,
-            'completed_screens': completed_screens,
-            'high_potential': high_potential
-        })
+        job_id = requested_job_id()
+        if job_id:
+            return jsonify(stats.get_stats(database.get_candidate_scores_collection(), {'job_id': job_id}, f"job:{job_id}"))
+        return jsonify(stats.get_stats(database.get_resumes_collection()))
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/scoring-cache/stats', methods=['GET'])
+def get_scoring_cache_stats():
+    try:
+        return jsonify(score_cache.get_metrics())
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+
+@app.route('/api/llm/stats', methods=['GET'])
+def get_llm_stats():
+    try:
+        return jsonify(llm.get_metrics())
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 
 @app.route('/search-person/<uid>', methods=['POST'])
 def process_query(uid):
+    """Ask about a candidate; pass the returned session_id back to continue the conversation."""
+    try:
+        data, query = requested_query()
+        if query is None:
+            return jsonify({"error": "Query is required"}), 400
+        result = chat_person(uid, query, data.get('session_id'))
+        if 'error' in result:
+            return jsonify({"error": result['error']}), 400
+        return jsonify({"response": str(result["chat_response"]), "session_id": result["session_id"]})
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+@app.route('/search-person/<uid>/sessions', methods=['POST'])
+def create_chat_session(uid):
     try:
-        query = request.json['query']
-        result = chat_person(uid, query)
-        result = result["chat_response"]
-        if isinstance(result, str):
-            return jsonify({"response": result})
-        return jsonify({"response": str(result)})
+        return jsonify({"session_id": chat_sessions.create_session(uid)}), 201
+    except chat_sessions.ChatError as e:
+        return jsonify({"error": str(e)}), 404
     except Exception as e:
         return jsonify({"error": str(e)}), 400
 
 
+@app.route('/search-person/<uid>/sessions/<session_id>', methods=['GET'])
+def get_chat_session(uid, session_id):
+    try:
+        session = chat_sessions.get_session(uid, session_id)
+        return jsonify({
+            "session_id": session["_id"],
+            "uid": session["uid"],
+            "summary": session.get("summary", ""),
+            "turns": session.get("turns", [])
+        })
+    except chat_sessions.ChatError as e:
+        return jsonify({"error": str(e)}), 404
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def sse_response(events):
+    """Stream (event, data) pairs to the client as server-sent events."""
+    def generate():
+        try:
+            for event, data in events:
+                yield sse_event(event, data)
+        except Exception as e:
+            yield sse_event('error', {'error': str(e)})
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
+
+def load_applicants(uids):
+    """Fetch candidates by UID in one query, keyed by UID, without Mongo-internal fields."""
+    uids = [int(uid) for uid in uids if uid]
+    applicants = {}
+    for applicant in database.get_resumes_collection().find({"UID": {"$in": uids}}, {'_id': 0, 'search_tokens': 0}):
+        applicants[applicant['UID']] = applicant
+    return applicants
+
+
+@app.route('/search-person/<uid>/stream', methods=['POST'])
+def stream_query(uid):
+    """Streaming variant of /search-person/<uid>: session, token..., done events."""
+    data, query = requested_query()
+    if query is None:
+        return jsonify({"error": "Query is required"}), 400
+    return sse_response(chat_sessions.stream_message(uid, query, data.get('session_id')))
+
+
+@app.route('/special-search/stream', methods=['POST'])
+def stream_special():
+    """Streaming variant of /special-search.
+
+    Sends the ranked candidates as soon as the vector search returns, then one
+    justification event per candidate as each one is generated.
+    """
+    _, query = requested_query()
+    if query is None:
+        return jsonify({"error": "Query is required"}), 400
+
+    def events():
+        for event, data in stream_resume_search(query):
+            if event == 'candidates':
+                found = load_applicants(match['uid'] for match in data)
+                applicants = []
+                for match in data:
+                    applicant = found.get(match['uid'])
+                    if applicant:
+                        applicant['relevance_score'] = match['relevance_score']
+                        applicants.append(applicant)
+                yield 'candidates', {'applicants': applicants}
+            else:
+                yield event, data
+        yield 'done', {}
+
+    return sse_response(events())
+
+
 @app.route('/special-search', methods=['POST'])
 def process_special():
     try:
-        query = request.json['query']
+        _, query = requested_query()
+        if query is None:
+            return jsonify({"error": "Query is required"}), 400
         search_result = advanced_resume_search(query)
         if 'error' in search_result:
             return jsonify({"error": search_result['error']}), 400
 
+        matches = search_result.get('candidates', [])
+        found = load_applicants(match.get('uid') for match in matches)
+
         applicants = {}
-        for match in search_result.get('candidates', []):
+        for match in matches:
             try:
                 uid = match.get('uid')
                 if not uid:
                     continue
 
-                applicant = resumes_collection.find_one({"UID": int(uid)})
+                applicant = found.get(int(uid))
                 if applicant:
-                    applicant = {k: v for k, v in applicant.items() if k != '_id'}
                     applicant['justification'] = match.get('justification', '')
                     applicant['relevance_score'] = match.get('relevance_score', 0)
                     applicants[str(uid)] = applicant
@@ -333,41 +751,24 @@ def home():
 def call_candidate(id):
     """Trigger outbound call to candidate using Carla (AI Recruiter)"""
     try:
-        # Load job description
-        with open('job.txt', 'r') as f:
-            job_description = f.read().strip()
-
         # Get candidate info
-        candidate = resumes_collection.find_one({"UID": id})
+        candidate = database.get_resumes_collection().find_one({"UID": id})
         if not candidate:
             return jsonify({'error': 'Candidate not found'}), 404
 
-        # Remove MongoDB-specific fields
-        if '_id' in candidate:
-            del candidate['_id']
-
-        # Save candidate for Carla
-        with open('candidate.json', 'w') as f:
-            json.dump(candidate, f, indent=4)
-
-        # Use Twilio to make outbound call
-        call = twilio_client.calls.create(
-            url=f'https://{os.getenv("CALL_SERVER_HOST")}/incoming-call',
-            to=candidate['phone'],
-            from_=twilio_number,
-            machine_detection='Enable'
-        )
+        # The call record keyed by call SID tells Carla who is on the line
+        data = request.get_json(silent=True) or {}
+        call_sid = call_sessions.start_call(candidate, data.get('job_id'))
 
         print(f"📞 Calling {candidate['name']} at {candidate['phone']}...")
 
-        # Set Carla state globally
-        call_state["candidate_uid"] = id
-
         return jsonify({
             "message": "Call initiated successfully",
-            "call_sid": call.sid
+            "call_sid": call_sid
         })
 
+    except openings.JobNotFound as e:
+        return jsonify({'error': str(e)}), 404
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -0,0 +1,61 @@
+import argparse
+import glob
+import os
+import time
+import pdf_text
+
+
+def available_backends():
+    names = []
+    for name, backend in pdf_text.BACKENDS.items():
+        try:
+            pdf_text.extract_page_range(sample_pdf(), 0, 1, name)
+            names.append(name)
+        except ImportError:
+            print(f"Skipping {name}: not installed")
+    return names
+
+
+def sample_pdf():
+    return sorted(glob.glob(os.path.join('resumes', '*.pdf')))[0]
+
+
+def legacy_extract(pdf_path):
+    """The original upload.py implementation, kept as the baseline."""
+    from PyPDF2 import PdfReader
+    import re
+
+    reader = PdfReader(pdf_path)
+    text = ""
+    for page in reader.pages:
+        text += page.extract_text()
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def run(label, extract, paths, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        characters = sum(len(extract(path)) for path in paths)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    print(f"{label:<28} {best * 1000:9.1f} ms  {len(paths) / best:8.1f} docs/s  {characters} chars")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction over the resumes/ corpus")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--pattern', default=os.path.join('resumes', '*.pdf'))
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(args.pattern))
+    pages = sum(pdf_text.count_pages(path, 'pypdf2') for path in paths)
+    print(f"{len(paths)} documents, {pages} pages\n")
+
+    run("legacy (PyPDF2 +=)", legacy_extract, paths, args.repeat)
+    for name in available_backends():
+        run(f"{name}", lambda path: pdf_text.extract_pdf_text(path, backend=name), paths, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
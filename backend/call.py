@@ -1,70 +1,176 @@
 import os
+import re
+import time
 import json
 import base64
 import asyncio
 import websockets
 from fastapi import FastAPI, WebSocket, Request
-from twilio.rest import Client as TwilioClient
-from twilio.twiml.voice_response import VoiceResponse, Connect, Say, Stream
-import google.generativeai as genai
+from fastapi.responses import HTMLResponse
+from twilio.twiml.voice_response import VoiceResponse, Connect
+import llm
 from dotenv import load_dotenv
-import pymongo
-from datetime import datetime
+import call_sessions
+import post_call
+import tts
 
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+# Twilio streams 8 kHz mono mu-law audio; endpointing marks when the candidate stops talking
+DEEPGRAM_ENDPOINTING_MS = int(os.getenv("DEEPGRAM_ENDPOINTING_MS", 300))
+# Interim results let the candidate interrupt Carla as soon as they start talking
+DEEPGRAM_URL = (
+    "wss://api.deepgram.com/v1/listen?encoding=mulaw&sample_rate=8000&channels=1"
+    f"&interim_results=true&endpointing={DEEPGRAM_ENDPOINTING_MS}"
+)
 
-# Twilio config
-twilio_client = TwilioClient(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
-twilio_number = os.getenv("TWILIO_PHONE_NUMBER")
-
-# MongoDB connection
-mongo_client = pymongo.MongoClient(os.getenv("DATABASE_URL"))
-db = mongo_client[os.getenv("DATABASE_NAME")]
-resumes_collection = db.data
+# Replies are spoken sentence by sentence as the LLM streams them
+SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
 
 # FastAPI app
 app = FastAPI()
-conv_history = []
-
-# Global state for WebSocket handling
-call_state = {
-    "candidate": None,
-    "candidate_uid": None,
-    "stream_sid": None,
-    "latest_audio_timestamp": 0,
-    "latest_assistant_item": None,
-    "response_start_timestamp_twilio": None,
-    "mark_queue": []
-}
+
 
 @app.get("/")
 async def index():
-    return {"message": "Carla is ready to make calls!"}
+    return {"message": "Carla is ready to make calls!", "active_calls": len(call_sessions.active_sessions())}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Turn latency (end of candidate speech to first reply audio) over recent turns."""
+    return {"active_calls": len(call_sessions.active_sessions()), "turn_latency": call_sessions.latency_stats()}
+
+
+@app.api_route("/incoming-call", methods=["GET", "POST"])
+async def incoming_call(request: Request):
+    """Connect an answered call to the media stream."""
+    response = VoiceResponse()
+    connect = Connect()
+    connect.stream(url=f"wss://{request.url.hostname}/media-stream")
+    response.append(connect)
+    return HTMLResponse(content=str(response), media_type="application/xml")
+
+
+async def record_turn(session, role, text, **fields):
+    """Keep the turn in memory and append it to the call's transcript in Mongo."""
+    turn = session.add_turn(role, text, **fields)
+    if session.call_sid:
+        await asyncio.to_thread(call_sessions.append_turn, session.call_sid, turn)
+
+
+async def reply_sentences(prompt):
+    """Yield the reply one sentence at a time while Gemini is still generating the rest."""
+    buffer = ""
+    chunks = llm.generate_stream_async(prompt, priority=llm.INTERACTIVE)
+    try:
+        async for chunk in chunks:
+            buffer += chunk.text or ""
+            *sentences, buffer = SENTENCE_END.split(buffer)
+            for sentence in sentences:
+                if sentence.strip():
+                    yield sentence.strip()
+    finally:
+        # Stops the LLM worker when a barge-in abandons the reply
+        await chunks.aclose()
+    if buffer.strip():
+        yield buffer.strip()
+
+
+async def send_audio(session, websocket, payload):
+    """Send one media payload to Twilio, timing the turn on its first audio of a reply."""
+    await websocket.send_json({
+        "event": "media",
+        "streamSid": session.stream_sid,
+        "media": {"payload": payload}
+    })
+    latency_ms = session.audio_sent(time.monotonic())
+    if latency_ms is not None:
+        print(f"⏱️ [{session.stream_sid}] Turn latency {latency_ms:.0f} ms")
+    return latency_ms
+
+
+async def send_mark(session, websocket):
+    """Queue a mark after a sentence; Twilio echoes it back once that audio has played."""
+    session.marks_sent += 1
+    name = f"reply-{session.marks_sent}"
+    session.mark_queue.append(name)
+    await websocket.send_json({"event": "mark", "streamSid": session.stream_sid, "mark": {"name": name}})
+
+
+async def speak(session, websocket, text):
+    """Synthesize one sentence and stream it to Twilio in 20 ms mu-law frames as it arrives."""
+    latency_ms = None
+    audio = tts.frames(session.synthesizer.stream(text))
+    try:
+        async for frame in audio:
+            sent_latency = await send_audio(session, websocket, base64.b64encode(frame).decode())
+            latency_ms = latency_ms if sent_latency is None else sent_latency
+    finally:
+        await audio.aclose()
+    await send_mark(session, websocket)
+    return latency_ms
+
+
+async def barge_in(session, websocket):
+    """The candidate started talking over Carla: stop the reply and drop any queued audio."""
+    task = session.reply_task
+    if task is not None and not task.done():
+        task.cancel()
+        await asyncio.gather(task, return_exceptions=True)
+    await session.synthesizer.cancel()
+    await websocket.send_json({"event": "clear", "streamSid": session.stream_sid})
+    session.mark_queue.clear()
+    print(f"✋ [{session.stream_sid}] Candidate interrupted, playback cleared")
+
+
+async def respond(session, websocket, user_text, heard_at, previous=None):
+    """Answer one utterance without blocking the event loop.
+
+    The LLM runs on a worker thread and each sentence is spoken as soon as it is
+    complete, so the candidate hears the start of the reply before the end exists.
+    """
+    if previous is not None:
+        await asyncio.gather(previous, return_exceptions=True)
+    session.speech_ended_at = heard_at
+    await record_turn(session, "user", user_text)
+
+    sentences = []
+    latency_ms = None
+    interrupted = False
+    replies = reply_sentences(f"Respond naturally to: {user_text}")
+    try:
+        async for sentence in replies:
+            sentences.append(sentence)
+            sent_latency = await speak(session, websocket, sentence)
+            latency_ms = latency_ms if sent_latency is None else sent_latency
+    except asyncio.CancelledError:
+        interrupted = True
+        raise
+    except Exception as e:
+        print(f"❌ [{session.stream_sid}] Error generating reply: {e}")
+    finally:
+        await replies.aclose()
+        # An interrupted turn keeps only the sentences that had started playing
+        ai_response = " ".join(sentences)
+        if ai_response:
+            print(f"🤖 [{session.stream_sid}] Carla{' (interrupted)' if interrupted else ''}: {ai_response}")
+            await record_turn(session, "assistant", ai_response, latency_ms=latency_ms, interrupted=interrupted)
 
 
 @app.websocket("/media-stream")
 async def handle_media_stream(websocket: WebSocket):
-    """Handle real-time audio stream from Twilio."""
+    """Handle real-time audio stream from Twilio.
+
+    Each connection gets its own CallSession and Deepgram connection, so calls
+    running side by side never see each other's state.
+    """
     print("📞 Client connected to Carla's media stream")
     await websocket.accept()
-
-    global call_state
-
-    # Reset call state
-    call_state.update({
-        "stream_sid": None,
-        "latest_audio_timestamp": 0,
-        "latest_assistant_item": None,
-        "response_start_timestamp_twilio": None,
-        "mark_queue": []
-    })
+    session = None
 
     async with websockets.connect(
-        "wss://api.deepgram.com/v1/listen",
+        DEEPGRAM_URL,
         extra_headers={
             "Authorization": f"Token {os.getenv('DEEPGRAM_API_KEY')}"
         },
@@ -74,109 +180,86 @@ async def handle_media_stream(websocket: WebSocket):
         print("🎙️ Deepgram connection established")
 
         async def receive_from_twilio():
+            nonlocal session
             try:
                 async for message in websocket.iter_text():
                     data = json.loads(message)
                     if data['event'] == 'media':
+                        if session:
+                            session.latest_media_timestamp = int(data['media'].get('timestamp', 0))
                         payload = base64.b64decode(data['media']['payload'])
                         await deepgram_ws.send(payload)
                     elif data['event'] == 'start':
-                        call_state["stream_sid"] = data['start']['streamSid']
-                        print(f"📞 Call started - SID: {call_state['stream_sid']}")
+                        session = await asyncio.to_thread(
+                            call_sessions.open_session, data['start']['streamSid'], data['start'].get('callSid')
+                        )
+                        session.synthesizer = tts.create_synthesizer()
+                        print(f"📞 Call started - stream {session.stream_sid}, call {session.call_sid}")
+                    elif data['event'] == 'mark':
+                        # This sentence has finished playing
+                        if session and data['mark']['name'] in session.mark_queue:
+                            session.mark_queue.remove(data['mark']['name'])
                     elif data['event'] == 'stop':
-                        print("🛑 Call ended. Saving transcript...")
-                        with open('output.txt', 'w') as file:
-                            file.write(str(conv_history))
-                        print("💾 Transcript saved to output.txt")
-
-                        # Update MongoDB with secondary score
-                        extract_and_update(call_state["candidate_uid"])
-                        await websocket.close()
+                        print(f"🛑 Call ended - stream {session.stream_sid if session else None}")
+                        break
             except Exception as e:
                 print(f"❌ Error receiving from Twilio: {e}")
+            finally:
+                # Closing Deepgram ends send_to_twilio as well
+                await deepgram_ws.close()
 
         async def send_to_twilio():
+            utterance = []
             try:
                 async for msg in deepgram_ws:
                     transcript = json.loads(msg)
-                    if transcript.get("type") == "Results":
-                        words = transcript["channel"]["alternatives"][0]["words"]
-                        user_text = " ".join(word["word"] for word in words)
-                        print(f"🎤 Transcribed: {user_text}")
-                        conv_history.append({"user": user_text})
-
-                        # Generate response using Gemini Flash
-                        ai_response = gemini_model.generate_content(f"Respond naturally to: {user_text}").text.strip()
-                        print(f"🤖 Carla: {ai_response}")
-                        conv_history.append({"assistant": ai_response})
-
-                        # Send back via Twilio
-                        audio_response = {
-                            "event": "media",
-                            "streamSid": call_state["stream_sid"],
-                            "media": {
-                                "payload": base64.b64encode(ai_response.encode()).decode()
-                            }
-                        }
-                        await websocket.send_json(audio_response)
+                    if transcript.get("type") != "Results" or session is None:
+                        continue
+                    text = transcript["channel"]["alternatives"][0].get("transcript", "")
+                    if text and session.is_speaking():
+                        await barge_in(session, websocket)
+                    if text and transcript.get("is_final"):
+                        utterance.append(text)
+                    # Reply once Deepgram's endpointing says the candidate has finished speaking
+                    if not transcript.get("speech_final") or not utterance:
+                        continue
+                    user_text = " ".join(utterance)
+                    utterance = []
+                    heard_at = time.monotonic()
+                    print(f"🎤 [{session.stream_sid}] Transcribed: {user_text}")
 
+                    # The reply runs as its own task so audio keeps flowing to Deepgram meanwhile
+                    session.reply_task = asyncio.create_task(respond(session, websocket, user_text, heard_at, session.reply_task))
+
+                if session and session.reply_task:
+                    await session.reply_task
             except Exception as e:
                 print(f"❌ Error sending to Twilio: {e}")
 
         await asyncio.gather(receive_from_twilio(), send_to_twilio())
 
-
-def extract_and_update(uid):
-    """Use Gemini Flash to evaluate the interview and update MongoDB"""
+    if session:
+        if session.synthesizer:
+            await session.synthesizer.close()
+        await asyncio.to_thread(finish_call, session)
+        print(f"💾 Transcript saved for call {session.call_sid}")
     try:
-        with open('output.txt', 'r') as file:
-            log = file.read().strip()
-
-        prompt = f"""
-        Grade this candidate on a scale of 1–10 based on this transcript:
-        
-        Transcript:
-        {log}
-        
-        Rubric:
-        - Initial Impression & Cultural Fit (2 pts)
-        - Experience & Technical Skills (3 pts)
-        - Communication Skills (2 pts)
-        - Practical Alignment (2 pts)
-        - Red Flags (-0.5 each)
-        
-        Return final score and justification.
-        """
-        response = gemini_model.generate_content(prompt)
-        content = response.text.strip()
-
-        # Extract score manually from response
-        score_match = re.search(r"Final Score:\s*(\d+\.?\d*)", content)
-        final_score = float(score_match.group(1)) if score_match else 8.0
-        justification = content
-
-        # Update MongoDB
-        result = resumes_collection.update_one(
-            {"UID": int(uid)},
-            {
-                "$set": {
-                    "secondary_score": final_score,
-                    "phone_screen_notes": justification,
-                    "phone_screen": "completed"
-                }
-            }
-        )
-
-        print(f"✅ Updated resume for UID {uid}")
-        return True
+        await websocket.close()
+    except Exception:
+        pass
 
-    except Exception as e:
-        print(f"❌ Failed to update MongoDB: {e}")
-        return False
+
+def finish_call(session):
+    call_sessions.close_session(session)
+    # Scoring happens on the post-call worker so the socket closes right away
+    if session.call_sid:
+        post_call.enqueue(session.call_sid)
 
 
 @app.on_event("startup")
 async def startup_event():
+    # Also picks up calls that finished while Carla was down
+    post_call.start_worker()
     print("🟢 Carla is running and ready to initiate calls")
 
 
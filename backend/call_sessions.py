@@ -0,0 +1,212 @@
+import os
+import statistics
+import subprocess
+import sys
+import threading
+import urllib.request
+from collections import deque
+from datetime import datetime
+from dotenv import load_dotenv
+import database
+import openings
+import telephony
+
+load_dotenv()
+
+CALL_SERVER_HOST = os.getenv("CALL_SERVER_HOST")
+# Where this machine can reach the voice server (call.py) to check it is up
+CALL_SERVER_LOCAL_URL = os.getenv("CALL_SERVER_LOCAL_URL", "http://127.0.0.1:5050/")
+# Recent turn latencies (end of candidate speech to first reply audio) across all calls
+LATENCY_WINDOW = int(os.getenv("CALL_LATENCY_WINDOW", 1000))
+
+def candidate_snapshot(candidate):
+    return {key: value for key, value in candidate.items() if key not in database.INTERNAL_RESUME_FIELDS}
+
+
+voice_server_process = None
+voice_server_lock = threading.Lock()
+
+
+def voice_server_running():
+    try:
+        with urllib.request.urlopen(CALL_SERVER_LOCAL_URL, timeout=2):
+            return True
+    except OSError:
+        return False
+
+
+def ensure_voice_server():
+    """Start call.py in the background unless it is already answering; returns "running" or "started"."""
+    global voice_server_process
+    with voice_server_lock:
+        if voice_server_running():
+            return "running"
+        if voice_server_process is not None and voice_server_process.poll() is None:
+            # Started earlier and still booting
+            return "started"
+        script_dir = os.path.dirname(os.path.abspath(__file__))
+        voice_server_process = subprocess.Popen([sys.executable, "call.py"], cwd=script_dir)
+        print(f"Started Carla: {voice_server_process.pid}")
+        return "started"
+
+
+def start_call(candidate, job_id=None, campaign_id=None):
+    """Dial the candidate and record the call, keyed by its call SID.
+
+    The call document is how the voice server finds out who it is talking to,
+    so any number of calls can be in progress at once.
+    """
+    job_id = str(openings.get_job(job_id)["_id"])
+    call_sid = telephony.get_telephony().place_call(candidate['phone'], f'https://{CALL_SERVER_HOST}/incoming-call')
+    create_call(call_sid, candidate, job_id, campaign_id)
+    return call_sid
+
+
+def create_call(call_sid, candidate, job_id, campaign_id=None):
+    now = datetime.utcnow()
+    database.get_calls_collection().insert_one({
+        "_id": call_sid,
+        "candidate_uid": candidate["UID"],
+        "candidate": candidate_snapshot(candidate),
+        "job_id": job_id,
+        "campaign_id": campaign_id,
+        "status": "initiated",
+        "stream_sid": None,
+        "transcript": [],
+        "created_at": now,
+        "updated_at": now
+    })
+
+
+def get_call(call_sid):
+    return database.get_calls_collection().find_one({"_id": call_sid})
+
+
+def mark_started(call_sid, stream_sid):
+    return database.get_calls_collection().find_one_and_update(
+        {"_id": call_sid},
+        {"$set": {"status": "in-progress", "stream_sid": stream_sid, "started_at": datetime.utcnow(), "updated_at": datetime.utcnow()}}
+    )
+
+
+def update_call_status(call_sid, telephony_status, answered_by=None):
+    """Record the carrier-side status (ringing, no-answer, ...) next to our own call status."""
+    database.get_calls_collection().update_one(
+        {"_id": call_sid},
+        {"$set": {"telephony_status": telephony_status, "answered_by": answered_by, "updated_at": datetime.utcnow()}}
+    )
+
+
+def append_turn(call_sid, turn):
+    database.get_calls_collection().update_one(
+        {"_id": call_sid},
+        {"$push": {"transcript": turn}, "$set": {"updated_at": datetime.utcnow()}}
+    )
+
+
+def mark_ended(call_sid, transcript, latency=None):
+    """Store the final transcript; the in-memory copy is authoritative if a turn write was lost."""
+    database.get_calls_collection().update_one(
+        {"_id": call_sid},
+        {"$set": {
+            "status": "completed",
+            "transcript": transcript,
+            "latency": latency,
+            "ended_at": datetime.utcnow(),
+            "updated_at": datetime.utcnow()
+        }}
+    )
+
+
+recent_latencies = deque(maxlen=LATENCY_WINDOW)
+recent_latencies_lock = threading.Lock()
+
+
+def summarize_latencies(latencies):
+    """p50/p95/max of turn latencies in milliseconds."""
+    if not latencies:
+        return {"turns": 0}
+    ordered = sorted(latencies)
+    return {
+        "turns": len(ordered),
+        "p50_ms": round(statistics.median(ordered)),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]),
+        "max_ms": round(ordered[-1])
+    }
+
+
+def latency_stats():
+    with recent_latencies_lock:
+        return summarize_latencies(list(recent_latencies))
+
+
+class CallSession:
+    """State for one media stream: who is on the line and what has been said so far."""
+
+    def __init__(self, stream_sid, call_sid, call=None):
+        self.stream_sid = stream_sid
+        self.call_sid = call_sid
+        call = call or {}
+        self.candidate = call.get("candidate")
+        self.candidate_uid = call.get("candidate_uid")
+        self.job_id = call.get("job_id")
+        self.transcript = []
+        self.latest_media_timestamp = 0
+        self.mark_queue = []
+        self.started_at = datetime.utcnow()
+        self.reply_task = None
+        self.synthesizer = None
+        self.marks_sent = 0
+        # Monotonic time the candidate finished speaking, until the reply's first audio goes out
+        self.speech_ended_at = None
+        self.latencies = []
+
+    def add_turn(self, role, text, **fields):
+        turn = dict(fields, role=role, text=text, at=datetime.utcnow())
+        self.transcript.append(turn)
+        return turn
+
+    def audio_sent(self, now):
+        """Record the turn latency the first time reply audio goes out after the candidate spoke."""
+        if self.speech_ended_at is None:
+            return None
+        latency_ms = (now - self.speech_ended_at) * 1000
+        self.speech_ended_at = None
+        self.latencies.append(latency_ms)
+        with recent_latencies_lock:
+            recent_latencies.append(latency_ms)
+        return latency_ms
+
+    def is_speaking(self):
+        """True while a reply is being generated or Twilio still has its audio queued."""
+        return bool(self.mark_queue) or (self.reply_task is not None and not self.reply_task.done())
+
+    def transcript_text(self):
+        return "\n".join(f"{turn['role']}: {turn['text']}" for turn in self.transcript)
+
+
+# Calls in progress in this process, keyed by stream SID
+sessions = {}
+sessions_lock = threading.Lock()
+
+
+def open_session(stream_sid, call_sid):
+    call = mark_started(call_sid, stream_sid) if call_sid else None
+    if call_sid and call is None:
+        print(f"No call record for {call_sid}; continuing without candidate details")
+    session = CallSession(stream_sid, call_sid, call)
+    with sessions_lock:
+        sessions[stream_sid] = session
+    return session
+
+
+def close_session(session):
+    with sessions_lock:
+        sessions.pop(session.stream_sid, None)
+    if session.call_sid:
+        mark_ended(session.call_sid, session.transcript, summarize_latencies(session.latencies))
+
+
+def active_sessions():
+    with sessions_lock:
+        return list(sessions.values())
@@ -0,0 +1,392 @@
+import os
+import sys
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from datetime import time as time_of_day
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+import database
+import openings
+import call_sessions
+import telephony
+
+load_dotenv()
+
+CAMPAIGN_POLL_SECONDS = float(os.getenv("CAMPAIGN_POLL_SECONDS", 5))
+DEFAULT_MAX_CONCURRENT = int(os.getenv("CAMPAIGN_MAX_CONCURRENT", 3))
+DEFAULT_MAX_ATTEMPTS = int(os.getenv("CAMPAIGN_MAX_ATTEMPTS", 3))
+DEFAULT_RETRY_DELAY_MINUTES = float(os.getenv("CAMPAIGN_RETRY_DELAY_MINUTES", 60))
+
+# Target states: waiting to be dialed, on a call, or done one way or another
+WAITING_STATUSES = ["pending", "retry"]
+OPEN_STATUSES = WAITING_STATUSES + ["dialing"]
+# Outcomes worth another attempt later (voicemail, nobody picked up, line busy)
+RETRY_OUTCOMES = {"machine", "no-answer", "busy", "error"}
+
+scheduler_thread = None
+scheduler_lock = threading.Lock()
+scheduler_stop = threading.Event()
+
+
+class CampaignError(ValueError):
+    pass
+
+
+def candidate_filter(job_id, criteria):
+    """candidate_scores query for a campaign's audience; same filters as the dashboard."""
+    if not isinstance(criteria, dict):
+        raise CampaignError("Campaign filter must be an object")
+    query = {"job_id": job_id}
+    if criteria.get("status"):
+        query["status"] = criteria["status"]
+    try:
+        if criteria.get("min_score") is not None:
+            query["initial_score"] = {"$gte": float(criteria["min_score"])}
+        if criteria.get("min_gpa") is not None:
+            query["gpa"] = {"$gte": float(criteria["min_gpa"])}
+    except (TypeError, ValueError):
+        raise CampaignError("min_score and min_gpa must be numbers")
+    if criteria.get("phone_screen"):
+        query["phone_screen"] = criteria["phone_screen"]
+    return query
+
+
+def validate_window(window):
+    """A calling window: {"start": "09:00", "end": "17:00", "days": [0-6, Monday=0], "timezone": "..."}."""
+    if not window:
+        return None
+    if not isinstance(window, dict):
+        raise CampaignError("Calling window must be an object")
+    try:
+        time_of_day.fromisoformat(window.get("start", "00:00"))
+        time_of_day.fromisoformat(window.get("end", "23:59"))
+        ZoneInfo(window.get("timezone", "UTC"))
+    except (TypeError, ValueError, ZoneInfoNotFoundError) as e:
+        raise CampaignError(f"Invalid calling window: {e}")
+    days = window.get("days", [])
+    if not isinstance(days, list) or any(not isinstance(day, int) or day not in range(7) for day in days):
+        raise CampaignError("Calling window days must be 0 (Monday) to 6 (Sunday)")
+    return window
+
+
+def validate_setting(value, default, name, cast, minimum):
+    """A campaign limit from the request; None means the default, anything below `minimum` is refused."""
+    if value is None:
+        return default
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise CampaignError(f"{name} must be a number")
+    if value < minimum:
+        raise CampaignError(f"{name} must be at least {minimum}")
+    return value
+
+
+def in_window(window, now):
+    """Whether `now` (naive UTC) falls inside the campaign's calling window."""
+    if not window:
+        return True
+    local = now.replace(tzinfo=timezone.utc).astimezone(ZoneInfo(window.get("timezone", "UTC")))
+    if "days" in window and local.weekday() not in window["days"]:
+        return False
+    start = time_of_day.fromisoformat(window.get("start", "00:00"))
+    end = time_of_day.fromisoformat(window.get("end", "23:59"))
+    current = local.time()
+    if start <= end:
+        return start <= current < end
+    # Overnight window, e.g. 18:00-02:00
+    return current >= start or current < end
+
+
+def create_campaign(name, job_id=None, criteria=None, max_concurrent=None, max_attempts=None, retry_delay_minutes=None, window=None):
+    """Snapshot the matching candidates as targets and queue the campaign for the scheduler."""
+    job_id = str(openings.get_job(job_id)["_id"])
+    criteria = criteria or {}
+    max_concurrent = validate_setting(max_concurrent, DEFAULT_MAX_CONCURRENT, "max_concurrent", int, 1)
+    max_attempts = validate_setting(max_attempts, DEFAULT_MAX_ATTEMPTS, "max_attempts", int, 1)
+    retry_delay_minutes = validate_setting(retry_delay_minutes, DEFAULT_RETRY_DELAY_MINUTES, "retry_delay_minutes", float, 0)
+    window = validate_window(window)
+    campaign_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+
+    uids = [entry["UID"] for entry in database.get_candidate_scores_collection().find(candidate_filter(job_id, criteria), {"UID": 1})]
+    with_phone = {
+        resume["UID"] for resume in database.get_resumes_collection().find(
+            {"UID": {"$in": uids}, "phone": {"$nin": [None, ""]}}, {"UID": 1}
+        )
+    }
+    if not with_phone:
+        raise CampaignError("No candidates with a phone number match this campaign")
+
+    database.get_campaigns_collection().insert_one({
+        "_id": campaign_id,
+        "name": name,
+        "job_id": job_id,
+        "criteria": criteria,
+        "max_concurrent": max_concurrent,
+        "max_attempts": max_attempts,
+        "retry_delay_minutes": retry_delay_minutes,
+        "window": window,
+        "status": "running",
+        # Calls currently being placed or in progress, capped at max_concurrent by claim_slot
+        "in_flight": 0,
+        "total": len(with_phone),
+        "created_at": now,
+        "updated_at": now
+    })
+    database.get_campaign_targets_collection().insert_many([{
+        "campaign_id": campaign_id,
+        "candidate_uid": uid,
+        "status": "pending",
+        "attempts": 0,
+        "next_attempt_at": now,
+        "call_sids": [],
+        "outcomes": [],
+        "created_at": now
+    } for uid in sorted(with_phone)], ordered=False)
+    return campaign_id
+
+
+def get_campaign(campaign_id):
+    campaign = database.get_campaigns_collection().find_one({"_id": campaign_id})
+    if campaign is None:
+        return None
+    counts = database.get_campaign_targets_collection().aggregate([
+        {"$match": {"campaign_id": campaign_id}},
+        {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+    ])
+    campaign["targets"] = {row["_id"]: row["count"] for row in counts}
+    return campaign
+
+
+def list_campaigns():
+    return list(database.get_campaigns_collection().find({}, {"criteria": 0}).sort("created_at", -1))
+
+
+def set_campaign_status(campaign_id, status, from_statuses):
+    result = database.get_campaigns_collection().update_one(
+        {"_id": campaign_id, "status": {"$in": from_statuses}},
+        {"$set": {"status": status, "updated_at": datetime.utcnow()}}
+    )
+    return result.matched_count > 0
+
+
+def pause_campaign(campaign_id):
+    """Stop placing new calls; calls already in progress finish normally."""
+    return set_campaign_status(campaign_id, "paused", ["running"])
+
+
+def resume_campaign(campaign_id):
+    return set_campaign_status(campaign_id, "running", ["paused"])
+
+
+def cancel_campaign(campaign_id):
+    """Stop the campaign: waiting targets are dropped and calls in progress are hung up.
+
+    The scheduler no longer looks at a cancelled campaign, so its in-flight calls
+    are settled here rather than left dialing.
+    """
+    if not set_campaign_status(campaign_id, "cancelled", ["running", "paused"]):
+        return False
+    targets = database.get_campaign_targets_collection()
+    targets.update_many(
+        {"campaign_id": campaign_id, "status": {"$in": WAITING_STATUSES}},
+        {"$set": {"status": "cancelled"}}
+    )
+    campaign = database.get_campaigns_collection().find_one({"_id": campaign_id})
+    now = datetime.utcnow()
+    for target in targets.find({"campaign_id": campaign_id, "status": "dialing"}):
+        # A target without a call SID is mid-dial; dial() hangs that call up itself
+        if target.get("call_sid"):
+            hang_up(target["call_sid"])
+        finish_attempt(campaign, target, "cancelled", now)
+    return True
+
+
+def classify(status, answered_by):
+    """Map a (status, answered_by) pair to an outcome, or None while the call is still going."""
+    if answered_by and (answered_by.startswith("machine") or answered_by == "fax"):
+        return "machine"
+    if status not in telephony.FINAL_STATUSES:
+        return None
+    if status == "completed":
+        return "answered"
+    if status in ("no-answer", "busy"):
+        return status
+    return "failed"
+
+
+def claim_slot(campaign):
+    """Atomically take one of the campaign's max_concurrent call slots; False when all are busy."""
+    return database.get_campaigns_collection().find_one_and_update(
+        {"_id": campaign["_id"], "status": "running", "in_flight": {"$lt": campaign["max_concurrent"]}},
+        {"$inc": {"in_flight": 1}}
+    ) is not None
+
+
+def release_slot(campaign):
+    database.get_campaigns_collection().update_one(
+        {"_id": campaign["_id"], "in_flight": {"$gt": 0}},
+        {"$inc": {"in_flight": -1}}
+    )
+
+
+def finish_attempt(campaign, target, outcome, now):
+    """Record an attempt's outcome and decide whether the candidate gets another call.
+
+    Only settles the attempt that is still dialing with the same call, so two schedulers
+    polling the same call record it (and free its slot) once. Returns whether it did.
+    """
+    if outcome == "answered":
+        status, next_attempt_at = "completed", None
+    elif outcome in RETRY_OUTCOMES and target["attempts"] < campaign["max_attempts"]:
+        # Back off a little more after each unanswered attempt
+        status = "retry"
+        next_attempt_at = now + timedelta(minutes=campaign["retry_delay_minutes"] * target["attempts"])
+    elif outcome in RETRY_OUTCOMES:
+        status, next_attempt_at = "exhausted", None
+    elif outcome == "cancelled":
+        status, next_attempt_at = "cancelled", None
+    else:
+        status, next_attempt_at = "failed", None
+
+    result = database.get_campaign_targets_collection().update_one(
+        {"_id": target["_id"], "status": "dialing", "call_sid": target.get("call_sid")},
+        {
+            "$set": {"status": status, "next_attempt_at": next_attempt_at, "last_outcome": outcome, "updated_at": now},
+            "$push": {"outcomes": {"call_sid": target.get("call_sid"), "outcome": outcome, "at": now}}
+        }
+    )
+    if result.matched_count == 0:
+        return False
+    release_slot(campaign)
+    return True
+
+
+def hang_up(call_sid):
+    try:
+        telephony.get_telephony().hang_up(call_sid)
+    except Exception as e:
+        print(f"Could not hang up call {call_sid}: {e}")
+
+
+def poll_active_calls(campaign, now):
+    """Check every call this campaign has in flight and settle the ones that ended."""
+    client = telephony.get_telephony()
+    for target in database.get_campaign_targets_collection().find({"campaign_id": campaign["_id"], "status": "dialing"}):
+        if not target.get("call_sid"):
+            # Claimed but the dial never got recorded (e.g. the scheduler stopped mid-pass)
+            if target.get("updated_at") and now - target["updated_at"] > timedelta(minutes=5):
+                finish_attempt(campaign, target, "error", now)
+            continue
+        try:
+            status, answered_by = client.get_call_status(target["call_sid"])
+        except Exception as e:
+            print(f"Could not fetch status of call {target['call_sid']}: {e}")
+            continue
+        call_sessions.update_call_status(target["call_sid"], status, answered_by)
+        outcome = classify(status, answered_by)
+        if outcome is None:
+            continue
+        if outcome == "machine" and status not in telephony.FINAL_STATUSES:
+            # Don't leave Carla talking to voicemail
+            hang_up(target["call_sid"])
+        finish_attempt(campaign, target, outcome, now)
+
+
+def dial(campaign, target, now):
+    candidate = database.get_resumes_collection().find_one({"UID": target["candidate_uid"]})
+    if not candidate or not candidate.get("phone"):
+        finish_attempt(campaign, target, "failed", now)
+        return
+    try:
+        call_sid = call_sessions.start_call(candidate, campaign["job_id"], campaign_id=campaign["_id"])
+    except Exception as e:
+        print(f"Could not call UID {target['candidate_uid']} for campaign {campaign['_id']}: {e}")
+        finish_attempt(campaign, target, "error", now)
+        return
+    recorded = database.get_campaign_targets_collection().update_one(
+        {"_id": target["_id"], "status": "dialing"},
+        {"$set": {"call_sid": call_sid, "last_dialed_at": now}, "$push": {"call_sids": call_sid}}
+    )
+    if recorded.matched_count == 0:
+        # Cancelled while the call was being placed
+        hang_up(call_sid)
+        return
+    print(f"📞 Campaign {campaign['name']}: calling UID {target['candidate_uid']} (attempt {target['attempts']})")
+
+
+def place_calls(campaign, now):
+    """Start due calls up to the campaign's concurrency limit."""
+    targets = database.get_campaign_targets_collection()
+    due = targets.find(
+        {"campaign_id": campaign["_id"], "status": {"$in": WAITING_STATUSES}, "next_attempt_at": {"$lte": now}},
+        {"_id": 1}
+    ).sort("next_attempt_at", 1).limit(campaign["max_concurrent"])
+    for entry in list(due):
+        # The slot and the target are both claimed atomically, so schedulers running
+        # side by side never exceed max_concurrent or dial the same candidate twice
+        if not claim_slot(campaign):
+            break
+        target = targets.find_one_and_update(
+            {"_id": entry["_id"], "status": {"$in": WAITING_STATUSES}},
+            {
+                "$set": {"status": "dialing", "updated_at": now},
+                "$unset": {"call_sid": ""},
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+        if target is None:
+            release_slot(campaign)
+            continue
+        dial(campaign, target, now)
+
+
+def tick(now=None):
+    """One scheduler pass over every running (or paused, for in-flight calls) campaign."""
+    now = now or datetime.utcnow()
+    campaigns = database.get_campaigns_collection()
+    for campaign in campaigns.find({"status": {"$in": ["running", "paused"]}}):
+        poll_active_calls(campaign, now)
+        if campaign["status"] == "running" and in_window(campaign.get("window"), now):
+            place_calls(campaign, now)
+        if not database.get_campaign_targets_collection().count_documents(
+            {"campaign_id": campaign["_id"], "status": {"$in": OPEN_STATUSES}}, limit=1
+        ):
+            set_campaign_status(campaign["_id"], "completed", ["running", "paused"])
+            print(f"Campaign {campaign['name']} completed")
+
+
+def run_scheduler(interval=CAMPAIGN_POLL_SECONDS):
+    while not scheduler_stop.is_set():
+        try:
+            tick()
+        except Exception as e:
+            print(f"Campaign scheduler error: {e}")
+        scheduler_stop.wait(interval)
+
+
+def start_scheduler():
+    """Run the scheduler on a daemon thread (once per process)."""
+    global scheduler_thread
+    with scheduler_lock:
+        if scheduler_thread is None or not scheduler_thread.is_alive():
+            scheduler_stop.clear()
+            scheduler_thread = threading.Thread(target=run_scheduler, name="campaign-scheduler", daemon=True)
+            scheduler_thread.start()
+        return scheduler_thread
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "run":
+        print("Usage: python campaigns.py [run]")
+    else:
+        database.ensure_indexes()
+        print("Campaign scheduler running")
+        try:
+            run_scheduler()
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,196 @@
+import hashlib
+import os
+import uuid
+from datetime import datetime
+from pymongo import ReturnDocument
+import database
+import gemini
+import llm
+import text_store
+from cache import TTLCache
+
+# Conversation bounds: recent turns are replayed verbatim, older ones are folded into a summary
+MAX_HISTORY_TURNS = int(os.getenv("CHAT_MAX_HISTORY_TURNS", 8))
+SUMMARIZE_BATCH_TURNS = int(os.getenv("CHAT_SUMMARIZE_BATCH_TURNS", 4))
+
+# Gemini explicit context caching only pays off (and is only allowed) for large contexts
+CONTEXT_CACHE_MIN_TOKENS = int(os.getenv("CHAT_CONTEXT_CACHE_MIN_TOKENS", 32768))
+CONTEXT_CACHE_MODEL = os.getenv("CHAT_CONTEXT_CACHE_MODEL", "models/gemini-1.5-flash-001")
+CONTEXT_TTL = int(os.getenv("CHAT_CONTEXT_TTL", 1800))
+
+# Per-candidate models carrying the candidate context as a fixed prompt prefix
+candidate_models = TTLCache(ttl=CONTEXT_TTL, maxsize=128)
+
+
+class ChatError(Exception):
+    pass
+
+
+def build_candidate_profile(candidate):
+    return "\n".join([
+        f"{key}: {value}" for key, value in candidate.items() if key not in database.INTERNAL_RESUME_FIELDS
+    ])
+
+
+def build_candidate_context(candidate, resume_text):
+    candidate_profile = build_candidate_profile(candidate)
+    return f"""
+    You are assisting a recruiter who is asking questions about one candidate.
+
+    Here is the candidate's full profile:
+    {candidate_profile}
+
+    Here is the candidate's resume:
+    {resume_text}
+
+    Answer the recruiter's questions about this candidate.
+    """
+
+
+def get_candidate_model(candidate):
+    """Model whose system instruction holds the candidate context, built once per candidate.
+
+    Keeping the context as an unchanging prefix lets it be reused across turns:
+    large contexts are uploaded as Gemini cached content, small ones stay a
+    stable system instruction instead of being re-sent inside every prompt.
+    """
+    # Any profile change (status, scores, phone screen) gets a fresh context
+    profile_hash = hashlib.sha256(build_candidate_profile(candidate).encode()).hexdigest()
+    key = (candidate["UID"], candidate.get("file_hash"), profile_hash)
+    model = candidate_models.get(key)
+    if model is not None:
+        return model
+
+    resume_text = text_store.get_resume_text(candidate)
+    if resume_text is None:
+        raise ChatError("Candidate file name not found")
+    context = build_candidate_context(candidate, resume_text)
+
+    model = None
+    if len(context) // 4 >= CONTEXT_CACHE_MIN_TOKENS:
+        try:
+            model = gemini.create_cached_model(CONTEXT_CACHE_MODEL, context, CONTEXT_TTL)
+        except Exception as e:
+            print(f"Context caching unavailable, using system instruction: {e}")
+    if model is None:
+        model = gemini.create_model(system_instruction=context)
+
+    candidate_models.set(key, model)
+    return model
+
+
+def find_candidate(uid):
+    candidate = database.get_resumes_collection().find_one({"UID": int(uid)})
+    if not candidate:
+        raise ChatError("Candidate not found")
+    return candidate
+
+
+def create_session(uid):
+    find_candidate(uid)
+    session_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+    database.get_chat_sessions_collection().insert_one({
+        "_id": session_id,
+        "uid": int(uid),
+        "summary": "",
+        "turns": [],
+        "created_at": now,
+        "updated_at": now
+    })
+    return session_id
+
+
+def get_session(uid, session_id):
+    session = database.get_chat_sessions_collection().find_one({"_id": session_id, "uid": int(uid)})
+    if not session:
+        raise ChatError("Chat session not found")
+    return session
+
+
+def build_history(session):
+    history = []
+    if session.get("summary"):
+        history.append({"role": "user", "parts": [f"Summary of our conversation so far: {session['summary']}"]})
+        history.append({"role": "model", "parts": ["Understood."]})
+    for turn in session.get("turns", []):
+        history.append({"role": turn["role"], "parts": [turn["text"]]})
+    return history
+
+
+def summarize_turns(summary, turns):
+    transcript = "\n".join(f"{turn['role']}: {turn['text']}" for turn in turns)
+    prompt = f"""
+    Update this running summary of a recruiter's conversation about a candidate.
+    Keep facts, conclusions and open questions; drop pleasantries. Stay under 150 words.
+
+    Current summary:
+    {summary or '(none)'}
+
+    New conversation:
+    {transcript}
+    """
+    return llm.generate(prompt, priority=llm.BATCH).text.strip()
+
+
+def compact_session(session):
+    """Fold the oldest turns into the summary once the history grows past its bound.
+
+    Turns are folded several at a time so the summarization call is rare.
+    """
+    turns = session["turns"]
+    if len(turns) <= MAX_HISTORY_TURNS + SUMMARIZE_BATCH_TURNS:
+        return
+    overflow = len(turns) - MAX_HISTORY_TURNS
+    try:
+        summary = summarize_turns(session.get("summary", ""), turns[:overflow])
+    except Exception as e:
+        print(f"Could not summarize chat session {session['_id']}: {e}")
+        return
+    database.get_chat_sessions_collection().update_one(
+        {"_id": session["_id"]},
+        {"$set": {"summary": summary}, "$push": {"turns": {"$each": [], "$slice": -(len(turns) - overflow)}}}
+    )
+
+
+def start_chat(uid, session_id):
+    candidate = find_candidate(uid)
+    if session_id is None:
+        session_id = create_session(uid)
+    session = get_session(uid, session_id)
+    return session_id, get_candidate_model(candidate).start_chat(history=build_history(session))
+
+
+def record_turn(session_id, query, chat_response):
+    new_turns = [{"role": "user", "text": query}, {"role": "model", "text": chat_response}]
+    session = database.get_chat_sessions_collection().find_one_and_update(
+        {"_id": session_id},
+        {"$push": {"turns": {"$each": new_turns}}, "$set": {"updated_at": datetime.utcnow()}},
+        return_document=ReturnDocument.AFTER
+    )
+    compact_session(session)
+
+
+def send_message(uid, query, session_id=None):
+    """Answer `query` about candidate `uid` within a session, creating one if needed."""
+    session_id, chat = start_chat(uid, session_id)
+    chat_response = llm.send_message(chat, query).text.strip()
+    record_turn(session_id, query, chat_response)
+    return {"chat_response": chat_response, "session_id": session_id}
+
+
+def stream_message(uid, query, session_id=None):
+    """Like send_message, but yields ("session", id), then ("token", text) chunks as
+    Gemini produces them, then ("done", full_response) once the turn is saved."""
+    session_id, chat = start_chat(uid, session_id)
+    yield "session", session_id
+
+    chunks = []
+    for chunk in llm.stream_message(chat, query):
+        if chunk.text:
+            chunks.append(chunk.text)
+            yield "token", chunk.text
+
+    chat_response = "".join(chunks).strip()
+    record_turn(session_id, query, chat_response)
+    yield "done", chat_response
@@ -0,0 +1,192 @@
+import atexit
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import MongoClient, ASCENDING, DESCENDING
+from pymongo.errors import PyMongoError
+
+load_dotenv()
+
+DATABASE_NAME = os.getenv("DATABASE_NAME", "user_data")
+
+# Pool settings, shared by every module in the process
+POOL_OPTIONS = {
+    "maxPoolSize": int(os.getenv("MONGO_MAX_POOL_SIZE", 50)),
+    "minPoolSize": int(os.getenv("MONGO_MIN_POOL_SIZE", 0)),
+    "maxIdleTimeMS": int(os.getenv("MONGO_MAX_IDLE_TIME_MS", 60000)),
+    "waitQueueTimeoutMS": int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 10000)),
+    "serverSelectionTimeoutMS": int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 10000)),
+    "retryWrites": True,
+    "retryReads": True,
+}
+
+# Bookkeeping fields on resume documents (ids, hashes, index tokens) that never
+# belong in an LLM prompt
+INTERNAL_RESUME_FIELDS = frozenset({'_id', 'search_tokens', 'vector_hash', 'file_hash', 'simhash', 'simhash_bands'})
+
+# Indexes backing the hot queries in app.py (name -> (keys, options))
+RESUME_INDEXES = {
+    "UID_unique": ([("UID", ASCENDING)], {"unique": True}),
+    "status": ([("status", ASCENDING)], {}),
+    "initial_score": ([("initial_score", DESCENDING)], {}),
+    "gpa": ([("gpa", DESCENDING)], {}),
+    "phone_screen": ([("phone_screen", ASCENDING)], {}),
+    # Deduplication lookups: exact file hash and simhash bands for near-duplicates
+    "file_hash": ([("file_hash", ASCENDING)], {}),
+    "simhash_bands": ([("simhash_bands", ASCENDING)], {}),
+    # Multikey index over the keyword search tokens (exact and anchored-prefix lookups)
+    "search_tokens": ([("search_tokens", ASCENDING)], {}),
+    # Keyset pagination: sort by score with _id as the tie-breaker
+    "score_keyset": ([("initial_score", DESCENDING), ("_id", DESCENDING)], {}),
+    "status_score_keyset": ([("status", ASCENDING), ("initial_score", DESCENDING), ("_id", DESCENDING)], {}),
+    # Mirrors the get_resumes filter: equality fields first, then the range filters
+    "resume_filters": ([
+        ("status", ASCENDING),
+        ("phone_screen", ASCENDING),
+        ("initial_score", DESCENDING),
+        ("gpa", DESCENDING)
+    ], {}),
+}
+
+# Scoring-cache entries nobody has read or written for this long expire
+SCORING_CACHE_RETENTION_DAYS = int(os.getenv("SCORING_CACHE_RETENTION_DAYS", 30))
+SCORING_CACHE_INDEXES = {
+    "last_used_ttl": ([("last_used_at", ASCENDING)], {"expireAfterSeconds": SCORING_CACHE_RETENTION_DAYS * 86400}),
+    # Lets entries from an old scoring version be dropped without a scan
+    "version": ([("version", ASCENDING)], {}),
+}
+
+# One entry per (job, candidate); every dashboard query is scoped by job_id first so
+# a role's listing and stats never touch other roles' candidates
+CANDIDATE_SCORE_INDEXES = {
+    "job_uid_unique": ([("job_id", ASCENDING), ("UID", ASCENDING)], {"unique": True}),
+    "job_score_keyset": ([("job_id", ASCENDING), ("initial_score", DESCENDING), ("_id", DESCENDING)], {}),
+    "job_id_keyset": ([("job_id", ASCENDING), ("_id", ASCENDING)], {}),
+    "job_status_score_keyset": ([("job_id", ASCENDING), ("status", ASCENDING), ("initial_score", DESCENDING), ("_id", DESCENDING)], {}),
+    "job_filters": ([
+        ("job_id", ASCENDING),
+        ("status", ASCENDING),
+        ("phone_screen", ASCENDING),
+        ("initial_score", DESCENDING),
+        ("gpa", DESCENDING)
+    ], {}),
+}
+
+# Phone screens: look up a candidate's calls, the calls in a given state and the
+# finished calls still waiting to be scored
+CALL_INDEXES = {
+    "candidate_uid": ([("candidate_uid", ASCENDING), ("created_at", DESCENDING)], {}),
+    "status": ([("status", ASCENDING), ("created_at", DESCENDING)], {}),
+    "evaluation_backlog": ([("status", ASCENDING), ("evaluation_status", ASCENDING), ("ended_at", ASCENDING)], {}),
+}
+
+# Call campaigns: each candidate is targeted once per campaign, and the scheduler
+# looks up a campaign's due targets (and its in-flight calls) on every pass
+CAMPAIGN_TARGET_INDEXES = {
+    "campaign_uid_unique": ([("campaign_id", ASCENDING), ("candidate_uid", ASCENDING)], {"unique": True}),
+    "campaign_due": ([("campaign_id", ASCENDING), ("status", ASCENDING), ("next_attempt_at", ASCENDING)], {}),
+}
+
+# Finished ingestion jobs are kept for a while so clients can still read their summary
+INGEST_JOB_RETENTION_DAYS = int(os.getenv("INGEST_JOB_RETENTION_DAYS", 7))
+INGEST_JOB_INDEXES = {
+    "finished_ttl": ([("finished_at", ASCENDING)], {"expireAfterSeconds": INGEST_JOB_RETENTION_DAYS * 86400}),
+}
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Return the process-wide MongoClient, creating it on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = MongoClient(os.getenv("DATABASE_URL"), **POOL_OPTIONS)
+    return _client
+
+
+def close_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
+
+
+atexit.register(close_client)
+
+
+def get_db():
+    return get_client()[DATABASE_NAME]
+
+
+def get_resumes_collection():
+    return get_db()["data"]
+
+
+def get_jobs_collection():
+    return get_db()["job_information"]
+
+
+def get_counters_collection():
+    return get_db()["counters"]
+
+
+def get_resume_texts_collection():
+    return get_db()["resume_texts"]
+
+
+def get_chat_sessions_collection():
+    return get_db()["chat_sessions"]
+
+
+def get_scoring_cache_collection():
+    return get_db()["scoring_cache"]
+
+
+def get_rescore_jobs_collection():
+    return get_db()["rescore_jobs"]
+
+
+def get_ingest_jobs_collection():
+    return get_db()["ingest_jobs"]
+
+
+def get_candidate_scores_collection():
+    return get_db()["candidate_scores"]
+
+
+def get_calls_collection():
+    return get_db()["calls"]
+
+
+def get_campaigns_collection():
+    return get_db()["campaigns"]
+
+
+def get_campaign_targets_collection():
+    return get_db()["campaign_targets"]
+
+
+def ensure_indexes():
+    """Create any missing indexes; one failing index does not block the others."""
+    for collection, indexes in (
+        (get_resumes_collection(), RESUME_INDEXES),
+        (get_scoring_cache_collection(), SCORING_CACHE_INDEXES),
+        (get_candidate_scores_collection(), CANDIDATE_SCORE_INDEXES),
+        (get_calls_collection(), CALL_INDEXES),
+        (get_ingest_jobs_collection(), INGEST_JOB_INDEXES),
+        (get_campaign_targets_collection(), CAMPAIGN_TARGET_INDEXES),
+    ):
+        for name, (keys, options) in indexes.items():
+            try:
+                collection.create_index(keys, name=name, **options)
+            except PyMongoError as e:
+                print(f"Could not create index {name}: {e}")
+
+
+if __name__ == "__main__":
+    ensure_indexes()
+    print(f"Indexes on {DATABASE_NAME}.data: {sorted(get_resumes_collection().index_information())}")
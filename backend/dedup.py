@@ -0,0 +1,184 @@
+import hashlib
+import os
+import re
+import sys
+from pymongo import UpdateOne
+import database
+import text_store
+
+# Near-duplicates are resumes whose 64-bit simhashes differ in at most this many bits.
+# The hash is split into SIMHASH_BANDS bands; with distance <= bands - 1, two near-duplicates
+# always share at least one band exactly, so the band index finds every candidate.
+#
+# Measured on the sample resumes (~320 words): a single-word edit moves the hash by
+# up to 9 bits (98% within 6), while distinct resumes are 13+ bits apart; the one
+# pair at 7 is the same template under another candidate's name and dates, so a
+# simhash match alone is not enough: it must also share an email, phone or name.
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 8
+MAX_DISTANCE = min(int(os.getenv("DEDUP_MAX_DISTANCE", 6)), SIMHASH_BANDS - 1)
+SHINGLE_SIZE = 3
+
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+EMAIL_PATTERN = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+PHONE_PATTERN = re.compile(r"\+?\d[\d\s().-]{8,}\d")
+
+
+def shingles(text):
+    words = WORD_PATTERN.findall(text.lower())
+    if len(words) < SHINGLE_SIZE:
+        return [' '.join(words)] if words else []
+    return [' '.join(words[i:i + SHINGLE_SIZE]) for i in range(len(words) - SHINGLE_SIZE + 1)]
+
+
+def simhash(text):
+    """64-bit simhash over word 3-gram shingles of the normalised text."""
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles(text):
+        value = int.from_bytes(hashlib.blake2b(shingle.encode(), digest_size=8).digest(), 'big')
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+def bands(fingerprint):
+    width = SIMHASH_BITS // SIMHASH_BANDS
+    mask = (1 << width) - 1
+    return [f"{band}:{fingerprint >> (band * width) & mask:0{width // 4}x}" for band in range(SIMHASH_BANDS)]
+
+
+def fingerprint_fields(text):
+    """Fields stored on each resume so later uploads can find it as a near-duplicate."""
+    fingerprint = simhash(text)
+    return {"simhash": f"{fingerprint:016x}", "simhash_bands": bands(fingerprint)}
+
+
+def distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+def phone_digits(phone):
+    """The last ten digits of a phone number, so +1 (555) 010-0100 matches 555.010.0100."""
+    digits = re.sub(r"\D", "", phone or "")
+    return digits[-10:] if len(digits) >= 10 else None
+
+
+def contact_details(text):
+    """Emails and phone numbers found in resume text, normalised for comparison."""
+    details = {email.lower() for email in EMAIL_PATTERN.findall(text)}
+    details.update(filter(None, (phone_digits(phone) for phone in PHONE_PATTERN.findall(text))))
+    return details
+
+
+def same_person(candidate, text, details=None):
+    """Whether resume `text` carries the stored candidate's email, phone or full name."""
+    details = contact_details(text) if details is None else details
+    if (candidate.get("email") or "").lower() in details:
+        return True
+    if phone_digits(candidate.get("phone")) in details:
+        return True
+    name = WORD_PATTERN.findall((candidate.get("name") or "").lower())
+    # A single word is too weak to identify anyone
+    if len(name) < 2:
+        return False
+    return f" {' '.join(name)} " in f" {' '.join(WORD_PATTERN.findall(text.lower()))} "
+
+
+def find_duplicate(file_hash, fingerprint, text):
+    """Return the existing resume (UID, name) that this upload duplicates, if any.
+
+    Exact byte-for-byte matches are found by file_hash; re-exported or slightly
+    edited copies of the same resume by simhash distance, as long as `text` is
+    still recognisably the same candidate's.
+    """
+    collection = database.get_resumes_collection()
+    projection = {"UID": 1, "name": 1, "gpa": 1, "simhash": 1, "email": 1, "phone": 1}
+
+    if file_hash:
+        existing = collection.find_one({"file_hash": file_hash}, projection)
+        if existing:
+            return existing
+
+    details = contact_details(text)
+    for candidate in collection.find({"simhash_bands": {"$in": bands(fingerprint)}}, projection):
+        if not candidate.get("simhash") or distance(int(candidate["simhash"], 16), fingerprint) > MAX_DISTANCE:
+            continue
+        if same_person(candidate, text, details):
+            return candidate
+        print(f"Resume is {distance(int(candidate['simhash'], 16), fingerprint)} bits from UID {candidate['UID']} but names another candidate")
+    return None
+
+
+class BatchIndex:
+    """In-memory duplicate index for the files of a single bulk upload.
+
+    Nothing in the batch has been parsed yet, so a near match must share an email
+    or phone number found in both texts.
+    """
+
+    def __init__(self):
+        self.by_hash = {}
+        self.by_band = {}
+
+    def find(self, file_hash, fingerprint, text):
+        if file_hash in self.by_hash:
+            return self.by_hash[file_hash]
+        details = contact_details(text)
+        for band in bands(fingerprint):
+            for other_fingerprint, other_details, key in self.by_band.get(band, []):
+                if distance(other_fingerprint, fingerprint) <= MAX_DISTANCE and details & other_details:
+                    return key
+        return None
+
+    def add(self, file_hash, fingerprint, key, text):
+        self.by_hash[file_hash] = key
+        details = contact_details(text)
+        for band in bands(fingerprint):
+            self.by_band.setdefault(band, []).append((fingerprint, details, key))
+
+
+def rebuild_bands(batch_size=500):
+    """Re-split stored simhashes whose bands were built with a different SIMHASH_BANDS."""
+    collection = database.get_resumes_collection()
+    updates = []
+    updated = 0
+    stale = {"simhash": {"$exists": True}, "$expr": {"$ne": [{"$size": {"$ifNull": ["$simhash_bands", []]}}, SIMHASH_BANDS]}}
+    for candidate in collection.find(stale, {"simhash": 1}):
+        updates.append(UpdateOne({"_id": candidate["_id"]}, {"$set": {"simhash_bands": bands(int(candidate["simhash"], 16))}}))
+        if len(updates) >= batch_size:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        updated += collection.bulk_write(updates, ordered=False).modified_count
+    print(f"Rebuilt simhash bands for {updated} resumes")
+
+
+def backfill(batch_size=500):
+    """Compute fingerprints for resumes stored before deduplication existed."""
+    collection = database.get_resumes_collection()
+    rebuild_bands(batch_size)
+    updates = []
+    updated = 0
+    for candidate in collection.find({"simhash": {"$exists": False}}, {"file_name": 1, "file_hash": 1, "UID": 1}):
+        try:
+            text = text_store.get_resume_text(candidate)
+        except Exception as e:
+            print(f"Could not read resume for UID {candidate.get('UID')}: {e}")
+            continue
+        if not text:
+            continue
+        updates.append(UpdateOne({"_id": candidate["_id"]}, {"$set": fingerprint_fields(text)}))
+        if len(updates) >= batch_size:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        updated += collection.bulk_write(updates, ordered=False).modified_count
+    print(f"Fingerprinted {updated} resumes")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "backfill":
+        print("Usage: python dedup.py [backfill]")
+    else:
+        database.ensure_indexes()
+        backfill()
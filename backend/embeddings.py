@@ -0,0 +1,115 @@
+import hashlib
+import os
+import threading
+from functools import lru_cache
+import numpy as np
+from dotenv import load_dotenv
+from lazy import lazy
+from vector_store import DIMENSION
+
+load_dotenv()
+
+# Local Embedding Model (Free & Offline)
+EMBEDDING_MODEL_NAME = 'all-MiniLM-L6-v2'
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", 64))
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", "embedding_cache")
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", 1024))
+
+
+@lazy
+def get_embedding_model():
+    """Load the SentenceTransformer weights on first use."""
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+
+def text_key(text, model_name=EMBEDDING_MODEL_NAME):
+    return hashlib.sha256(f"{model_name}\n{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Append-only on-disk store of float32 embeddings keyed by text hash.
+
+    The file is a sequence of fixed-size records (64-byte hex key + vector), so a
+    record's offset is its position in the in-memory key index. Each batch is
+    written with one O_APPEND write, which keeps concurrent writers from
+    interleaving; readers pick up other processes' appends on their next miss.
+    """
+
+    def __init__(self, path, dimension):
+        self.path = path
+        self.dtype = np.dtype([("key", "S64"), ("vector", "<f4", (dimension,))])
+        self.lock = threading.Lock()
+        self.offsets = {}
+        self.records = None
+        self.loaded_bytes = 0
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.refresh()
+
+    def refresh(self):
+        """Map any records appended since the last load."""
+        size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        size -= size % self.dtype.itemsize  # ignore a partially written trailing record
+        if size == self.loaded_bytes:
+            return
+        self.records = np.memmap(self.path, dtype=self.dtype, mode='r', shape=(size // self.dtype.itemsize,))
+        for position in range(self.loaded_bytes // self.dtype.itemsize, len(self.records)):
+            self.offsets[self.records[position]["key"].decode()] = position
+        self.loaded_bytes = size
+
+    def get_many(self, keys):
+        with self.lock:
+            if any(key not in self.offsets for key in keys):
+                self.refresh()
+            return {
+                key: np.array(self.records[self.offsets[key]]["vector"])
+                for key in keys if key in self.offsets
+            }
+
+    def put_many(self, keys, vectors):
+        batch = np.zeros(len(keys), dtype=self.dtype)
+        batch["key"] = [key.encode() for key in keys]
+        batch["vector"] = np.asarray(vectors, dtype=np.float32)
+        with self.lock:
+            fd = os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644)
+            try:
+                data = memoryview(batch.tobytes())
+                while data:
+                    data = data[os.write(fd, data):]
+            finally:
+                os.close(fd)
+            self.refresh()
+
+
+@lazy
+def get_embedding_cache():
+    # The vector index dimension is the model's, so a fully cached run never loads the weights
+    return EmbeddingCache(os.path.join(EMBEDDING_CACHE_DIR, EMBEDDING_MODEL_NAME, "vectors.bin"), DIMENSION)
+
+
+def embed_documents(texts):
+    """Embed resume texts, encoding only those not already in the on-disk cache."""
+    keys = [text_key(text) for text in texts]
+    cached = get_embedding_cache().get_many(keys)
+
+    missing = {}
+    for key, text in zip(keys, texts):
+        if key not in cached:
+            missing.setdefault(key, text)
+    if missing:
+        encoded = get_embedding_model().encode(list(missing.values()), batch_size=EMBED_BATCH_SIZE)
+        get_embedding_cache().put_many(list(missing), encoded)
+        cached.update(zip(missing, encoded))
+
+    return [cached[key].tolist() for key in keys]
+
+
+@lru_cache(maxsize=QUERY_CACHE_SIZE)
+def cached_query_embedding(normalized_query):
+    return tuple(get_embedding_model().encode(normalized_query).tolist())
+
+
+def embed_query(text):
+    """Embed a search query; repeated queries skip the model entirely."""
+    return list(cached_query_embedding(' '.join(text.split())))
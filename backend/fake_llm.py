@@ -0,0 +1,116 @@
+import json
+import threading
+import time
+
+# Stand-in for the Gemini SDK, selected with LLM_BACKEND=fake, so the rate limiter,
+# retries and the scoring/chat pipelines can be exercised without an API key or quota
+
+
+class ResourceExhausted(Exception):
+    """Mirrors google.api_core.exceptions.ResourceExhausted (HTTP 429)."""
+    code = 429
+
+
+class FakeUsage:
+    def __init__(self, prompt_tokens, output_tokens):
+        self.prompt_token_count = prompt_tokens
+        self.candidates_token_count = output_tokens
+        self.total_token_count = prompt_tokens + output_tokens
+
+
+class FakeResponse:
+    def __init__(self, text, usage=None):
+        self.text = text
+        self.usage_metadata = usage
+
+
+class FakeStream:
+    """Iterable of chunk responses, with usage metadata once fully consumed (like the SDK)."""
+
+    def __init__(self, text, usage, chunk_size=16):
+        self.chunks = [text[i:i + chunk_size] for i in range(0, len(text), chunk_size)]
+        self.usage = usage
+        self.usage_metadata = None
+
+    def __iter__(self):
+        for chunk in self.chunks:
+            yield FakeResponse(chunk)
+        self.usage_metadata = self.usage
+
+
+def fake_value(schema):
+    """A minimal value that satisfies a response_schema."""
+    kind = schema.get("type")
+    if kind == "object":
+        return {name: fake_value(field) for name, field in schema.get("properties", {}).items()}
+    if kind == "array":
+        return [fake_value(schema.get("items", {"type": "string"}))]
+    if kind == "integer":
+        return 1
+    if kind == "number":
+        return 5.0
+    if kind == "boolean":
+        return True
+    return "fake"
+
+
+def flatten(contents):
+    if isinstance(contents, str):
+        return contents
+    if isinstance(contents, dict):
+        return " ".join(flatten(part) for part in contents.get("parts", []))
+    if isinstance(contents, (list, tuple)):
+        return " ".join(flatten(part) for part in contents)
+    return str(contents)
+
+
+class FakeModel:
+    """Answers instantly (or after `latency` seconds) and can fail the first `failures` calls."""
+
+    def __init__(self, model_name="fake", system_instruction=None, latency=0.0, failures=0, error=ResourceExhausted, reply=None):
+        self.model_name = model_name
+        self.system_instruction = system_instruction
+        self.latency = latency
+        self.failures = failures
+        self.error = error
+        self.reply = reply
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def generate_content(self, contents, generation_config=None, stream=False, **kwargs):
+        with self.lock:
+            self.calls += 1
+            fail = self.failures > 0
+            if fail:
+                self.failures -= 1
+        if self.latency:
+            time.sleep(self.latency)
+        if fail:
+            raise self.error("Fake quota exceeded")
+
+        prompt = flatten(contents)
+        schema = (generation_config or {}).get("response_schema")
+        if schema:
+            text = json.dumps(fake_value(schema))
+        elif self.reply is not None:
+            text = self.reply
+        else:
+            text = f"Fake response to: {prompt[-80:]}"
+        usage = FakeUsage(len(prompt) // 4, len(text) // 4)
+        return FakeStream(text, usage) if stream else FakeResponse(text, usage)
+
+    def start_chat(self, history=None):
+        return FakeChat(self, history)
+
+
+class FakeChat:
+    def __init__(self, model, history=None):
+        self.model = model
+        self.history = list(history or [])
+
+    def send_message(self, content, stream=False):
+        self.history.append({"role": "user", "parts": [content]})
+        response = self.model.generate_content(self.history, stream=stream)
+        if not stream:
+            self.history.append({"role": "model", "parts": [response.text]})
+        return response
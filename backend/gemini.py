@@ -0,0 +1,61 @@
+import os
+import threading
+from dotenv import load_dotenv
+from lazy import lazy
+
+load_dotenv()
+
+DEFAULT_MODEL = 'gemini-1.5-flash'
+# "fake" swaps in fake_llm.FakeModel for local runs and tests
+LLM_BACKEND = os.getenv("LLM_BACKEND", "gemini")
+
+models = {}
+models_lock = threading.Lock()
+
+
+@lazy
+def get_genai():
+    """Import and configure the Gemini SDK on first use."""
+    import google.generativeai as genai
+
+    genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+    return genai
+
+
+def new_model(name, system_instruction=None):
+    if LLM_BACKEND == "fake":
+        from fake_llm import FakeModel
+
+        return FakeModel(name, system_instruction=system_instruction)
+    return get_genai().GenerativeModel(name, system_instruction=system_instruction)
+
+
+def get_model(name=DEFAULT_MODEL):
+    """Return a shared GenerativeModel, created the first time it is needed."""
+    model = models.get(name)
+    if model is None:
+        with models_lock:
+            model = models.get(name)
+            if model is None:
+                model = models[name] = new_model(name)
+    return model
+
+
+def create_model(name=DEFAULT_MODEL, system_instruction=None):
+    """Build a dedicated model, e.g. one carrying a per-candidate system instruction."""
+    return new_model(name, system_instruction)
+
+
+def create_cached_model(name, system_instruction, ttl_seconds):
+    """Upload `system_instruction` as Gemini cached content and return a model bound to it."""
+    import datetime
+
+    if LLM_BACKEND == "fake":
+        return new_model(name, system_instruction)
+    genai = get_genai()
+    cached_content = genai.caching.CachedContent.create(
+        model=name,
+        system_instruction=system_instruction,
+        ttl=datetime.timedelta(seconds=ttl_seconds)
+    )
+    return genai.GenerativeModel.from_cached_content(cached_content=cached_content)
@@ -0,0 +1,293 @@
+import os
+import shutil
+import threading
+import uuid
+import zipfile
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from datetime import datetime
+from dotenv import load_dotenv
+from pymongo.errors import BulkWriteError
+from werkzeug.utils import secure_filename
+from upload import extract_resume, cached_score_resume, build_applicant_info, unique_pdf_name, copy_pdf, vectorize_applicants, scored_with, apply_to_job
+from stats import invalidate_resume_caches
+from uid_allocator import allocator
+import database
+import openings
+import text_store
+import dedup
+
+load_dotenv()
+
+# Tunables for bulk ingestion
+EXTRACT_WORKERS = int(os.getenv("INGEST_EXTRACT_WORKERS", os.cpu_count() or 2))
+LLM_CONCURRENCY = int(os.getenv("INGEST_LLM_CONCURRENCY", 4))
+INSERT_BATCH_SIZE = int(os.getenv("INGEST_INSERT_BATCH_SIZE", 50))
+MAX_ACTIVE_JOBS = int(os.getenv("INGEST_MAX_ACTIVE_JOBS", 2))
+INGEST_DIR = os.path.join('temp', 'ingest')
+
+# Job progress lives in the ingest_jobs collection so any API worker can report it;
+# the runner itself is per process
+job_runner = ThreadPoolExecutor(max_workers=MAX_ACTIVE_JOBS)
+extract_pool = None
+extract_pool_lock = threading.Lock()
+
+
+def get_extract_pool():
+    """Create the PDF extraction process pool on first use."""
+    global extract_pool
+    with extract_pool_lock:
+        if extract_pool is None:
+            extract_pool = ProcessPoolExecutor(max_workers=EXTRACT_WORKERS)
+        return extract_pool
+
+
+def stage_uploads(files, job_dir):
+    """Save uploaded PDFs (and the PDFs inside any zip archives) into the job folder."""
+    os.makedirs(job_dir, exist_ok=True)
+    paths = []
+
+    def unique_path(name):
+        base, ext = os.path.splitext(secure_filename(name) or 'resume.pdf')
+        path = os.path.join(job_dir, f"{base}{ext}")
+        counter = 1
+        while os.path.exists(path):
+            path = os.path.join(job_dir, f"{base}_{counter}{ext}")
+            counter += 1
+        return path
+
+    for upload in files:
+        filename = upload.filename or ''
+        if filename.lower().endswith('.zip'):
+            with zipfile.ZipFile(upload.stream) as archive:
+                for member in archive.infolist():
+                    member_name = os.path.basename(member.filename)
+                    if member.is_dir() or not member_name.lower().endswith('.pdf'):
+                        continue
+                    path = unique_path(member_name)
+                    with archive.open(member) as src, open(path, 'wb') as dst:
+                        shutil.copyfileobj(src, dst)
+                    paths.append(path)
+        elif filename.lower().endswith('.pdf'):
+            path = unique_path(filename)
+            upload.save(path)
+            paths.append(path)
+
+    return paths
+
+
+def create_job(files, target_job_id=None):
+    """Stage the uploads, queue a background ingestion job and return its id.
+
+    Resumes are scored against `target_job_id`, or the default job when it is None.
+    """
+    target_job_id = str(openings.get_job(target_job_id)["_id"])
+    job_id = uuid.uuid4().hex
+    job_dir = os.path.join(INGEST_DIR, job_id)
+    paths = stage_uploads(files, job_dir)
+    if not paths:
+        shutil.rmtree(job_dir, ignore_errors=True)
+        raise ValueError("No PDF files found in upload")
+
+    now = datetime.utcnow()
+    database.get_ingest_jobs_collection().insert_one({
+        "_id": job_id,
+        "target_job_id": target_job_id,
+        "status": "queued",
+        "total": len(paths),
+        "extracted": 0,
+        "scored": 0,
+        "inserted": 0,
+        "failed": 0,
+        "duplicates": 0,
+        "added_to_job": 0,
+        "errors": [],
+        "duplicate_files": [],
+        "uids": [],
+        "created_at": now,
+        "started_at": None,
+        "finished_at": None,
+        "updated_at": now
+    })
+
+    job_runner.submit(run_job, job_id, job_dir, paths, target_job_id)
+    return job_id
+
+
+def get_job_status(job_id):
+    status = database.get_ingest_jobs_collection().find_one({"_id": job_id})
+    if status is None:
+        return None
+    status["job_id"] = status.pop("_id")
+    status["processed"] = status["inserted"] + status["failed"] + status["duplicates"]
+    return status
+
+
+def change_job(job_id, update):
+    update.setdefault("$set", {})["updated_at"] = datetime.utcnow()
+    database.get_ingest_jobs_collection().update_one({"_id": job_id}, update)
+
+
+def update_job(job_id, **fields):
+    change_job(job_id, {"$set": fields})
+
+
+def increment_job(job_id, field, amount=1):
+    change_job(job_id, {"$inc": {field: amount}})
+
+
+def record_failures(job_id, failures):
+    """Count failed files; `failures` is a list of (path, error)."""
+    if not failures:
+        return
+    for path, error in failures:
+        print(f"Error ingesting {os.path.basename(path)}: {error}")
+    change_job(job_id, {
+        "$inc": {"failed": len(failures)},
+        "$push": {"errors": {"$each": [{"file": os.path.basename(path), "error": str(error)} for path, error in failures]}}
+    })
+
+
+def record_failure(job_id, path, error):
+    record_failures(job_id, [(path, error)])
+
+
+def record_duplicate(job_id, path, duplicate_of):
+    """Count a resume we already have; `duplicate_of` is an existing UID or an earlier file in this batch."""
+    change_job(job_id, {
+        "$inc": {"duplicates": 1},
+        "$push": {"duplicate_files": {"file": os.path.basename(path), "duplicate_of": duplicate_of}}
+    })
+
+
+def check_duplicate(job_id, batch_index, path, file_hash, resume_text):
+    """Return (fingerprint, existing candidate); the fingerprint is None for any duplicate."""
+    fingerprint = dedup.fingerprint_fields(resume_text)
+    value = int(fingerprint["simhash"], 16)
+
+    earlier_file = batch_index.find(file_hash, value, resume_text)
+    if earlier_file:
+        record_duplicate(job_id, path, {"file": earlier_file})
+        return None, None
+    existing = dedup.find_duplicate(file_hash, value, resume_text)
+    if existing:
+        record_duplicate(job_id, path, {"UID": existing["UID"]})
+        return None, existing
+
+    batch_index.add(file_hash, value, os.path.basename(path), resume_text)
+    return fingerprint, None
+
+
+def insert_documents(documents):
+    """insert_many that reports which documents failed: {index: error message}."""
+    try:
+        database.get_resumes_collection().insert_many(documents, ordered=False)
+    except BulkWriteError as e:
+        # Unordered inserts keep going past a bad document; only these did not make it
+        return {error["index"]: error.get("errmsg", "Insert failed") for error in e.details.get("writeErrors", [])}
+    return {}
+
+
+def flush_applicants(job_id, pending, target_job_id, job_tag):
+    """Assign UIDs to a batch of scored resumes and write them with a single insert_many.
+
+    PDFs are copied into resumes/ only for documents that were actually inserted.
+    """
+    first_uid = allocator.reserve(len(pending))
+    documents = []
+    pdf_names = set()
+    for offset, (path, file_hash, _, fingerprint, applicant_data) in enumerate(pending):
+        pdf_name = unique_pdf_name("resumes", f"{applicant_data['name']}.pdf", pdf_names)
+        pdf_names.add(pdf_name)
+        documents.append(build_applicant_info(applicant_data, pdf_name, first_uid + offset, file_hash, fingerprint))
+
+    try:
+        text_store.store_resume_texts([(file_hash, resume_text) for _, file_hash, resume_text, *_ in pending])
+        insert_errors = insert_documents(documents)
+    except Exception as e:
+        record_failures(job_id, [(path, e) for path, *_ in pending])
+        return
+
+    record_failures(job_id, [(pending[index][0], error) for index, error in insert_errors.items()])
+    inserted = [(document, entry) for index, (document, entry) in enumerate(zip(documents, pending)) if index not in insert_errors]
+    if not inserted:
+        return
+    for document, (path, *_) in inserted:
+        copy_pdf(path, "resumes", document["file_name"])
+    documents = [document for document, _ in inserted]
+
+    try:
+        openings.upsert_scores(target_job_id, [(document, applicant_data, job_tag) for document, (*_, applicant_data) in inserted])
+    except Exception as e:
+        # The resumes are stored; only their entries for this job are missing
+        print(f"Could not add ingested resumes to job {target_job_id}: {e}")
+        change_job(job_id, {"$push": {"errors": {"$each": [
+            {"file": os.path.basename(path), "error": f"Stored but not added to job: {e}"} for _, (path, *_) in inserted
+        ]}}})
+    invalidate_resume_caches()
+    change_job(job_id, {
+        "$inc": {"inserted": len(documents)},
+        "$push": {"uids": {"$each": [document["UID"] for document in documents]}}
+    })
+
+    vectorize_applicants(documents)
+
+
+def run_job(job_id, job_dir, paths, target_job_id):
+    """Extract on the process pool, score with bounded LLM concurrency, insert in batches."""
+    update_job(job_id, status="running", started_at=datetime.utcnow())
+    try:
+        job = openings.get_job(target_job_id)["job_description"].strip()
+        job_tag = scored_with(job)
+        extract_futures = {get_extract_pool().submit(extract_resume, path): path for path in paths}
+        pending = []
+        batch_index = dedup.BatchIndex()
+
+        with ThreadPoolExecutor(max_workers=LLM_CONCURRENCY) as llm_pool:
+            score_futures = {}
+            apply_futures = {}
+            for future in as_completed(extract_futures):
+                path = extract_futures[future]
+                try:
+                    file_hash, resume_text = future.result()
+                except Exception as e:
+                    record_failure(job_id, path, e)
+                    continue
+                increment_job(job_id, "extracted")
+
+                # Duplicates short-circuit here, before any LLM spend
+                fingerprint, existing = check_duplicate(job_id, batch_index, path, file_hash, resume_text)
+                if existing:
+                    apply_futures[llm_pool.submit(apply_to_job, target_job_id, existing, resume_text, job)] = path
+                if fingerprint is None:
+                    continue
+                score_futures[llm_pool.submit(cached_score_resume, resume_text, job)] = (path, file_hash, resume_text, fingerprint)
+
+            for future in as_completed(score_futures):
+                path, file_hash, resume_text, fingerprint = score_futures[future]
+                try:
+                    pending.append((path, file_hash, resume_text, fingerprint, future.result()))
+                except Exception as e:
+                    record_failure(job_id, path, e)
+                    continue
+                increment_job(job_id, "scored")
+
+                if len(pending) >= INSERT_BATCH_SIZE:
+                    flush_applicants(job_id, pending, target_job_id, job_tag)
+                    pending = []
+
+            for future in as_completed(apply_futures):
+                try:
+                    if future.result():
+                        increment_job(job_id, "added_to_job")
+                except Exception as e:
+                    print(f"Could not add {os.path.basename(apply_futures[future])} to job {target_job_id}: {e}")
+
+        if pending:
+            flush_applicants(job_id, pending, target_job_id, job_tag)
+
+        update_job(job_id, status="completed", finished_at=datetime.utcnow())
+    except Exception as e:
+        print(f"Ingestion job {job_id} failed: {e}")
+        update_job(job_id, status="failed", error=str(e), finished_at=datetime.utcnow())
+    finally:
+        shutil.rmtree(job_dir, ignore_errors=True)
@@ -0,0 +1,28 @@
+import threading
+
+
+def lazy(factory):
+    """Turn `factory` into a thread-safe accessor that builds its value on first call.
+
+    Failures are not cached, so a resource that could not be created (e.g. during a
+    network outage) is retried on the next call instead of breaking the process.
+    """
+    lock = threading.Lock()
+    state = {}
+
+    def get():
+        if "value" not in state:
+            with lock:
+                if "value" not in state:
+                    state["value"] = factory()
+        return state["value"]
+
+    def reset():
+        with lock:
+            state.clear()
+
+    get.reset = reset
+    get.is_loaded = lambda: "value" in state
+    get.__name__ = getattr(factory, "__name__", "lazy")
+    get.__doc__ = factory.__doc__
+    return get
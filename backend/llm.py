@@ -0,0 +1,303 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import Future
+from dotenv import load_dotenv
+import gemini
+
+load_dotenv()
+
+# Priority classes: interactive requests (chat, search justifications, live calls)
+# are let through the rate limiter before any waiting batch request
+INTERACTIVE = "interactive"
+BATCH = "batch"
+
+REQUESTS_PER_MINUTE = int(os.getenv("LLM_REQUESTS_PER_MINUTE", 300))
+TOKENS_PER_MINUTE = int(os.getenv("LLM_TOKENS_PER_MINUTE", 1000000))
+CONCURRENCY = {
+    INTERACTIVE: int(os.getenv("LLM_INTERACTIVE_CONCURRENCY", 8)),
+    BATCH: int(os.getenv("LLM_BATCH_CONCURRENCY", 4)),
+}
+MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", 5))
+BACKOFF_BASE = float(os.getenv("LLM_BACKOFF_BASE", 1.0))
+BACKOFF_MAX = float(os.getenv("LLM_BACKOFF_MAX", 30.0))
+# Reserved up front for the response; corrected from usage metadata afterwards
+EXPECTED_OUTPUT_TOKENS = int(os.getenv("LLM_EXPECTED_OUTPUT_TOKENS", 512))
+
+# Quota errors also slow the limiter down; the others are just retried
+RATE_LIMIT_ERRORS = {"ResourceExhausted", "TooManyRequests"}
+RETRYABLE_ERRORS = RATE_LIMIT_ERRORS | {"ServiceUnavailable", "InternalServerError", "DeadlineExceeded", "GatewayTimeout"}
+RETRYABLE_CODES = {429, 500, 502, 503, 504}
+MIN_RATE_SCALE = 0.1
+
+metrics = {"requests": 0, "retries": 0, "throttled": 0, "coalesced": 0, "errors": 0}
+metrics_lock = threading.Lock()
+
+
+def count(metric):
+    with metrics_lock:
+        metrics[metric] += 1
+
+
+class RateLimiter:
+    """Token buckets for requests and tokens per minute, shared by every LLM call.
+
+    The refill rate halves on each quota error and creeps back up on success, so
+    bulk jobs slow down to whatever the quota actually allows.
+    """
+
+    def __init__(self, requests_per_minute, tokens_per_minute):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        self.available = dict(self.limits)
+        self.scale = 1.0
+        self.updated = time.monotonic()
+        self.condition = threading.Condition()
+        self.waiting = {INTERACTIVE: 0, BATCH: 0}
+
+    def refill(self):
+        now = time.monotonic()
+        elapsed = now - self.updated
+        self.updated = now
+        for name, limit in self.limits.items():
+            self.available[name] = min(limit, self.available[name] + elapsed * limit * self.scale / 60)
+
+    def wait_time(self, tokens):
+        """Seconds until both buckets can cover a request of `tokens` tokens."""
+        delay = 0
+        for name, amount in (("requests", 1), ("tokens", tokens)):
+            deficit = min(amount, self.limits[name]) - self.available[name]
+            if deficit > 0:
+                delay = max(delay, deficit * 60 / (self.limits[name] * self.scale))
+        return delay
+
+    def acquire(self, tokens, priority=BATCH):
+        with self.condition:
+            self.waiting[priority] += 1
+            try:
+                while True:
+                    self.refill()
+                    delay = self.wait_time(tokens)
+                    yielding = priority == BATCH and self.waiting[INTERACTIVE] > 0
+                    if delay <= 0 and not yielding:
+                        self.available["requests"] -= 1
+                        self.available["tokens"] -= tokens
+                        return
+                    self.condition.wait(delay or None)
+            finally:
+                self.waiting[priority] -= 1
+                self.condition.notify_all()
+
+    def settle(self, estimated, actual):
+        """Return (or charge) the difference between reserved and actually used tokens."""
+        with self.condition:
+            self.available["tokens"] += estimated - actual
+            self.condition.notify_all()
+
+    def throttle(self):
+        with self.condition:
+            self.scale = max(MIN_RATE_SCALE, self.scale / 2)
+
+    def recover(self):
+        with self.condition:
+            self.scale = min(1.0, self.scale + 0.05)
+
+
+limiter = RateLimiter(REQUESTS_PER_MINUTE, TOKENS_PER_MINUTE)
+slots = {priority: threading.BoundedSemaphore(limit) for priority, limit in CONCURRENCY.items()}
+
+# Identical prompts in flight at the same time share one request
+inflight = {}
+inflight_lock = threading.Lock()
+
+
+def estimate_tokens(prompt_text):
+    return len(str(prompt_text)) // 4 + EXPECTED_OUTPUT_TOKENS
+
+
+def usage_tokens(response):
+    usage = getattr(response, "usage_metadata", None)
+    return getattr(usage, "total_token_count", None) or None
+
+
+def is_retryable(error):
+    return type(error).__name__ in RETRYABLE_ERRORS or getattr(error, "code", None) in RETRYABLE_CODES
+
+
+def is_rate_limit(error):
+    return type(error).__name__ in RATE_LIMIT_ERRORS or getattr(error, "code", None) == 429
+
+
+def backoff(attempt):
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+def handle_failure(error, attempt):
+    """Sleep before the next attempt, or re-raise if `error` should not be retried."""
+    if not is_retryable(error) or attempt >= MAX_RETRIES:
+        count("errors")
+        raise error
+    if is_rate_limit(error):
+        count("throttled")
+        limiter.throttle()
+    count("retries")
+    delay = backoff(attempt)
+    print(f"LLM request failed ({type(error).__name__}: {error}), retrying in {delay:.1f}s")
+    time.sleep(delay)
+
+
+def call(request, prompt_text="", priority=BATCH):
+    """Run `request()` under the shared rate limits and concurrency caps, retrying transient failures."""
+    estimated = estimate_tokens(prompt_text)
+    with slots[priority]:
+        attempt = 0
+        while True:
+            limiter.acquire(estimated, priority)
+            count("requests")
+            try:
+                response = request()
+            except Exception as e:
+                handle_failure(e, attempt)
+                attempt += 1
+                continue
+            limiter.recover()
+            actual = usage_tokens(response)
+            if actual:
+                limiter.settle(estimated, actual)
+            return response
+
+
+def stream(request, prompt_text="", priority=INTERACTIVE):
+    """Like call(), for streaming requests: yields chunks, retrying only before the first one."""
+    estimated = estimate_tokens(prompt_text)
+    with slots[priority]:
+        attempt = 0
+        while True:
+            limiter.acquire(estimated, priority)
+            count("requests")
+            started = False
+            try:
+                response = request()
+                for chunk in response:
+                    started = True
+                    yield chunk
+            except Exception as e:
+                if started:
+                    count("errors")
+                    raise
+                handle_failure(e, attempt)
+                attempt += 1
+                continue
+            limiter.recover()
+            actual = usage_tokens(response)
+            if actual:
+                limiter.settle(estimated, actual)
+            return
+
+
+def coalesced(key, request):
+    """Run `request()` once for concurrent callers with the same key; they all get its result."""
+    with inflight_lock:
+        future = inflight.get(key)
+        leader = future is None
+        if leader:
+            future = inflight[key] = Future()
+    if not leader:
+        count("coalesced")
+        return future.result()
+
+    try:
+        result = request()
+        future.set_result(result)
+        return result
+    except BaseException as e:
+        future.set_exception(e)
+        raise
+    finally:
+        with inflight_lock:
+            inflight.pop(key, None)
+
+
+def request_key(model, contents, options):
+    payload = json.dumps([contents, options], sort_keys=True, default=str)
+    # Models are shared per name (or per system instruction), so identity tells them apart
+    return f"{id(model)}:{hashlib.sha256(payload.encode()).hexdigest()}"
+
+
+def generate(contents, model=None, priority=BATCH, coalesce=True, **options):
+    """generate_content through the shared client; `options` are passed to the model as-is."""
+    model = model or gemini.get_model()
+
+    def request():
+        return call(lambda: model.generate_content(contents, **options), contents, priority)
+
+    if not coalesce:
+        return request()
+    return coalesced(request_key(model, contents, options), request)
+
+
+def generate_stream(contents, model=None, priority=INTERACTIVE, **options):
+    """Streaming generate_content through the shared client (no coalescing)."""
+    model = model or gemini.get_model()
+    return stream(lambda: model.generate_content(contents, stream=True, **options), contents, priority)
+
+
+async def generate_stream_async(contents, model=None, priority=INTERACTIVE, **options):
+    """Async iterator over generate_stream chunks for use inside an event loop.
+
+    The blocking SDK call runs on a worker thread and hands chunks back through a
+    queue, so the loop keeps serving other coroutines while Gemini responds.
+    Closing the iterator early stops the worker after its current chunk.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    stopped = threading.Event()
+    finished = object()
+
+    def produce():
+        chunks = generate_stream(contents, model, priority, **options)
+        try:
+            for chunk in chunks:
+                if stopped.is_set():
+                    break
+                loop.call_soon_threadsafe(queue.put_nowait, chunk)
+        except Exception as e:
+            loop.call_soon_threadsafe(queue.put_nowait, e)
+        finally:
+            chunks.close()
+            loop.call_soon_threadsafe(queue.put_nowait, finished)
+
+    producer = loop.run_in_executor(None, produce)
+    try:
+        while True:
+            item = await queue.get()
+            if item is finished:
+                break
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        stopped.set()
+        if producer.done():
+            producer.result()
+
+
+def send_message(chat, message, priority=INTERACTIVE):
+    return call(lambda: chat.send_message(message), message, priority)
+
+
+def stream_message(chat, message, priority=INTERACTIVE):
+    return stream(lambda: chat.send_message(message, stream=True), message, priority)
+
+
+def get_metrics():
+    with metrics_lock:
+        snapshot = dict(metrics)
+    with limiter.condition:
+        snapshot["rate_scale"] = limiter.scale
+        snapshot["waiting"] = dict(limiter.waiting)
+    return snapshot
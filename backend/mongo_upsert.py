@@ -43,6 +43,9 @@ try:
     collection.insert_many(records)
     inserted_count = len(records)
 
+    # Restart the UID counter after the freshly numbered records
+    db['counters'].update_one({'_id': 'resume_uid'}, {'$set': {'seq': inserted_count}}, upsert=True)
+
     print(f"Successfully inserted {inserted_count} documents into the 'user_data' database and 'data' collection.")
 
 except errors.ConnectionFailure as e:
@@ -0,0 +1,178 @@
+import sys
+from datetime import datetime
+from bson import ObjectId
+from bson.errors import InvalidId
+from pymongo import UpdateOne, ReturnDocument
+import database
+
+# Per-job fields kept on each candidate_scores entry; the resume document keeps the
+# candidate's own details plus a legacy copy of their score for the default job
+SCORE_FIELDS = ("initial_score", "notes", "status", "phone_screen", "phone_screen_notes", "secondary_score", "gpa", "scored_with")
+
+
+class JobNotFound(LookupError):
+    pass
+
+
+def job_object_id(job_id):
+    try:
+        return ObjectId(job_id)
+    except (InvalidId, TypeError):
+        raise JobNotFound(f"Job not found: {job_id}")
+
+
+def serialize_job(job):
+    job = dict(job)
+    job["_id"] = str(job["_id"])
+    return job
+
+
+def list_jobs():
+    jobs_collection = database.get_jobs_collection()
+    return [serialize_job(job) for job in jobs_collection.find({}, {"job_description": 0}).sort("_id", 1)]
+
+
+def get_default_job():
+    """The oldest job, which every pre-multi-job score and endpoint refers to."""
+    return database.get_jobs_collection().find_one({}, sort=[("_id", 1)])
+
+
+def get_default_job_id():
+    job = get_default_job()
+    return str(job["_id"]) if job else None
+
+
+def get_job(job_id=None):
+    """Look up a job by id, or the default job when `job_id` is None."""
+    job = get_default_job() if job_id is None else database.get_jobs_collection().find_one({"_id": job_object_id(job_id)})
+    if job is None:
+        raise JobNotFound(f"Job not found: {job_id}")
+    return job
+
+
+def create_job(job_title, job_description):
+    result = database.get_jobs_collection().insert_one({
+        "job_title": job_title,
+        "job_description": job_description,
+        "created_at": datetime.utcnow()
+    })
+    return str(result.inserted_id)
+
+
+def update_job(job_id, changes):
+    """Apply `changes` and return the job as it was before the update."""
+    job = database.get_jobs_collection().find_one_and_update(
+        {"_id": job_object_id(job_id)},
+        {"$set": dict(changes, updated_at=datetime.utcnow())},
+        return_document=ReturnDocument.BEFORE
+    )
+    if job is None:
+        raise JobNotFound(f"Job not found: {job_id}")
+    return job
+
+
+def score_update(job_id, candidate, applicant_data, scored_with):
+    """Upsert one candidate's score for a job, leaving their per-job progress untouched."""
+    now = datetime.utcnow()
+    return UpdateOne({"job_id": job_id, "UID": candidate["UID"]}, {
+        "$set": {
+            "initial_score": applicant_data["initial_score"],
+            "notes": applicant_data["notes"],
+            "gpa": candidate.get("gpa"),
+            "scored_with": scored_with,
+            "updated_at": now
+        },
+        "$setOnInsert": {
+            "status": "new",
+            "phone_screen": "not completed",
+            "secondary_score": 0,
+            "created_at": now
+        }
+    }, upsert=True)
+
+
+def upsert_scores(job_id, entries):
+    """Write (candidate, applicant_data, scored_with) entries for one job with a single bulk_write."""
+    if entries:
+        database.get_candidate_scores_collection().bulk_write(
+            [score_update(job_id, candidate, applicant_data, scored_with) for candidate, applicant_data, scored_with in entries],
+            ordered=False
+        )
+
+
+def has_score(job_id, uid):
+    return database.get_candidate_scores_collection().count_documents({"job_id": job_id, "UID": uid}, limit=1) > 0
+
+
+def update_candidate(uid, fields, job_id=None):
+    """Set per-job fields (status, phone screen results, ...) on a candidate's entry for a job."""
+    job_id = job_id or get_default_job_id()
+    result = database.get_candidate_scores_collection().update_one(
+        {"job_id": job_id, "UID": uid},
+        {"$set": dict(fields, updated_at=datetime.utcnow())}
+    )
+    return result.matched_count > 0
+
+
+def load_scores(job_id, uids):
+    """Fetch a job's score entries for the given UIDs, keyed by UID."""
+    cursor = database.get_candidate_scores_collection().find({"job_id": job_id, "UID": {"$in": list(uids)}}, {"_id": 0})
+    return {entry["UID"]: entry for entry in cursor}
+
+
+def merge_scores(resumes, scores, job_id):
+    """Overlay a job's per-job fields onto resume documents.
+
+    A resume without an entry has not applied to the job, so the resume's own
+    (default job) copies of those fields are cleared rather than shown as its score.
+    Callers that only want applicants filter on `scores` first.
+    """
+    for resume in resumes:
+        entry = scores.get(resume["UID"], {})
+        resume.update({field: entry.get(field) for field in SCORE_FIELDS if field in entry or field in resume})
+        resume["job_id"] = job_id
+    return resumes
+
+
+def migrate(batch_size=500):
+    """Copy the score fields stored on each resume into candidate_scores for the default job.
+
+    Existing entries are never overwritten, so this is safe to re-run.
+    """
+    job_id = get_default_job_id()
+    if job_id is None:
+        return 0
+    scores = database.get_candidate_scores_collection()
+    projection = {field: 1 for field in SCORE_FIELDS}
+    projection["UID"] = 1
+
+    updates = []
+    created = 0
+    for resume in database.get_resumes_collection().find({"UID": {"$exists": True}}, projection):
+        entry = {field: resume[field] for field in SCORE_FIELDS if field in resume}
+        entry.setdefault("status", "new")
+        entry.setdefault("phone_screen", "not completed")
+        entry.setdefault("secondary_score", 0)
+        updates.append(UpdateOne({"job_id": job_id, "UID": resume["UID"]}, {"$setOnInsert": entry}, upsert=True))
+        if len(updates) >= batch_size:
+            created += scores.bulk_write(updates, ordered=False).upserted_count
+            updates = []
+    if updates:
+        created += scores.bulk_write(updates, ordered=False).upserted_count
+    return created
+
+
+def migrate_if_needed():
+    """Run migrate() once, when the default job has no score entries yet."""
+    job_id = get_default_job_id()
+    if job_id and not database.get_candidate_scores_collection().count_documents({"job_id": job_id}, limit=1):
+        created = migrate()
+        print(f"Migrated {created} candidate scores to job {job_id}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "migrate":
+        print("Usage: python openings.py [migrate]")
+    else:
+        database.ensure_indexes()
+        print(f"Created {migrate()} candidate score entries")
@@ -0,0 +1,136 @@
+import base64
+import os
+from bson import json_util
+from cache import TTLCache
+
+# Every sort ends in _id so the key is unique and the cursor is unambiguous
+SORT_ORDERS = {
+    "newest": [("_id", -1)],
+    "oldest": [("_id", 1)],
+    "score": [("initial_score", -1), ("_id", -1)],
+    "score_asc": [("initial_score", 1), ("_id", 1)],
+}
+DEFAULT_SORT = "oldest"
+# The legacy `page` parameter pays for a skip, so it only reaches this many documents deep
+MAX_SKIP = int(os.getenv("RESUME_MAX_SKIP", 1000))
+
+# Totals are cached briefly so paging through results doesn't re-count every time
+count_cache = TTLCache(ttl=float(os.getenv("RESUME_COUNT_TTL", 30)), maxsize=512)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def encode_cursor(sort_name, values):
+    payload = json_util.dumps({"s": sort_name, "v": values})
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, sort_name):
+    try:
+        padded = token + "=" * (-len(token) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except Exception:
+        raise InvalidCursor("Malformed cursor")
+    if payload.get("s") != sort_name or len(payload.get("v", [])) != len(SORT_ORDERS[sort_name]):
+        raise InvalidCursor("Cursor does not match the requested sort order")
+    return payload["v"]
+
+
+def beyond(field, value, ascending):
+    """Filter for `field` strictly after `value`, or None when nothing can be.
+
+    MongoDB sorts null and missing values before every number, so in descending
+    order they come last and have to be selected explicitly ($lt never matches them).
+    """
+    if value is None:
+        return {field: {"$ne": None}} if ascending else None
+    if ascending:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort_keys, values, backwards=False):
+    """Build the filter selecting documents strictly after `values` in `sort_keys` order.
+
+    For keys (a, b) this is: a beyond v_a, or a == v_a and b beyond v_b.
+    """
+    clauses = []
+    for i, (field, direction) in enumerate(sort_keys):
+        ascending = (direction == 1) != backwards
+        condition = beyond(field, values[i], ascending)
+        if condition is None:
+            continue
+        clause = {prev_field: values[j] for j, (prev_field, _) in enumerate(sort_keys[:i])}
+        clause.update(condition)
+        clauses.append(clause)
+    return {"$or": clauses}
+
+
+def sort_values(doc, sort_keys):
+    return [doc.get(field) for field, _ in sort_keys]
+
+
+def paginate(collection, filter_query, sort_name=DEFAULT_SORT, cursor=None, direction="next", limit=5):
+    """Fetch one page in constant time regardless of depth.
+
+    Returns (documents, next_cursor, prev_cursor); a cursor is None when there is
+    no page in that direction.
+    """
+    if sort_name not in SORT_ORDERS:
+        raise InvalidCursor(f"Unknown sort order: {sort_name}")
+    sort_keys = SORT_ORDERS[sort_name]
+    backwards = direction == "prev"
+
+    query = filter_query
+    if cursor:
+        boundary = keyset_filter(sort_keys, decode_cursor(cursor, sort_name), backwards)
+        query = {"$and": [filter_query, boundary]} if filter_query else boundary
+
+    query_sort = [(field, -order if backwards else order) for field, order in sort_keys]
+    documents = list(collection.find(query).sort(query_sort).limit(limit + 1))
+    has_more = len(documents) > limit
+    documents = documents[:limit]
+    if backwards:
+        documents.reverse()
+
+    if not documents:
+        return documents, None, None
+
+    first = encode_cursor(sort_name, sort_values(documents[0], sort_keys))
+    last = encode_cursor(sort_name, sort_values(documents[-1], sort_keys))
+    if backwards:
+        return documents, last, first if has_more else None
+    return documents, last if has_more else None, first if cursor else None
+
+
+def skip_page(collection, filter_query, sort_name=DEFAULT_SORT, page=1, limit=5):
+    """Fetch a numbered page with skip, for jumping to page N.
+
+    Returns (documents, next_cursor) so a client can keep going with keyset pages
+    from there. Pages deeper than MAX_SKIP documents are refused.
+    """
+    sort_keys = SORT_ORDERS.get(sort_name)
+    if sort_keys is None:
+        raise InvalidCursor(f"Unknown sort order: {sort_name}")
+    skip = (page - 1) * limit
+    if page < 1 or skip > MAX_SKIP:
+        raise InvalidCursor(f"page must be between 1 and {MAX_SKIP // limit + 1}; use cursor to go further")
+    documents = list(collection.find(filter_query).sort(sort_keys).skip(skip).limit(limit + 1))
+    if len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor(sort_name, sort_values(documents[-1], sort_keys))
+
+
+def cached_total(collection, filter_query):
+    """Count matching documents, using collection metadata when there is no filter."""
+    key = (collection.full_name, json_util.dumps(filter_query, sort_keys=True))
+
+    def count():
+        if not filter_query:
+            return collection.estimated_document_count()
+        return collection.count_documents(filter_query)
+
+    return count_cache.get_or_set(key, count)
@@ -0,0 +1,163 @@
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# pypdf2 is always available; pypdfium2 is much faster when installed
+PDF_BACKEND = os.getenv("PDF_BACKEND", "pypdf2")
+# Documents with at least this many pages are split across worker processes
+PARALLEL_PAGE_THRESHOLD = int(os.getenv("PDF_PARALLEL_PAGE_THRESHOLD", 8))
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", os.cpu_count() or 2))
+
+WHITESPACE = re.compile(r'\s+')
+
+page_pool = None
+page_pool_lock = threading.Lock()
+
+
+class PyPDF2Backend:
+    name = "pypdf2"
+
+    def open(self, pdf_path):
+        from PyPDF2 import PdfReader
+
+        return PdfReader(pdf_path)
+
+    def page_count(self, document):
+        return len(document.pages)
+
+    def read_pages(self, document, start, stop):
+        for page in document.pages[start:stop]:
+            yield page.extract_text() or ""
+
+    def close(self, document):
+        pass
+
+
+class PdfiumBackend:
+    name = "pypdfium2"
+
+    def open(self, pdf_path):
+        import pypdfium2
+
+        return pypdfium2.PdfDocument(pdf_path)
+
+    def page_count(self, document):
+        return len(document)
+
+    def read_pages(self, document, start, stop):
+        for index in range(start, min(stop, len(document))):
+            page = document[index]
+            textpage = page.get_textpage()
+            try:
+                yield textpage.get_text_range()
+            finally:
+                textpage.close()
+                page.close()
+
+    def close(self, document):
+        document.close()
+
+
+class PdfminerBackend:
+    name = "pdfminer"
+
+    def open(self, pdf_path):
+        from pdfminer.pdfpage import PDFPage
+
+        f = open(pdf_path, 'rb')
+        try:
+            return f, list(PDFPage.get_pages(f))
+        except Exception:
+            f.close()
+            raise
+
+    def page_count(self, document):
+        return len(document[1])
+
+    def read_pages(self, document, start, stop):
+        from pdfminer.converter import PDFPageAggregator
+        from pdfminer.layout import LAParams, LTTextContainer
+        from pdfminer.pdfinterp import PDFPageInterpreter, PDFResourceManager
+
+        resources = PDFResourceManager()
+        device = PDFPageAggregator(resources, laparams=LAParams())
+        interpreter = PDFPageInterpreter(resources, device)
+        for page in document[1][start:stop]:
+            interpreter.process_page(page)
+            yield "".join(element.get_text() for element in device.get_result() if isinstance(element, LTTextContainer))
+
+    def close(self, document):
+        document[0].close()
+
+
+BACKENDS = {backend.name: backend for backend in (PyPDF2Backend(), PdfiumBackend(), PdfminerBackend())}
+
+
+def get_backend(name=None):
+    try:
+        return BACKENDS[name or PDF_BACKEND]
+    except KeyError:
+        raise ValueError(f"Unknown PDF backend: {name or PDF_BACKEND}")
+
+
+def normalize(text):
+    return WHITESPACE.sub(' ', text).strip()
+
+
+@contextmanager
+def open_document(backend_impl, pdf_path):
+    document = backend_impl.open(pdf_path)
+    try:
+        yield document
+    finally:
+        backend_impl.close(document)
+
+
+def count_pages(pdf_path, backend=None):
+    backend_impl = get_backend(backend)
+    with open_document(backend_impl, pdf_path) as document:
+        return backend_impl.page_count(document)
+
+
+def extract_page_range(pdf_path, start, stop, backend=None):
+    """Worker entry point: extract pages [start, stop) of one document."""
+    backend_impl = get_backend(backend)
+    with open_document(backend_impl, pdf_path) as document:
+        return list(backend_impl.read_pages(document, start, stop))
+
+
+def get_page_pool():
+    global page_pool
+    with page_pool_lock:
+        if page_pool is None:
+            page_pool = ProcessPoolExecutor(max_workers=PDF_WORKERS)
+        return page_pool
+
+
+def extract_pdf_text(pdf_path, backend=None):
+    """Extract the whole document as one whitespace-normalised string.
+
+    Long documents are split into page ranges extracted in parallel, except when
+    already running inside a worker process (e.g. bulk ingestion), where
+    parallelism comes from handling many files at once.
+    """
+    backend_impl = get_backend(backend)
+    in_worker = multiprocessing.parent_process() is not None
+
+    with open_document(backend_impl, pdf_path) as document:
+        page_count = backend_impl.page_count(document)
+        if PDF_WORKERS > 1 and not in_worker and page_count >= PARALLEL_PAGE_THRESHOLD:
+            chunk = -(-page_count // PDF_WORKERS)
+            futures = [
+                get_page_pool().submit(extract_page_range, pdf_path, start, min(start + chunk, page_count), backend_impl.name)
+                for start in range(0, page_count, chunk)
+            ]
+            return normalize("\n".join(text for future in futures for text in future.result()))
+
+        return normalize("\n".join(backend_impl.read_pages(document, 0, page_count)))
@@ -1,53 +1,55 @@
-import pymongo
 import os
 from dotenv import load_dotenv
-from sentence_transformers import SentenceTransformer
-from pinecone import Pinecone, ServerlessSpec
-import google.generativeai as genai
+from embeddings import embed_documents, embed_query, EMBEDDING_MODEL_NAME
+from vector_store import create_vector_store, VECTOR_BACKEND
+import database
+import llm
+from lazy import lazy
 import json
-from PyPDF2 import PdfReader
-import re
+import hashlib
+from pymongo import UpdateOne
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import TTLCache
+import chat_sessions
 
 # Load environment variables
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+# Vector index: Pinecone by default, or the local NumPy index with VECTOR_BACKEND=local
+get_vector_store = lazy(create_vector_store)
 
-# Initialize MongoDB connection
-client = pymongo.MongoClient(os.getenv("DATABASE_URL"))
-db = client["user_data"]
-collection = db["data"]
 
-# Initialize Pinecone
-pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+UPSERT_BATCH_SIZE = 100
 
-# Connect to existing index or create one if needed
-INDEX_NAME = "hoyahacks"
+# Justifications are generated in parallel and reused for repeated searches
+JUSTIFICATION_WORKERS = int(os.getenv("JUSTIFICATION_WORKERS", 5))
+justification_pool = ThreadPoolExecutor(max_workers=JUSTIFICATION_WORKERS)
+justification_cache = TTLCache(
+    ttl=float(os.getenv("JUSTIFICATION_CACHE_TTL", 3600)),
+    maxsize=int(os.getenv("JUSTIFICATION_CACHE_SIZE", 2048))
+)
 
-if INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=INDEX_NAME,
-        dimension=384,  # Match 'all-MiniLM-L6-v2' embedding size
-        metric='cosine',
-        spec=ServerlessSpec(cloud='aws', region='us-east-1')
-    )
-
-index = pc.Index(INDEX_NAME)
+# Resume fields needed to build a vector and its metadata
+VECTOR_FIELDS = ['UID', 'name', 'education', 'technical_skills', 'notes', 'graduation_year', 'yoe', 'vector_hash']
 
 
-# Local Embedding Model (Free & Offline)
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+def normalize_query(query):
+    return ' '.join(query.lower().split())
 
 
-def embed_query(text):
-    """Generate embedding using local model"""
-    return embedding_model.encode(text).tolist()
+def justification_key(metadata, query):
+    """Cache key: candidate, the resume content it was generated from, and the query."""
+    content_hash = hashlib.sha256(str(metadata.get('full_text', '')).encode()).hexdigest()
+    return (metadata.get('id') or metadata.get('uid'), content_hash, normalize_query(query))
 
 
 def generate_candidate_justification(metadata, query):
     """Use Gemini Flash instead of GPT-3.5-turbo"""
+    key = justification_key(metadata, query)
+    cached = justification_cache.get(key)
+    if cached is not None:
+        return cached
+
     try:
         prompt = f"""
         You are a professional recruiter evaluating this candidate based on the following details.
@@ -62,11 +64,14 @@ def generate_candidate_justification(metadata, query):
 
         Write a concise justification explaining why this candidate is a strong match.
         """
-        response = gemini_model.generate_content(prompt)
-        return response.text.strip()
+        response = llm.generate(prompt, priority=llm.INTERACTIVE)
+        justification = response.text.strip()
     except Exception as e:
         return f"Unable to generate justification: {str(e)}"
 
+    justification_cache.set(key, justification)
+    return justification
+
 
 def create_searchable_text(resume_entry):
     """Create a searchable text string from resume fields."""
@@ -81,66 +86,130 @@ def create_searchable_text(resume_entry):
     return ' '.join(filter(bool, search_fields))
 
 
-def upsert_resume_vectors():
-    """Generate embeddings and upsert into Pinecone using local embeddings"""
-    vectors_to_upsert = []
+def vector_hash(search_text):
+    """Fingerprint of what was embedded (and where), so unchanged resumes are never re-encoded."""
+    return hashlib.sha256(f"{VECTOR_BACKEND}:{EMBEDDING_MODEL_NAME}\n{search_text}".encode()).hexdigest()
 
-    for entry in collection.find():
-        search_text = create_searchable_text(entry)
-        vector = embed_query(search_text)
 
-        vectors_to_upsert.append({
+def build_vector(entry, search_text, values):
+    return {
+        "id": str(entry['_id']),
+        "values": values,
+        "metadata": {
+            "uid": entry.get('UID', ''),
             "id": str(entry['_id']),
-            "values": vector,
-            "metadata": {
-                "uid": entry.get('UID', ''),
-                "id": str(entry['_id']),
-                "name": entry.get('name', ''),
-                "skills": entry.get('technical_skills', ''),
-                "education": entry.get('education', ''),
-                "graduation_year": entry.get('graduation_year', ''),
-                "experience_years": entry.get('yoe', 0),
-                "full_text": search_text
-            }
-        })
-
-    batch_size = 100
-    for i in range(0, len(vectors_to_upsert), batch_size):
-        batch = vectors_to_upsert[i:i + batch_size]
-        index.upsert(vectors=batch, namespace="resumes")
-
-    print(f"Upserted {len(vectors_to_upsert)} resume vectors")
+            "name": entry.get('name', ''),
+            "skills": entry.get('technical_skills', ''),
+            "education": entry.get('education', ''),
+            "graduation_year": entry.get('graduation_year', ''),
+            "experience_years": entry.get('yoe', 0),
+            "full_text": search_text
+        }
+    }
+
+
+def vectorize_resumes(entries):
+    """Embed and upsert a batch of resume documents, then record what was embedded."""
+    entries = [entry for entry in entries if entry.get('_id') is not None]
+    if not entries:
+        return 0
+
+    texts = [create_searchable_text(entry) for entry in entries]
+    values = embed_documents(texts)
+    vectors = [build_vector(entry, text, vector) for entry, text, vector in zip(entries, texts, values)]
+    get_vector_store().upsert(vectors, namespace="resumes")
+
+    database.get_resumes_collection().bulk_write([
+        UpdateOne({"_id": entry['_id']}, {"$set": {"vector_hash": vector_hash(text)}})
+        for entry, text in zip(entries, texts)
+    ], ordered=False)
+    return len(vectors)
+
+
+def upsert_resume_vectors(force=False, batch_size=UPSERT_BATCH_SIZE):
+    """Incrementally sync resume embeddings into the vector store.
+
+    Streams resumes from a cursor and only embeds those whose searchable text
+    changed since the last sync (or every resume when `force` is set), so
+    memory stays flat and re-runs cost only the new work.
+    """
+    projection = {field: 1 for field in VECTOR_FIELDS}
+    pending = []
+    upserted = 0
+    skipped = 0
+
+    for entry in database.get_resumes_collection().find({}, projection).batch_size(batch_size):
+        if not force and entry.get('vector_hash') == vector_hash(create_searchable_text(entry)):
+            skipped += 1
+            continue
+        pending.append(entry)
+        if len(pending) >= batch_size:
+            upserted += vectorize_resumes(pending)
+            pending = []
+
+    if pending:
+        upserted += vectorize_resumes(pending)
+
+    print(f"Upserted {upserted} resume vectors ({skipped} unchanged)")
+    return upserted
+
+
+def find_top_matches(query, top_k=5):
+    """Vector search for the best `top_k` matches above the relevance threshold."""
+    # Generate embedding for the query
+    query_embedding = embed_query(query)
+
+    # Perform vector search
+    results = get_vector_store().query(
+        query_embedding,
+        top_k=top_k * 3,
+        namespace="resumes",
+        include_metadata=True
+    )
+
+    return [
+        match for match in sorted(results.get('matches', []), key=lambda x: x.get('score', 0), reverse=True)
+        if match.get('score', 0) > 0.6
+    ][:top_k]
+
+
+def stream_resume_search(query, top_k=5):
+    """Yield ("candidates", matches) right after the vector search, then one
+    ("justification", {...}) event per candidate as each Gemini call finishes."""
+    top_matches = find_top_matches(query, top_k)
+    yield "candidates", [
+        {"uid": int(match.get('metadata', {}).get('uid', 0)), "relevance_score": match.get('score', 0)}
+        for match in top_matches
+    ]
+
+    futures = {
+        justification_pool.submit(generate_candidate_justification, match.get('metadata', {}), query): match
+        for match in top_matches
+    }
+    for future in as_completed(futures):
+        metadata = futures[future].get('metadata', {})
+        yield "justification", {"uid": int(metadata.get('uid', 0)), "justification": future.result()}
 
 
 def advanced_resume_search(query, top_k=5):
     """Search resumes using semantic similarity and generate justifications."""
     try:
-        # Generate embedding for the query
-        query_embedding = embed_query(query)
-
-        # Perform Pinecone search
-        results = index.query(
-            vector=query_embedding,
-            top_k=top_k * 3,
-            include_metadata=True,
-            namespace="resumes"
+        top_matches = find_top_matches(query, top_k)
+
+        # Justifications are independent, so generate them concurrently (cached ones return at once)
+        justifications = justification_pool.map(
+            lambda match: generate_candidate_justification(match.get('metadata', {}), query),
+            top_matches
         )
 
         detailed_matches = []
-        for match in sorted(results.get('matches', []), key=lambda x: x.get('score', 0), reverse=True):
-            if len(detailed_matches) >= top_k:
-                break
-
+        for match, justification in zip(top_matches, justifications):
             metadata = match.get('metadata', {})
-            if match.get('score', 0) > 0.6:
-                uid = int(metadata.get('uid', 0))
-                justification = generate_candidate_justification(metadata, query)
-
-                detailed_matches.append({
-                    "uid": uid,
-                    "justification": justification,
-                    "relevance_score": match.get('score', 0)
-                })
+            detailed_matches.append({
+                "uid": int(metadata.get('uid', 0)),
+                "justification": justification,
+                "relevance_score": match.get('score', 0)
+            })
 
         for match in detailed_matches:
             print(json.dumps(match, indent=2))
@@ -152,57 +221,22 @@ def advanced_resume_search(query, top_k=5):
 
 
 def delete_all_entries_from_pinecone():
-    """Delete all entries from the Pinecone index under the 'resumes' namespace."""
+    """Delete all entries from the vector index under the 'resumes' namespace."""
     try:
-        namespaces = index.describe_index_stats().get("namespaces", [])
-        if "resumes" in namespaces:
-            index.delete(delete_all=True, namespace="resumes")
-            print("All entries deleted from Pinecone index in 'resumes' namespace.")
+        if "resumes" in get_vector_store().namespaces():
+            get_vector_store().delete_all(namespace="resumes")
+            print("All entries deleted from vector index in 'resumes' namespace.")
         else:
             print("Namespace 'resumes' not found.")
     except Exception as e:
-        print(f"Error deleting entries from Pinecone: {str(e)}")
+        print(f"Error deleting entries from vector index: {str(e)}")
 
 
-def extract_pdf_text(pdf_path):
-    """Extract text content from a PDF file."""
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-
-def chat_person(uid, query):
+def chat_person(uid, query, session_id=None):
     """Chat with a specific candidate based on their resume and data."""
     try:
-        candidate_data = collection.find_one({"UID": int(uid)})
-        if not candidate_data:
-            return {"error": "Candidate not found"}
-
-        candidate_file = candidate_data.get("file_name")
-        if not candidate_file:
-            return {"error": "Candidate file name not found"}
-
-        resume_text = extract_pdf_text(os.path.join('resumes', candidate_file))
-
-        candidate_profile = "\n".join([f"{key}: {value}" for key, value in candidate_data.items()])
-
-        prompt = f"""
-        Here is the candidate's full profile:
-        {candidate_profile}
-
-        Here is the candidate's resume:
-        {resume_text}
-
-        Now, answer the following query:
-        {query}
-        """
-
-        response = gemini_model.generate_content(prompt)
-        chat_response = response.text.strip()
-        return {"chat_response": chat_response}
-
+        return chat_sessions.send_message(uid, query, session_id)
+    except chat_sessions.ChatError as e:
+        return {"error": str(e)}
     except Exception as e:
-        return {"error": f"An error occurred: {str(e)}"}
\ No newline at end of file
+        return {"error": f"An error occurred: {str(e)}"}
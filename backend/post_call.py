@@ -0,0 +1,274 @@
+import os
+import sys
+import json
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from dotenv import load_dotenv
+from pymongo import UpdateOne
+import llm
+import database
+import openings
+from stats import invalidate_resume_caches
+
+load_dotenv()
+
+POST_CALL_CONCURRENCY = int(os.getenv("POST_CALL_CONCURRENCY", 4))
+POST_CALL_BATCH_SIZE = int(os.getenv("POST_CALL_BATCH_SIZE", 20))
+# How often an idle worker looks for finished calls nobody queued (e.g. after a restart)
+POST_CALL_SWEEP_SECONDS = float(os.getenv("POST_CALL_SWEEP_SECONDS", 60))
+POST_CALL_MAX_ATTEMPTS = int(os.getenv("POST_CALL_MAX_ATTEMPTS", 3))
+# A claim older than this belongs to a worker that died mid-batch
+CLAIM_TIMEOUT = timedelta(minutes=int(os.getenv("POST_CALL_CLAIM_MINUTES", 10)))
+
+EVALUATION_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "cultural_fit": {"type": "number"},
+        "experience": {"type": "number"},
+        "communication": {"type": "number"},
+        "alignment": {"type": "number"},
+        "red_flags": {"type": "array", "items": {"type": "string"}},
+        "secondary_score": {"type": "number"},
+        "notes": {"type": "string"}
+    },
+    "required": ["cultural_fit", "experience", "communication", "alignment", "red_flags", "secondary_score", "notes"]
+}
+
+EVALUATION_PROMPT = """
+Grade this candidate on a scale of 1–10 based on the phone screening transcript below.
+
+Job description:
+{job_description}
+
+Transcript:
+{transcript}
+
+Rubric:
+- Initial Impression & Cultural Fit (cultural_fit, up to 2 pts)
+- Experience & Technical Skills (experience, up to 3 pts)
+- Communication Skills (communication, up to 2 pts)
+- Practical Alignment (alignment, up to 2 pts)
+- Red Flags (-0.5 each, list them in red_flags)
+
+secondary_score is the final score out of 10. notes justifies it in a few sentences for the recruiter.
+"""
+
+# Calls scored or waiting in this process, so the same call is never queued twice
+pending = queue.Queue()
+queued = set()
+queued_lock = threading.Lock()
+worker_thread = None
+worker_lock = threading.Lock()
+
+
+def transcript_text(call):
+    return "\n".join(f"{turn['role']}: {turn['text']}" for turn in call.get("transcript", []))
+
+
+def claim(call_sid, now):
+    """Mark a finished call as being scored; None if it is scored or another worker has it."""
+    return database.get_calls_collection().find_one_and_update(
+        {
+            "_id": call_sid,
+            "status": "completed",
+            "$or": [
+                {"evaluation_status": {"$in": [None, "failed"]}},
+                {"evaluation_status": "scoring", "evaluation_claimed_at": {"$lt": now - CLAIM_TIMEOUT}}
+            ]
+        },
+        {"$set": {"evaluation_status": "scoring", "evaluation_claimed_at": now}}
+    )
+
+
+def job_description(job_id, jobs):
+    if job_id not in jobs:
+        try:
+            jobs[job_id] = openings.get_job(job_id)["job_description"].strip()
+        except openings.JobNotFound:
+            jobs[job_id] = "(not available)"
+    return jobs[job_id]
+
+
+def evaluate(call, description):
+    """Score one transcript against the rubric; returns the parsed structured output."""
+    prompt = EVALUATION_PROMPT.format(job_description=description, transcript=transcript_text(call))
+    response = llm.generate(
+        prompt,
+        priority=llm.BATCH,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": EVALUATION_SCHEMA
+        }
+    )
+    evaluation = json.loads(response.text.strip())
+    evaluation["secondary_score"] = round(min(10.0, max(0.0, float(evaluation["secondary_score"]))), 1)
+    return evaluation
+
+
+def score_calls(call_sids, pool=None):
+    """Score a batch of finished calls in parallel and write every result with bulk_write.
+
+    Returns the number of calls scored.
+    """
+    now = datetime.utcnow()
+    calls = [call for call in (claim(call_sid, now) for call_sid in call_sids) if call is not None]
+    if not calls:
+        return 0
+
+    call_updates = []
+    # Calls where the candidate never spoke have nothing to grade
+    to_score = []
+    for call in calls:
+        if call.get("candidate_uid") is None or not any(turn["role"] == "user" for turn in call.get("transcript", [])):
+            call_updates.append(UpdateOne({"_id": call["_id"]}, {"$set": {"evaluation_status": "skipped", "evaluated_at": now}}))
+        else:
+            to_score.append(call)
+
+    jobs = {}
+    descriptions = [job_description(call.get("job_id"), jobs) for call in to_score]
+    own_pool = pool is None
+    pool = pool or ThreadPoolExecutor(max_workers=POST_CALL_CONCURRENCY)
+    try:
+        futures = [(call, pool.submit(evaluate, call, description)) for call, description in zip(to_score, descriptions)]
+
+        default_job_id = openings.get_default_job_id()
+        score_updates = []
+        resume_updates = []
+        for call, future in futures:
+            try:
+                evaluation = future.result()
+            except Exception as e:
+                print(f"❌ Could not score call {call['_id']}: {e}")
+                attempts = call.get("evaluation_attempts", 0) + 1
+                call_updates.append(UpdateOne({"_id": call["_id"]}, {"$set": {
+                    # Give up after a few tries so a bad transcript does not loop forever
+                    "evaluation_status": "failed" if attempts < POST_CALL_MAX_ATTEMPTS else "error",
+                    "evaluation_attempts": attempts,
+                    "evaluation_error": str(e)
+                }}))
+                continue
+
+            uid = int(call["candidate_uid"])
+            job_id = call.get("job_id") or default_job_id
+            phone_screen = {
+                "secondary_score": evaluation["secondary_score"],
+                "phone_screen_notes": evaluation["notes"],
+                "phone_screen": "completed"
+            }
+            score_updates.append(UpdateOne({"job_id": job_id, "UID": uid}, {"$set": dict(phone_screen, updated_at=now)}))
+            # The resume document keeps a copy of the default job's phone screen for older clients
+            if job_id == default_job_id:
+                resume_updates.append(UpdateOne({"UID": uid}, {"$set": phone_screen}))
+            call_updates.append(UpdateOne({"_id": call["_id"]}, {"$set": {
+                "evaluation": evaluation,
+                "evaluation_status": "scored",
+                "evaluated_at": datetime.utcnow()
+            }}))
+    finally:
+        if own_pool:
+            pool.shutdown(wait=True)
+
+    if score_updates:
+        database.get_candidate_scores_collection().bulk_write(score_updates, ordered=False)
+    if resume_updates:
+        database.get_resumes_collection().bulk_write(resume_updates, ordered=False)
+    if score_updates:
+        # Phone screen filters and stats read these fields (only matters when run inside the API)
+        invalidate_resume_caches()
+    database.get_calls_collection().bulk_write(call_updates, ordered=False)
+    print(f"✅ Scored {len(score_updates)} of {len(calls)} finished calls")
+    return len(score_updates)
+
+
+def unscored_calls(limit=None):
+    """SIDs of finished calls still waiting for (or due a retry of) their evaluation."""
+    cursor = database.get_calls_collection().find(
+        {
+            "status": "completed",
+            "$or": [
+                {"evaluation_status": {"$in": [None, "failed"]}},
+                {"evaluation_status": "scoring", "evaluation_claimed_at": {"$lt": datetime.utcnow() - CLAIM_TIMEOUT}}
+            ]
+        },
+        {"_id": 1}
+    ).sort("ended_at", 1)
+    if limit:
+        cursor = cursor.limit(limit)
+    return [call["_id"] for call in cursor]
+
+
+def enqueue(call_sid):
+    """Queue a finished call for scoring and make sure the worker is running; returns immediately."""
+    with queued_lock:
+        if call_sid in queued:
+            return False
+        queued.add(call_sid)
+    pending.put(call_sid)
+    start_worker()
+    return True
+
+
+def next_batch(timeout):
+    """Block for the first queued call, then take whatever else is already waiting."""
+    batch = [pending.get(timeout=timeout)]
+    while len(batch) < POST_CALL_BATCH_SIZE:
+        try:
+            batch.append(pending.get_nowait())
+        except queue.Empty:
+            break
+    return batch
+
+
+def run_worker():
+    with ThreadPoolExecutor(max_workers=POST_CALL_CONCURRENCY) as pool:
+        while True:
+            try:
+                batch = next_batch(POST_CALL_SWEEP_SECONDS)
+            except queue.Empty:
+                # Idle: pick up calls that finished while no worker was running
+                try:
+                    for call_sid in unscored_calls(POST_CALL_BATCH_SIZE * 5):
+                        enqueue(call_sid)
+                except Exception as e:
+                    print(f"Post-call sweep failed: {e}")
+                continue
+            try:
+                score_calls(batch, pool)
+            except Exception as e:
+                print(f"❌ Post-call scoring failed: {e}")
+            finally:
+                with queued_lock:
+                    queued.difference_update(batch)
+
+
+def start_worker():
+    """Run the scoring worker on a daemon thread (once per process)."""
+    global worker_thread
+    with worker_lock:
+        if worker_thread is None or not worker_thread.is_alive():
+            worker_thread = threading.Thread(target=run_worker, name="post-call-scoring", daemon=True)
+            worker_thread.start()
+        return worker_thread
+
+
+def score_backlog():
+    """Score every finished call still waiting, batch by batch; returns how many were scored."""
+    scored = 0
+    with ThreadPoolExecutor(max_workers=POST_CALL_CONCURRENCY) as pool:
+        while True:
+            batch = unscored_calls(POST_CALL_BATCH_SIZE)
+            if not batch:
+                return scored
+            # Failed calls come back until they reach POST_CALL_MAX_ATTEMPTS, so this ends
+            scored += score_calls(batch, pool)
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "backlog":
+        print(f"Scored {score_backlog()} calls")
+    elif len(sys.argv) == 2:
+        score_calls([sys.argv[1]])
+    else:
+        print("Usage: python post_call.py backlog | <call_sid>")
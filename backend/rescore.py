@@ -0,0 +1,253 @@
+import os
+import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from pymongo import UpdateOne
+import database
+import openings
+import score_cache
+import text_store
+from search import build_search_tokens
+from upload import cached_score_resume, SCORING_VERSION
+from stats import invalidate_resume_caches
+
+RESCORE_CONCURRENCY = int(os.getenv("RESCORE_CONCURRENCY", 4))
+RESCORE_BATCH_SIZE = int(os.getenv("RESCORE_BATCH_SIZE", 50))
+# A "running" run that has not checkpointed for this long is assumed dead and may be resumed
+RESCORE_STALE_MINUTES = int(os.getenv("RESCORE_STALE_MINUTES", 15))
+
+RESUME_PROJECTION = {"UID": 1, "file_name": 1, "file_hash": 1, "gpa": 1, "name": 1, "education": 1, "technical_skills": 1}
+
+# Only one re-score runs at a time per process; a newer one supersedes older ones
+rescore_runner = ThreadPoolExecutor(max_workers=1)
+
+
+def start_rescore(job_id=None, all_candidates=False):
+    """Record a new re-score run for a job and start it in the background.
+
+    Only the job's own candidates are re-scored unless `all_candidates` is set, which
+    scores every stored resume against it (e.g. to fill a newly opened role).
+    """
+    job = openings.get_job(job_id)
+    job_id = str(job["_id"])
+    job_description = job["job_description"].strip()
+    rescore_jobs = database.get_rescore_jobs_collection()
+    rescore_id = uuid.uuid4().hex
+    now = datetime.utcnow()
+
+    if all_candidates:
+        total = database.get_resumes_collection().estimated_document_count()
+    else:
+        total = database.get_candidate_scores_collection().count_documents({"job_id": job_id})
+
+    rescore_jobs.update_many(
+        {"job_id": job_id, "status": {"$in": ["queued", "running"]}},
+        {"$set": {"status": "superseded", "updated_at": now}}
+    )
+    rescore_jobs.insert_one({
+        "_id": rescore_id,
+        "job_id": job_id,
+        "all_candidates": all_candidates,
+        "job_description": job_description,
+        "job_hash": score_cache.text_hash(job_description),
+        "version": SCORING_VERSION,
+        "status": "queued",
+        "total": total,
+        "processed": 0,
+        "skipped": 0,
+        "failed": 0,
+        "failed_uids": [],
+        "last_id": None,
+        "created_at": now,
+        "updated_at": now
+    })
+    rescore_runner.submit(run_rescore, rescore_id)
+    return rescore_id
+
+
+def resume_rescore(rescore_id):
+    """Continue an interrupted run from its last checkpoint, then retry the candidates that failed."""
+    stale = datetime.utcnow() - timedelta(minutes=RESCORE_STALE_MINUTES)
+    result = database.get_rescore_jobs_collection().update_one(
+        {"_id": rescore_id, "$or": [
+            {"status": {"$in": ["failed", "queued"]}},
+            # Only take over a running run whose worker has stopped checkpointing
+            {"status": "running", "updated_at": {"$lt": stale}}
+        ]},
+        {"$set": {"status": "queued", "updated_at": datetime.utcnow()}}
+    )
+    if not result.matched_count:
+        return False
+    rescore_runner.submit(run_rescore, rescore_id)
+    return True
+
+
+def get_rescore_status(rescore_id):
+    return database.get_rescore_jobs_collection().find_one({"_id": rescore_id}, {"job_description": 0})
+
+
+def score_candidate(candidate, job_description):
+    """Rate limiting and retries happen in the shared llm client, at batch priority."""
+    resume_text = text_store.get_resume_text(candidate)
+    if not resume_text:
+        raise ValueError("No resume text available")
+    return cached_score_resume(resume_text, job_description)
+
+
+def run_rescore(rescore_id):
+    """Stream the job's candidates in _id order, re-score in bounded parallel batches and
+    checkpoint after each batch so a crash resumes where it stopped."""
+    rescore_jobs = database.get_rescore_jobs_collection()
+    run = rescore_jobs.find_one_and_update(
+        {"_id": rescore_id, "status": "queued"},
+        {"$set": {"status": "running", "updated_at": datetime.utcnow()}}
+    )
+    if run is None:
+        return
+
+    # Runs recorded before jobs had ids streamed every resume against the default job
+    run["all_candidates"] = run.get("all_candidates", "job_id" not in run)
+    run["job_id"] = run.get("job_id") or openings.get_default_job_id()
+    run["is_default_job"] = run["job_id"] == openings.get_default_job_id()
+    query = {"_id": {"$gt": run["last_id"]}} if run.get("last_id") else {}
+
+    # Checkpoints are _ids in whichever collection is streamed
+    if run["all_candidates"]:
+        source, projection = database.get_resumes_collection(), RESUME_PROJECTION
+    else:
+        source, projection = database.get_candidate_scores_collection(), {"UID": 1}
+        query["job_id"] = run["job_id"]
+
+    try:
+        with ThreadPoolExecutor(max_workers=RESCORE_CONCURRENCY) as pool:
+            cursor = source.find(query, projection).sort("_id", 1).batch_size(RESCORE_BATCH_SIZE)
+            batch = []
+            for entry in cursor:
+                batch.append(entry)
+                if len(batch) >= RESCORE_BATCH_SIZE:
+                    if not process_batch(rescore_id, pool, batch, run):
+                        return
+                    batch = []
+            if batch and not process_batch(rescore_id, pool, batch, run):
+                return
+            if not retry_failed(rescore_id, pool, run):
+                return
+
+        rescore_jobs.update_one(
+            {"_id": rescore_id, "status": "running"},
+            {"$set": {"status": "completed", "updated_at": datetime.utcnow()}}
+        )
+        print(f"Re-score {rescore_id} completed")
+    except Exception as e:
+        print(f"Re-score {rescore_id} failed: {e}")
+        rescore_jobs.update_one(
+            {"_id": rescore_id},
+            {"$set": {"status": "failed", "error": str(e), "updated_at": datetime.utcnow()}}
+        )
+
+
+def is_current(rescore_id):
+    if database.get_rescore_jobs_collection().count_documents({"_id": rescore_id, "status": "running"}, limit=1) == 0:
+        print(f"Re-score {rescore_id} superseded, stopping")
+        return False
+    return True
+
+
+def process_batch(rescore_id, pool, batch, run):
+    """Score one batch and advance the checkpoint past it.
+
+    Candidates that fail are recorded in failed_uids and retried at the end of the
+    run. Returns False if the run was superseded and should stop.
+    """
+    if not is_current(rescore_id):
+        return False
+
+    if run["all_candidates"]:
+        candidates = batch
+    else:
+        candidates = list(database.get_resumes_collection().find(
+            {"UID": {"$in": [entry["UID"] for entry in batch]}}, RESUME_PROJECTION
+        ))
+    processed, skipped, failed_uids = score_batch(pool, candidates, run)
+
+    update = {
+        "$set": {"last_id": batch[-1]["_id"], "updated_at": datetime.utcnow()},
+        "$inc": {"processed": processed, "skipped": skipped + len(batch) - len(candidates), "failed": len(failed_uids)}
+    }
+    if failed_uids:
+        update["$addToSet"] = {"failed_uids": {"$each": failed_uids}}
+    database.get_rescore_jobs_collection().update_one({"_id": rescore_id}, update)
+    return True
+
+
+def retry_failed(rescore_id, pool, run):
+    """Give the candidates that failed during the run one more try; those still failing stay listed."""
+    rescore_jobs = database.get_rescore_jobs_collection()
+    failed_uids = (rescore_jobs.find_one({"_id": rescore_id}, {"failed_uids": 1}) or {}).get("failed_uids") or []
+    for start in range(0, len(failed_uids), RESCORE_BATCH_SIZE):
+        if not is_current(rescore_id):
+            return False
+        uids = failed_uids[start:start + RESCORE_BATCH_SIZE]
+        candidates = list(database.get_resumes_collection().find({"UID": {"$in": uids}}, RESUME_PROJECTION))
+        processed, skipped, still_failed = score_batch(pool, candidates, run)
+        # Deleted resumes no longer need a score
+        recovered = [uid for uid in uids if uid not in still_failed]
+        rescore_jobs.update_one({"_id": rescore_id}, {
+            "$set": {"updated_at": datetime.utcnow()},
+            "$inc": {"processed": processed, "skipped": skipped, "failed": -len(recovered)},
+            "$pullAll": {"failed_uids": recovered}
+        })
+    return True
+
+
+def score_batch(pool, candidates, run):
+    """Score candidates in parallel and write the results with bulk_write.
+
+    Returns (processed, skipped, failed UIDs).
+    """
+    job_id = run["job_id"]
+    job_description = run["job_description"]
+    scored_with = f"{run['job_hash']}:{run['version']}"
+    resumes = database.get_resumes_collection()
+
+    # Candidates already scored against this job (e.g. before a crash) are skipped
+    scores = openings.load_scores(job_id, [candidate["UID"] for candidate in candidates])
+    todo = [candidate for candidate in candidates if scores.get(candidate["UID"], {}).get("scored_with") != scored_with]
+    futures = [(candidate, pool.submit(score_candidate, candidate, job_description)) for candidate in todo]
+
+    entries = []
+    legacy_updates = []
+    failed_uids = []
+    for candidate, future in futures:
+        try:
+            applicant_data = future.result()
+        except Exception as e:
+            print(f"Could not re-score UID {candidate.get('UID')}: {e}")
+            failed_uids.append(candidate["UID"])
+            continue
+        entries.append((candidate, applicant_data, scored_with))
+        # The resume document keeps a copy of the default job's score for older clients
+        if run["is_default_job"]:
+            legacy_updates.append(UpdateOne({"_id": candidate["_id"]}, {"$set": {
+                "initial_score": applicant_data["initial_score"],
+                "notes": applicant_data["notes"],
+                "search_tokens": build_search_tokens(dict(candidate, notes=applicant_data["notes"])),
+                "scored_with": scored_with
+            }}))
+
+    if entries:
+        openings.upsert_scores(job_id, entries)
+        if legacy_updates:
+            resumes.bulk_write(legacy_updates, ordered=False)
+        invalidate_resume_caches()
+    return len(entries), len(candidates) - len(todo), failed_uids
+
+if __name__ == "__main__":
+    if len(sys.argv) == 3 and sys.argv[1] == "resume":
+        if resume_rescore(sys.argv[2]):
+            rescore_runner.shutdown(wait=True)
+        else:
+            print(f"No resumable re-score with id {sys.argv[2]}")
+    else:
+        print("Usage: python rescore.py resume <rescore_id>")
@@ -0,0 +1,134 @@
+import atexit
+import hashlib
+import json
+import os
+import sys
+import threading
+from datetime import datetime
+from pymongo import UpdateOne
+from pymongo.errors import PyMongoError
+import database
+
+# Hits are counted in memory and written in batches, so a cache read is never a write
+HIT_FLUSH_SIZE = int(os.getenv("SCORING_CACHE_HIT_FLUSH_SIZE", 50))
+
+# Process-local hit/miss counters; the per-entry hit counts live in MongoDB
+metrics = {"hits": 0, "misses": 0, "writes": 0, "errors": 0}
+metrics_lock = threading.Lock()
+pending_hits = {}
+
+
+def text_hash(text):
+    return hashlib.sha256(text.strip().encode()).hexdigest()
+
+
+def scoring_version(prompt_version, model_name, schema):
+    """Version tag covering everything besides the inputs that shapes a score."""
+    schema_hash = hashlib.sha256(json.dumps(schema, sort_keys=True).encode()).hexdigest()[:12]
+    return f"{prompt_version}:{model_name}:{schema_hash}"
+
+
+def cache_key(resume_text, job, version):
+    return f"{text_hash(resume_text)}:{text_hash(job)}:{version}"
+
+
+def count(metric):
+    with metrics_lock:
+        metrics[metric] += 1
+
+
+def record_hit(key):
+    with metrics_lock:
+        pending_hits[key] = pending_hits.get(key, 0) + 1
+        full = len(pending_hits) >= HIT_FLUSH_SIZE
+    if full:
+        flush_hits()
+
+
+def flush_hits():
+    """Write the hit counts gathered so far; also keeps the entries clear of the TTL."""
+    with metrics_lock:
+        hits = dict(pending_hits)
+        pending_hits.clear()
+    if not hits:
+        return
+    now = datetime.utcnow()
+    try:
+        database.get_scoring_cache_collection().bulk_write([
+            UpdateOne({"_id": key}, {"$inc": {"hits": n}, "$set": {"last_hit_at": now, "last_used_at": now}})
+            for key, n in hits.items()
+        ], ordered=False)
+    except PyMongoError as e:
+        print(f"Scoring cache hit counts not saved: {e}")
+        count("errors")
+
+
+# Registered after database's close_client, so it runs before the client is closed
+atexit.register(flush_hits)
+
+
+def get(resume_text, job, version):
+    """Return the cached scoring result, or None on a miss."""
+    key = cache_key(resume_text, job, version)
+    try:
+        entry = database.get_scoring_cache_collection().find_one({"_id": key}, {"result": 1})
+    except PyMongoError as e:
+        print(f"Scoring cache lookup failed: {e}")
+        count("errors")
+        return None
+    count("hits" if entry else "misses")
+    if not entry:
+        return None
+    record_hit(key)
+    return entry["result"]
+
+
+def put(resume_text, job, version, result):
+    now = datetime.utcnow()
+    try:
+        database.get_scoring_cache_collection().update_one(
+            {"_id": cache_key(resume_text, job, version)},
+            {
+                "$set": {"result": result, "created_at": now, "last_used_at": now},
+                "$setOnInsert": {
+                    "resume_hash": text_hash(resume_text),
+                    "job_hash": text_hash(job),
+                    "version": version,
+                    "hits": 0
+                }
+            },
+            upsert=True
+        )
+        count("writes")
+    except PyMongoError as e:
+        print(f"Scoring cache write failed: {e}")
+        count("errors")
+
+
+def prune_versions(version):
+    """Drop entries from every scoring version but `version`; they can never be read again."""
+    result = database.get_scoring_cache_collection().delete_many({"version": {"$ne": version}})
+    return result.deleted_count
+
+
+def get_metrics():
+    flush_hits()
+    with metrics_lock:
+        snapshot = dict(metrics)
+    lookups = snapshot["hits"] + snapshot["misses"]
+    snapshot["hit_rate"] = snapshot["hits"] / lookups if lookups else None
+    try:
+        snapshot["entries"] = database.get_scoring_cache_collection().estimated_document_count()
+    except PyMongoError:
+        snapshot["entries"] = None
+    return snapshot
+
+
+if __name__ == "__main__":
+    if len(sys.argv) == 2 and sys.argv[1] == "prune":
+        from upload import SCORING_VERSION
+
+        database.ensure_indexes()
+        print(f"Removed {prune_versions(SCORING_VERSION)} cached scores from older scoring versions")
+    else:
+        print("Usage: python score_cache.py prune")
@@ -0,0 +1,130 @@
+import re
+import sys
+from pymongo import UpdateOne
+import database
+
+# Fields covered by keyword search and how much a hit in each counts when ranking
+SEARCH_FIELDS = {
+    "name": 10,
+    "technical_skills": 5,
+    "education": 3,
+    "notes": 1,
+}
+MAX_CANDIDATES = 200
+TOKEN_PATTERN = re.compile(r"[a-z0-9][a-z0-9+#]*")
+
+
+def tokenize(text):
+    return TOKEN_PATTERN.findall(str(text or '').lower())
+
+
+def build_search_tokens(resume_entry):
+    """Sorted, de-duplicated tokens stored on each resume for the multikey search index."""
+    tokens = set()
+    for field in SEARCH_FIELDS:
+        tokens.update(tokenize(resume_entry.get(field, '')))
+    return sorted(tokens)
+
+
+def parse_query(query):
+    """Split a query into whole terms and the trailing term still being typed (if any)."""
+    terms = tokenize(query)
+    if not terms or query[-1:].isspace():
+        return terms, None
+    return terms[:-1], terms[-1]
+
+
+def search_filter(query):
+    """Index-backed filter: every whole term must match exactly, the last term by prefix."""
+    terms, prefix = parse_query(query)
+    clauses = []
+    if terms:
+        clauses.append({"search_tokens": {"$all": terms}})
+    if prefix:
+        clauses.append({"search_tokens": {"$regex": f"^{re.escape(prefix)}"}})
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def relevance(resume_entry, terms, prefix):
+    """Weighted score: exact token hits count double, prefix hits once, name-prefix gets a boost."""
+    score = 0.0
+    for field, weight in SEARCH_FIELDS.items():
+        field_tokens = tokenize(resume_entry.get(field, ''))
+        if not field_tokens:
+            continue
+        field_set = set(field_tokens)
+        for term in terms:
+            if term in field_set:
+                score += 2 * weight
+        if prefix:
+            if prefix in field_set:
+                score += 2 * weight
+            elif any(token.startswith(prefix) for token in field_set):
+                score += weight
+
+    name_tokens = tokenize(resume_entry.get("name", ''))
+    query_tokens = terms + ([prefix] if prefix else [])
+    if name_tokens and query_tokens and name_tokens[0].startswith(query_tokens[0]):
+        score += SEARCH_FIELDS["name"]
+    return score
+
+
+def search_resumes(collection, query, filter_query=None, limit=MAX_CANDIDATES, projection=None):
+    """Return (resumes, total): the best `limit` matches for `query`, best first, and how many matched.
+
+    Every match is ranked on its searchable fields alone; only the top `limit`
+    are then fetched in full, so a common prefix cannot push better matches out.
+    """
+    keyword_filter = search_filter(query)
+    if keyword_filter is None:
+        return [], 0
+
+    combined = {"$and": [filter_query, keyword_filter]} if filter_query else keyword_filter
+    terms, prefix = parse_query(query)
+    scored = [
+        (relevance(entry, terms, prefix), entry["_id"])
+        for entry in collection.find(combined, {field: 1 for field in SEARCH_FIELDS})
+    ]
+    scored.sort(key=lambda pair: pair[0], reverse=True)
+
+    top = scored[:limit]
+    found = {entry["_id"]: entry for entry in collection.find({"_id": {"$in": [doc_id for _, doc_id in top]}}, projection)}
+    results = []
+    for score, doc_id in top:
+        # Skip anything deleted between the two reads
+        if doc_id in found:
+            found[doc_id]["search_score"] = score
+            results.append(found[doc_id])
+    return results, len(scored)
+
+
+def reindex(batch_size=500):
+    """Backfill search_tokens on resumes that are missing them or out of date."""
+    collection = database.get_resumes_collection()
+    projection = {field: 1 for field in SEARCH_FIELDS}
+    projection["search_tokens"] = 1
+
+    updates = []
+    updated = 0
+    for entry in collection.find({}, projection):
+        tokens = build_search_tokens(entry)
+        if entry.get("search_tokens") != tokens:
+            updates.append(UpdateOne({"_id": entry["_id"]}, {"$set": {"search_tokens": tokens}}))
+        if len(updates) >= batch_size:
+            updated += collection.bulk_write(updates, ordered=False).modified_count
+            updates = []
+    if updates:
+        updated += collection.bulk_write(updates, ordered=False).modified_count
+
+    print(f"Updated search tokens on {updated} resumes")
+    return updated
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "reindex":
+        print("Usage: python search.py [reindex]")
+    else:
+        database.ensure_indexes()
+        reindex()
@@ -0,0 +1,83 @@
+import os
+from cache import TTLCache
+import pagination
+
+STATS_TTL = float(os.getenv("STATS_CACHE_TTL", 15))
+HIGH_POTENTIAL_SCORE = 7
+# Score histograms use one bucket per point; 10.01 keeps perfect scores in the last bucket
+SCORE_BOUNDARIES = [0, 1, 2, 3, 4, 5, 6, 7, 8, 9, 10.01]
+
+# One entry per job plus the unscoped totals
+stats_cache = TTLCache(ttl=STATS_TTL, maxsize=256)
+
+
+def score_histogram(field):
+    return [
+        {"$bucket": {
+            "groupBy": f"${field}",
+            "boundaries": SCORE_BOUNDARIES,
+            "default": "unscored",
+            "output": {"count": {"$sum": 1}}
+        }}
+    ]
+
+
+def stats_pipeline(match=None):
+    """Single-pass aggregation computing every dashboard counter."""
+    pipeline = [{"$match": match}] if match else []
+    pipeline.append({"$facet": {
+        "totals": [
+            {"$group": {
+                "_id": None,
+                "total_candidates": {"$sum": 1},
+                "completed_screens": {"$sum": {"$cond": [{"$eq": ["$phone_screen", "completed"]}, 1, 0]}},
+                "high_potential": {"$sum": {"$cond": [{"$gte": ["$initial_score", HIGH_POTENTIAL_SCORE]}, 1, 0]}},
+                "average_initial_score": {"$avg": "$initial_score"}
+            }}
+        ],
+        "by_status": [{"$group": {"_id": "$status", "count": {"$sum": 1}}}],
+        "by_phone_screen": [{"$group": {"_id": "$phone_screen", "count": {"$sum": 1}}}],
+        "initial_score_histogram": score_histogram("initial_score"),
+        "secondary_score_histogram": score_histogram("secondary_score"),
+    }})
+    return pipeline
+
+
+def histogram_labels(buckets):
+    labelled = {}
+    for bucket in buckets:
+        key = bucket["_id"]
+        if isinstance(key, (int, float)):
+            key = str(int(key))
+        labelled[key] = bucket["count"]
+    return labelled
+
+
+def compute_stats(collection, match=None):
+    result = next(collection.aggregate(stats_pipeline(match)), {})
+    totals = (result.get("totals") or [{}])[0]
+    return {
+        "total_candidates": totals.get("total_candidates", 0),
+        "completed_screens": totals.get("completed_screens", 0),
+        "high_potential": totals.get("high_potential", 0),
+        "average_initial_score": totals.get("average_initial_score"),
+        "by_status": {str(row["_id"]): row["count"] for row in result.get("by_status", [])},
+        "by_phone_screen": {str(row["_id"]): row["count"] for row in result.get("by_phone_screen", [])},
+        "initial_score_histogram": histogram_labels(result.get("initial_score_histogram", [])),
+        "secondary_score_histogram": histogram_labels(result.get("secondary_score_histogram", [])),
+    }
+
+
+def get_stats(collection, match=None, key="all"):
+    """Dashboard stats, served from the in-process cache while fresh."""
+    return stats_cache.get_or_set(key, lambda: compute_stats(collection, match))
+
+
+def invalidate_stats():
+    stats_cache.clear()
+
+
+def invalidate_resume_caches():
+    """Drop cached counts and stats after resumes or scores change."""
+    pagination.count_cache.clear()
+    invalidate_stats()
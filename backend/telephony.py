@@ -0,0 +1,92 @@
+import os
+import threading
+import uuid
+from dotenv import load_dotenv
+from lazy import lazy
+
+load_dotenv()
+
+# "twilio" places real calls; "fake" simulates outcomes locally for tests and dry runs
+TELEPHONY_BACKEND = os.getenv("TELEPHONY_BACKEND", "twilio")
+
+# Twilio call statuses after which nothing else will happen on the call
+FINAL_STATUSES = {"completed", "busy", "no-answer", "failed", "canceled"}
+
+
+class TwilioTelephony:
+    name = "twilio"
+
+    def __init__(self):
+        from twilio.rest import Client as TwilioClient
+
+        self.client = TwilioClient(os.getenv("TWILIO_ACCOUNT_SID"), os.getenv("TWILIO_AUTH_TOKEN"))
+        self.from_number = os.getenv("TWILIO_PHONE_NUMBER")
+
+    def place_call(self, to, url):
+        """Dial `to` and fetch TwiML from `url` once answered; returns the call SID."""
+        call = self.client.calls.create(url=url, to=to, from_=self.from_number, machine_detection='Enable')
+        return call.sid
+
+    def get_call_status(self, call_sid):
+        """Return (status, answered_by) using Twilio's vocabulary."""
+        call = self.client.calls(call_sid).fetch()
+        return call.status, call.answered_by
+
+    def hang_up(self, call_sid):
+        self.client.calls(call_sid).update(status="completed")
+
+
+class FakeTelephony:
+    """Scripted stand-in for Twilio.
+
+    `outcomes` maps a phone number to the (status, answered_by) of each successive
+    attempt; numbers without a script are answered by a human. Each call reports
+    "ringing" for `ring_polls` status checks before its outcome.
+    """
+
+    name = "fake"
+
+    def __init__(self, outcomes=None, default_outcome=("completed", "human"), ring_polls=1):
+        self.outcomes = {number: list(results) for number, results in (outcomes or {}).items()}
+        self.default_outcome = default_outcome
+        self.ring_polls = ring_polls
+        self.calls = {}
+        self.hung_up = []
+        self.lock = threading.Lock()
+
+    def place_call(self, to, url):
+        call_sid = f"CAfake{uuid.uuid4().hex}"
+        with self.lock:
+            script = self.outcomes.get(to)
+            outcome = script.pop(0) if script else self.default_outcome
+            self.calls[call_sid] = {"to": to, "url": url, "outcome": outcome, "polls": 0}
+        return call_sid
+
+    def get_call_status(self, call_sid):
+        with self.lock:
+            call = self.calls[call_sid]
+            call["polls"] += 1
+            if call["polls"] <= self.ring_polls:
+                return "ringing", None
+            return call["outcome"]
+
+    def hang_up(self, call_sid):
+        with self.lock:
+            self.hung_up.append(call_sid)
+            status, answered_by = self.calls[call_sid]["outcome"]
+            if status not in FINAL_STATUSES:
+                self.calls[call_sid]["outcome"] = ("completed", answered_by)
+
+
+BACKENDS = {backend.name: backend for backend in (TwilioTelephony, FakeTelephony)}
+
+
+def create_telephony(backend=None):
+    try:
+        return BACKENDS[backend or TELEPHONY_BACKEND]()
+    except KeyError:
+        raise ValueError(f"Unknown telephony backend: {backend or TELEPHONY_BACKEND}")
+
+
+# Shared client, created on first use so importing this module needs no credentials
+get_telephony = lazy(create_telephony)
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# The backend modules import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault("LLM_BACKEND", "fake")
+os.environ.setdefault("TELEPHONY_BACKEND", "fake")
+os.environ.setdefault("TTS_BACKEND", "stub")
@@ -0,0 +1,64 @@
+import asyncio
+import pytest
+
+pytest.importorskip("fastapi")
+pytest.importorskip("twilio")
+
+import call
+import call_sessions
+import tts
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+
+def new_session():
+    # No call SID, so turns stay in memory instead of going to Mongo
+    session = call_sessions.CallSession("MZtest", None)
+    session.synthesizer = tts.StubSynthesizer(chunk_bytes=160, delay=0.005)
+    return session
+
+
+def test_reply_audio_goes_out_in_160_byte_frames():
+    import base64
+
+    async def scenario():
+        session, websocket = new_session(), FakeWebSocket()
+        await call.respond(session, websocket, "Hi Carla", 0.0)
+        return session, websocket
+
+    session, websocket = asyncio.run(scenario())
+    media = [message for message in websocket.sent if message["event"] == "media"]
+    assert media
+    assert all(len(base64.b64decode(message["media"]["payload"])) == tts.FRAME_BYTES for message in media)
+    assert websocket.sent[-1]["event"] == "mark"
+    assert [turn["role"] for turn in session.transcript] == ["user", "assistant"]
+    assert session.transcript[-1]["interrupted"] is False
+
+
+def test_barge_in_cancels_the_reply_and_clears_playback():
+    async def scenario():
+        session, websocket = new_session(), FakeWebSocket()
+        session.reply_task = asyncio.create_task(call.respond(session, websocket, "Tell me about the role", 0.0))
+        while not any(message["event"] == "media" for message in websocket.sent):
+            await asyncio.sleep(0.005)
+        assert session.is_speaking()
+        await call.barge_in(session, websocket)
+        sent_at_barge_in = len(websocket.sent)
+        await asyncio.sleep(0.05)
+        return session, websocket, sent_at_barge_in
+
+    session, websocket, sent_at_barge_in = asyncio.run(scenario())
+    assert session.reply_task.cancelled()
+    assert websocket.sent[-1] == {"event": "clear", "streamSid": "MZtest"}
+    # Nothing else is sent once playback has been cleared
+    assert len(websocket.sent) == sent_at_barge_in
+    assert session.mark_queue == []
+    assert not session.is_speaking()
+    reply = session.transcript[-1]
+    assert reply["role"] == "assistant" and reply["interrupted"] is True
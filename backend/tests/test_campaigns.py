@@ -0,0 +1,154 @@
+from datetime import datetime, timedelta
+import pytest
+import campaigns
+import database
+import telephony
+
+WEEKDAYS = {"start": "09:00", "end": "17:00", "days": [0, 1, 2, 3, 4], "timezone": "America/New_York"}
+
+
+@pytest.mark.parametrize("now, expected", [
+    # Wednesday 2026-10-14, New York is UTC-4
+    (datetime(2026, 10, 14, 13, 0), True),
+    (datetime(2026, 10, 14, 12, 59), False),
+    (datetime(2026, 10, 14, 20, 59), True),
+    (datetime(2026, 10, 14, 21, 0), False),
+    # Saturday
+    (datetime(2026, 10, 17, 15, 0), False),
+])
+def test_in_window(now, expected):
+    assert campaigns.in_window(WEEKDAYS, now) is expected
+
+
+def test_in_window_overnight():
+    window = {"start": "22:00", "end": "02:00"}
+    assert campaigns.in_window(window, datetime(2026, 10, 14, 23, 0))
+    assert campaigns.in_window(window, datetime(2026, 10, 15, 1, 30))
+    assert not campaigns.in_window(window, datetime(2026, 10, 15, 12, 0))
+
+
+def test_no_window_means_any_time():
+    assert campaigns.in_window(None, datetime(2026, 10, 17, 3, 0))
+
+
+@pytest.mark.parametrize("window", [
+    {"start": "9am"},
+    {"start": 9},
+    {"timezone": "Mars/Olympus"},
+    {"days": [7]},
+    {"days": 3},
+    {"days": ["monday"]},
+    "09:00-17:00",
+])
+def test_validate_window_rejects_bad_windows(window):
+    with pytest.raises(campaigns.CampaignError):
+        campaigns.validate_window(window)
+
+
+@pytest.mark.parametrize("criteria", [{"min_score": "high"}, {"min_gpa": [3]}, "status=new"])
+def test_candidate_filter_rejects_bad_criteria(criteria):
+    with pytest.raises(campaigns.CampaignError):
+        campaigns.candidate_filter("job", criteria)
+
+
+@pytest.mark.parametrize("status, answered_by, outcome", [
+    ("completed", "human", "answered"),
+    ("completed", None, "answered"),
+    ("in-progress", "machine_start", "machine"),
+    ("completed", "fax", "machine"),
+    ("no-answer", None, "no-answer"),
+    ("busy", None, "busy"),
+    ("failed", None, "failed"),
+    ("canceled", None, "failed"),
+    ("ringing", None, None),
+    ("in-progress", "human", None),
+])
+def test_classify(status, answered_by, outcome):
+    assert campaigns.classify(status, answered_by) == outcome
+
+
+@pytest.mark.parametrize("value", [0, -2, "many"])
+def test_max_concurrent_must_be_positive(value):
+    with pytest.raises(campaigns.CampaignError):
+        campaigns.validate_setting(value, 3, "max_concurrent", int, 1)
+
+
+def test_settings_default_only_when_missing():
+    assert campaigns.validate_setting(None, 3, "max_concurrent", int, 1) == 3
+    assert campaigns.validate_setting("5", 3, "max_concurrent", int, 1) == 5
+    assert campaigns.validate_setting(0, 60.0, "retry_delay_minutes", float, 0) == 0.0
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "get_client", lambda: client)
+    return client
+
+
+def add_candidates(count):
+    job_id = str(database.get_jobs_collection().insert_one({"job_title": "Engineer", "job_description": "Build things"}).inserted_id)
+    for uid in range(1, count + 1):
+        database.get_resumes_collection().insert_one({"UID": uid, "name": f"Candidate {uid}", "phone": f"5550{100 + uid}"})
+        database.get_candidate_scores_collection().insert_one({"UID": uid, "job_id": job_id, "status": "new"})
+    return job_id
+
+
+def test_schedulers_side_by_side_stay_under_max_concurrent(fake_db, monkeypatch):
+    # The fifth candidate's line is busy the first time
+    fake = telephony.FakeTelephony(outcomes={"5550105": [("busy", None)]})
+    monkeypatch.setattr(telephony, "get_telephony", lambda: fake)
+    job_id = add_candidates(7)
+
+    campaign_id = campaigns.create_campaign("Screens", job_id, max_concurrent=2, retry_delay_minutes=0)
+    now = datetime.utcnow()
+    for _ in range(10):
+        now += timedelta(seconds=10)
+        # Two scheduler passes over the same state, as with two processes
+        campaigns.tick(now)
+        campaigns.tick(now)
+        campaign = database.get_campaigns_collection().find_one({"_id": campaign_id})
+        dialing = database.get_campaign_targets_collection().count_documents({"campaign_id": campaign_id, "status": "dialing"})
+        assert campaign["in_flight"] == dialing <= 2
+
+    campaign = campaigns.get_campaign(campaign_id)
+    assert campaign["status"] == "completed"
+    assert campaign["targets"] == {"completed": 7}
+    retried = database.get_campaign_targets_collection().find_one({"candidate_uid": 5})
+    assert [entry["outcome"] for entry in retried["outcomes"]] == ["busy", "answered"]
+    assert len(fake.calls) == 8
+
+
+def test_failed_dials_give_their_slot_back(fake_db, monkeypatch):
+    fake = telephony.FakeTelephony()
+
+    def unreachable(to, url):
+        raise RuntimeError("carrier down")
+
+    fake.place_call = unreachable
+    monkeypatch.setattr(telephony, "get_telephony", lambda: fake)
+    job_id = add_candidates(3)
+
+    campaign_id = campaigns.create_campaign("Screens", job_id, max_concurrent=3, max_attempts=1)
+    campaigns.tick(datetime.utcnow())
+    campaign = campaigns.get_campaign(campaign_id)
+    assert campaign["in_flight"] == 0
+    assert campaign["targets"] == {"exhausted": 3}
+
+
+def test_cancel_hangs_up_calls_in_progress(fake_db, monkeypatch):
+    fake = telephony.FakeTelephony(ring_polls=10)
+    monkeypatch.setattr(telephony, "get_telephony", lambda: fake)
+    job_id = add_candidates(4)
+
+    campaign_id = campaigns.create_campaign("Screens", job_id, max_concurrent=2)
+    campaigns.tick(datetime.utcnow())
+    assert campaigns.get_campaign(campaign_id)["in_flight"] == 2
+
+    assert campaigns.cancel_campaign(campaign_id)
+    campaign = campaigns.get_campaign(campaign_id)
+    assert campaign["in_flight"] == 0
+    assert campaign["targets"] == {"cancelled": 4}
+    assert sorted(fake.hung_up) == sorted(fake.calls)
+    assert not campaigns.cancel_campaign(campaign_id)
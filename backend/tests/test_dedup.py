@@ -0,0 +1,87 @@
+import pytest
+import database
+import dedup
+
+TEMPLATE = """{name}
+{email} | {phone} | Atlanta, GA
+
+Education
+Georgia Institute of Technology, B.S. Computer Science, GPA 3.7
+
+Experience
+Software Engineering Intern, Acme Corp. Built REST APIs in Node.js and React,
+wrote integration tests, and moved the nightly reports to AWS Lambda.
+Teaching Assistant, Data Structures. Ran weekly recitations for 40 students.
+
+Skills
+JavaScript, TypeScript, React, Node.js, SQL, Git, AWS, Python
+"""
+
+ALICE = {"name": "Alice Johnson", "email": "alice.j@example.com", "phone": "(404) 555-0101"}
+BOB = {"name": "Bob Lee", "email": "bob.lee@example.com", "phone": "404-555-0199"}
+
+
+def resume(person, **changes):
+    return TEMPLATE.format(**dict(person, **changes))
+
+
+def test_contact_details_normalise_emails_and_phones():
+    details = dedup.contact_details("Reach me at Alice.J@Example.com or +1 (404) 555-0101.")
+    assert details == {"alice.j@example.com", "4045550101"}
+
+
+@pytest.mark.parametrize("text, expected", [
+    (resume(ALICE), True),
+    # Changed email and phone, same full name
+    (resume(ALICE, email="aj@work.example", phone="678 555 0000"), True),
+    # Renamed, same email
+    (resume(ALICE, name="Alice J."), True),
+    (resume(BOB), False),
+])
+def test_same_person(text, expected):
+    assert dedup.same_person(dict(ALICE, UID=1), text) is expected
+
+
+def test_single_word_names_do_not_identify():
+    assert not dedup.same_person({"name": "Alice"}, "Alice in Wonderland")
+
+
+@pytest.fixture
+def fake_db(monkeypatch):
+    mongomock = pytest.importorskip("mongomock")
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "get_client", lambda: client)
+    return client
+
+
+def store(uid, person, text, file_hash):
+    database.get_resumes_collection().insert_one(dict(person, UID=uid, file_hash=file_hash, **dedup.fingerprint_fields(text)))
+
+
+def test_near_match_from_the_same_template_is_a_new_applicant(fake_db):
+    store(1, ALICE, resume(ALICE), "alice")
+    bob = resume(BOB)
+    fingerprint = dedup.simhash(bob)
+    assert dedup.distance(fingerprint, dedup.simhash(resume(ALICE))) <= dedup.MAX_DISTANCE
+    assert dedup.find_duplicate("bob", fingerprint, bob) is None
+
+
+def test_near_match_of_the_same_candidate_is_a_duplicate(fake_db):
+    store(1, ALICE, resume(ALICE), "alice")
+    edited = resume(ALICE).replace("40 students", "45 students")
+    assert dedup.find_duplicate("alice-v2", dedup.simhash(edited), edited)["UID"] == 1
+
+
+def test_exact_file_match_needs_no_identity_check(fake_db):
+    store(1, ALICE, resume(ALICE), "alice")
+    assert dedup.find_duplicate("alice", dedup.simhash(resume(BOB)), resume(BOB))["UID"] == 1
+
+
+def test_batch_index_needs_shared_contact_details():
+    index = dedup.BatchIndex()
+    alice = resume(ALICE)
+    index.add("alice", dedup.simhash(alice), "alice.pdf", alice)
+    edited = alice.replace("40 students", "45 students")
+    assert index.find("alice-v2", dedup.simhash(edited), edited) == "alice.pdf"
+    bob = resume(BOB)
+    assert index.find("bob", dedup.simhash(bob), bob) is None
@@ -0,0 +1,122 @@
+import threading
+import pytest
+import llm
+from fake_llm import FakeModel
+
+backoff = llm.backoff
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter(monkeypatch):
+    monkeypatch.setattr(llm, "limiter", llm.RateLimiter(6000, 10000000))
+    # Retries happen immediately
+    monkeypatch.setattr(llm, "backoff", lambda attempt: 0)
+    return llm.limiter
+
+
+def test_retries_rate_limit_errors_until_success():
+    model = FakeModel(failures=2)
+    response = llm.generate("hello", model=model, coalesce=False)
+    assert response.text == "Fake response to: hello"
+    assert model.calls == 3
+
+
+def test_gives_up_after_max_retries(monkeypatch):
+    monkeypatch.setattr(llm, "MAX_RETRIES", 2)
+    model = FakeModel(failures=10)
+    with pytest.raises(Exception, match="Fake quota exceeded"):
+        llm.generate("hello", model=model, coalesce=False)
+    assert model.calls == 3
+
+
+def test_backoff_grows_and_is_capped(monkeypatch):
+    monkeypatch.setattr(llm.random, "uniform", lambda low, high: high)
+    monkeypatch.setattr(llm, "BACKOFF_BASE", 1.0)
+    monkeypatch.setattr(llm, "BACKOFF_MAX", 5.0)
+    assert [backoff(attempt) for attempt in range(5)] == [1.0, 2.0, 4.0, 5.0, 5.0]
+
+
+def test_backoff_sleeps_between_attempts(monkeypatch):
+    monkeypatch.setattr(llm, "backoff", lambda attempt: 0.5 * (attempt + 1))
+    sleeps = []
+    monkeypatch.setattr(llm.time, "sleep", sleeps.append)
+    llm.generate("hello", model=FakeModel(failures=2), coalesce=False)
+    assert sleeps == [0.5, 1.0]
+
+
+def test_rate_limit_errors_throttle_the_limiter(fresh_limiter):
+    llm.generate("hello", model=FakeModel(failures=2), coalesce=False)
+    # Halved twice, then nudged back up by the successful call
+    assert fresh_limiter.scale == pytest.approx(0.25 + 0.05)
+
+
+def test_throttle_never_goes_below_the_minimum(fresh_limiter):
+    for _ in range(20):
+        fresh_limiter.throttle()
+    assert fresh_limiter.scale == llm.MIN_RATE_SCALE
+
+
+def test_other_retryable_errors_do_not_throttle(fresh_limiter):
+    class ServiceUnavailable(Exception):
+        pass
+
+    model = FakeModel(failures=1, error=ServiceUnavailable)
+    llm.generate("hello", model=model, coalesce=False)
+    assert model.calls == 2
+    assert fresh_limiter.scale == 1.0
+
+
+def test_non_retryable_errors_are_raised_at_once():
+    model = FakeModel(failures=1, error=ValueError)
+    with pytest.raises(ValueError):
+        llm.generate("hello", model=model, coalesce=False)
+    assert model.calls == 1
+
+
+def test_identical_concurrent_calls_are_coalesced():
+    model = FakeModel(latency=0.3)
+    start = threading.Barrier(5)
+    results = []
+
+    def worker():
+        start.wait()
+        results.append(llm.generate("same prompt", model=model))
+
+    threads = [threading.Thread(target=worker) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert len(results) == 5 and all(result is results[0] for result in results)
+    assert not llm.inflight
+
+
+def test_different_prompts_are_not_coalesced():
+    model = FakeModel()
+    llm.generate("first", model=model)
+    llm.generate("second", model=model)
+    assert model.calls == 2
+
+
+def test_coalesced_callers_share_the_error():
+    model = FakeModel(latency=0.3, failures=1, error=ValueError)
+    start = threading.Barrier(3)
+    errors = []
+
+    def worker():
+        start.wait()
+        try:
+            llm.generate("same prompt", model=model)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=worker) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 1
+    assert len(errors) == 3
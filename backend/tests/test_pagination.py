@@ -0,0 +1,68 @@
+import pytest
+from bson import ObjectId
+import pagination
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def resumes():
+    collection = mongomock.MongoClient().db.resumes
+    # Unscored resumes have no initial_score at all, or an explicit null
+    for i, score in enumerate([9, "missing", 7, None, "missing", 7, 3]):
+        resume = {"_id": ObjectId(), "name": f"N{i}"}
+        if score != "missing":
+            resume["initial_score"] = score
+        collection.insert_one(resume)
+    return collection
+
+
+def walk(collection, sort_name, per_page=2):
+    """Every page forwards, then every page backwards from the last one."""
+    forwards, cursor = [], None
+    while True:
+        documents, next_cursor, prev_cursor = pagination.paginate(collection, {}, sort_name, cursor, "next", per_page)
+        forwards += [doc["name"] for doc in documents]
+        if next_cursor is None:
+            break
+        cursor = next_cursor
+    backwards, cursor = [], prev_cursor
+    while cursor:
+        documents, _, cursor = pagination.paginate(collection, {}, sort_name, cursor, "prev", per_page)
+        backwards = [doc["name"] for doc in documents] + backwards
+    return forwards, backwards
+
+
+@pytest.mark.parametrize("sort_name", ["score", "score_asc", "newest", "oldest"])
+def test_keyset_pages_cover_every_resume_including_unscored(resumes, sort_name):
+    expected = [doc["name"] for doc in resumes.find().sort(pagination.SORT_ORDERS[sort_name])]
+    forwards, backwards = walk(resumes, sort_name)
+    assert forwards == expected
+    # The last page (one resume) is not revisited going back
+    assert backwards == expected[:-1]
+
+
+def test_unscored_resumes_come_last_by_score(resumes):
+    forwards, _ = walk(resumes, "score")
+    assert forwards[:4] == ["N0", "N5", "N2", "N6"]
+    assert sorted(forwards[4:]) == ["N1", "N3", "N4"]
+
+
+def test_cursor_for_another_sort_is_rejected(resumes):
+    _, next_cursor, _ = pagination.paginate(resumes, {}, "score", None, "next", 2)
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.paginate(resumes, {}, "newest", next_cursor, "next", 2)
+
+
+def test_skip_page_hands_over_to_keyset_pages(resumes):
+    documents, next_cursor = pagination.skip_page(resumes, {}, "score", page=2, limit=2)
+    following, _, _ = pagination.paginate(resumes, {}, "score", next_cursor, "next", 2)
+    expected = [doc["name"] for doc in resumes.find().sort(pagination.SORT_ORDERS["score"])]
+    assert [doc["name"] for doc in documents + following] == expected[2:6]
+
+
+def test_skip_page_refuses_deep_pages(resumes, monkeypatch):
+    monkeypatch.setattr(pagination, "MAX_SKIP", 4)
+    assert len(pagination.skip_page(resumes, {}, "oldest", page=3, limit=2)[0]) == 2
+    with pytest.raises(pagination.InvalidCursor):
+        pagination.skip_page(resumes, {}, "oldest", page=4, limit=2)
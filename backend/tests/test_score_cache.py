@@ -0,0 +1,43 @@
+import pytest
+import database
+import score_cache
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    client = mongomock.MongoClient()
+    monkeypatch.setattr(database, "get_client", lambda: client)
+    monkeypatch.setattr(score_cache, "pending_hits", {})
+    return database.get_scoring_cache_collection()
+
+
+def test_hits_are_read_only_until_flushed(cache, monkeypatch):
+    monkeypatch.setattr(score_cache, "HIT_FLUSH_SIZE", 2)
+    score_cache.put("resume one", "job", "v1", {"initial_score": 7})
+    score_cache.put("resume two", "job", "v1", {"initial_score": 5})
+
+    assert score_cache.get("resume one", "job", "v1") == {"initial_score": 7}
+    assert score_cache.get("resume one", "job", "v1") == {"initial_score": 7}
+    assert cache.find_one({"_id": score_cache.cache_key("resume one", "job", "v1")})["hits"] == 0
+
+    # A second distinct key fills the batch and writes both counts at once
+    score_cache.get("resume two", "job", "v1")
+    entries = {entry["resume_hash"]: entry for entry in cache.find()}
+    assert entries[score_cache.text_hash("resume one")]["hits"] == 2
+    assert entries[score_cache.text_hash("resume two")]["hits"] == 1
+    assert score_cache.pending_hits == {}
+
+
+def test_misses_do_not_count_hits(cache):
+    assert score_cache.get("unknown", "job", "v1") is None
+    assert score_cache.pending_hits == {}
+
+
+def test_prune_versions_keeps_only_the_current_version(cache):
+    score_cache.put("resume", "job", "v1", {"initial_score": 7})
+    score_cache.put("resume", "job", "v2", {"initial_score": 8})
+    assert score_cache.prune_versions("v2") == 1
+    assert score_cache.get("resume", "job", "v1") is None
+    assert score_cache.get("resume", "job", "v2") == {"initial_score": 8}
@@ -0,0 +1,35 @@
+import pytest
+import search
+
+mongomock = pytest.importorskip("mongomock")
+
+
+@pytest.fixture
+def resumes():
+    collection = mongomock.MongoClient().db.resumes
+    entries = [{"UID": uid, "name": f"Candidate {uid}", "notes": "Java backend work"} for uid in range(250)]
+    # The best match for "jav" is inserted last, well past the first MAX_CANDIDATES
+    entries.append({"UID": 250, "name": "Javier Ruiz", "technical_skills": "Java, JavaScript"})
+    for entry in entries:
+        entry["search_tokens"] = search.build_search_tokens(entry)
+    collection.insert_many(entries)
+    return collection
+
+
+def test_best_match_is_ranked_before_the_limit(resumes):
+    ranked, total = search.search_resumes(resumes, "jav", limit=5)
+    assert total == 251
+    assert len(ranked) == 5
+    assert ranked[0]["UID"] == 250
+    assert ranked[0]["search_score"] > ranked[1]["search_score"]
+
+
+def test_filters_and_projection_apply(resumes):
+    ranked, total = search.search_resumes(resumes, "java ", {"UID": {"$lt": 3}}, projection={"UID": 1})
+    assert total == 3
+    assert sorted(entry["UID"] for entry in ranked) == [0, 1, 2]
+    assert all(set(entry) == {"_id", "UID", "search_score"} for entry in ranked)
+
+
+def test_empty_query_matches_nothing(resumes):
+    assert search.search_resumes(resumes, "  ") == ([], 0)
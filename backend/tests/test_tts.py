@@ -0,0 +1,46 @@
+import asyncio
+import tts
+
+
+async def collect(chunks):
+    return [frame async for frame in chunks]
+
+
+def test_stub_audio_is_reframed_into_160_byte_frames():
+    synthesizer = tts.StubSynthesizer(bytes_per_char=37, chunk_bytes=100)
+    frames = asyncio.run(collect(tts.frames(synthesizer.stream("Hello there."))))
+    assert frames and all(len(frame) == tts.FRAME_BYTES for frame in frames)
+    # 12 chars * 37 bytes = 444 bytes: two full frames and one padded with silence
+    assert len(frames) == 3
+    assert frames[-1].endswith(tts.MULAW_SILENCE * (3 * tts.FRAME_BYTES - 444))
+    assert synthesizer.spoken == ["Hello there."]
+
+
+def test_frames_closes_the_source_when_abandoned():
+    closed = []
+
+    async def source():
+        try:
+            while True:
+                yield b"\x00" * 500
+        finally:
+            closed.append(True)
+
+    async def take_two():
+        audio = tts.frames(source())
+        taken = [await audio.__anext__(), await audio.__anext__()]
+        await audio.aclose()
+        return taken
+
+    assert len(asyncio.run(take_two())) == 2
+    assert closed == [True]
+
+
+def test_create_synthesizer_rejects_unknown_backends():
+    assert isinstance(tts.create_synthesizer("stub"), tts.StubSynthesizer)
+    try:
+        tts.create_synthesizer("nope")
+    except ValueError as e:
+        assert "nope" in str(e)
+    else:
+        raise AssertionError("expected ValueError")
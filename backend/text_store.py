@@ -0,0 +1,116 @@
+import hashlib
+import os
+import sys
+from datetime import datetime
+from pymongo import UpdateOne
+import database
+from cache import TTLCache
+from pdf_text import extract_pdf_text
+
+RESUMES_DIR = 'resumes'
+
+# Hot texts stay in memory so follow-up chat turns skip even the Mongo round-trip
+text_cache = TTLCache(ttl=float(os.getenv("RESUME_TEXT_CACHE_TTL", 600)), maxsize=256)
+
+
+def hash_file(path):
+    """SHA-256 of a file's bytes, used as the content address of its extracted text."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def store_resume_texts(entries):
+    """Upsert (file_hash, text) pairs; existing texts for a hash are left untouched."""
+    entries = [(file_hash, text) for file_hash, text in entries if file_hash]
+    if not entries:
+        return
+    now = datetime.utcnow()
+    database.get_resume_texts_collection().bulk_write([
+        UpdateOne({"_id": file_hash}, {"$setOnInsert": {"text": text, "created_at": now}}, upsert=True)
+        for file_hash, text in entries
+    ], ordered=False)
+    for file_hash, text in entries:
+        text_cache.set(file_hash, text)
+
+
+def load_resume_text(file_hash):
+    text = text_cache.get(file_hash)
+    if text is None:
+        stored = database.get_resume_texts_collection().find_one({"_id": file_hash}, {"text": 1})
+        if stored is None:
+            return None
+        text = stored["text"]
+        text_cache.set(file_hash, text)
+    return text
+
+
+def get_resume_text(candidate):
+    """Return the candidate's resume text, parsing the PDF only if it was never stored."""
+    file_hash = candidate.get("file_hash")
+    if file_hash:
+        text = load_resume_text(file_hash)
+        if text is not None:
+            return text
+
+    candidate_file = candidate.get("file_name")
+    if not candidate_file:
+        return None
+
+    path = os.path.join(RESUMES_DIR, candidate_file)
+    file_hash = hash_file(path)
+    text = load_resume_text(file_hash)
+    if text is None:
+        text = extract_pdf_text(path)
+        store_resume_texts([(file_hash, text)])
+    if candidate.get("_id") is not None:
+        database.get_resumes_collection().update_one({"_id": candidate["_id"]}, {"$set": {"file_hash": file_hash}})
+    return text
+
+
+def backfill(batch_size=100):
+    """Extract and store the text of every PDF in resumes/ and link candidates to it."""
+    texts = database.get_resume_texts_collection()
+    hashes_by_file = {}
+    pending = []
+    stored = 0
+
+    for file_name in sorted(os.listdir(RESUMES_DIR)):
+        if not file_name.lower().endswith('.pdf'):
+            continue
+        path = os.path.join(RESUMES_DIR, file_name)
+        file_hash = hash_file(path)
+        hashes_by_file[file_name] = file_hash
+        if texts.count_documents({"_id": file_hash}, limit=1):
+            continue
+        try:
+            pending.append((file_hash, extract_pdf_text(path)))
+        except Exception as e:
+            print(f"Could not extract {file_name}: {e}")
+            continue
+        if len(pending) >= batch_size:
+            store_resume_texts(pending)
+            stored += len(pending)
+            pending = []
+    if pending:
+        store_resume_texts(pending)
+        stored += len(pending)
+
+    updates = [
+        UpdateOne({"_id": candidate["_id"]}, {"$set": {"file_hash": hashes_by_file[candidate["file_name"]]}})
+        for candidate in database.get_resumes_collection().find({"file_name": {"$exists": True}}, {"file_name": 1, "file_hash": 1})
+        if candidate["file_name"] in hashes_by_file and candidate.get("file_hash") != hashes_by_file[candidate["file_name"]]
+    ]
+    if updates:
+        database.get_resumes_collection().bulk_write(updates, ordered=False)
+
+    print(f"Stored text for {stored} PDFs, linked {len(updates)} candidates")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] != "backfill":
+        print("Usage: python text_store.py [backfill]")
+    else:
+        backfill()
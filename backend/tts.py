@@ -0,0 +1,143 @@
+import asyncio
+import json
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# "deepgram" streams real speech; "stub" produces silence locally for tests and offline runs
+TTS_BACKEND = os.getenv("TTS_BACKEND", "deepgram")
+DEEPGRAM_TTS_MODEL = os.getenv("DEEPGRAM_TTS_MODEL", "aura-asteria-en")
+DEEPGRAM_TTS_URL = "wss://api.deepgram.com/v1/speak?model={model}&encoding=mulaw&sample_rate=8000"
+CLEAR_TIMEOUT = float(os.getenv("TTS_CLEAR_TIMEOUT", 2.0))
+
+# Twilio media frames: 20 ms of 8 kHz mono mu-law
+FRAME_BYTES = 160
+MULAW_SILENCE = b"\xff"
+
+
+class DeepgramSynthesizer:
+    """One streaming Deepgram Speak connection per call, opened on first use.
+
+    Each stream() sends one piece of text and yields mu-law audio until Deepgram
+    reports it flushed; cancel() discards whatever is still being synthesized.
+    """
+
+    name = "deepgram"
+
+    def __init__(self, model=DEEPGRAM_TTS_MODEL):
+        self.url = DEEPGRAM_TTS_URL.format(model=model)
+        self.ws = None
+        self.lock = asyncio.Lock()
+        self.pending = False
+        self.clearing = False
+
+    async def connect(self):
+        import websockets
+
+        if self.ws is None:
+            self.ws = await websockets.connect(
+                self.url,
+                extra_headers={"Authorization": f"Token {os.getenv('DEEPGRAM_API_KEY')}"}
+            )
+        return self.ws
+
+    async def drain_cleared(self):
+        """Skip audio left over from a cancelled stream, up to Deepgram's Cleared reply."""
+        try:
+            async with asyncio.timeout(CLEAR_TIMEOUT):
+                async for message in self.ws:
+                    if isinstance(message, str) and json.loads(message).get("type") == "Cleared":
+                        break
+        except TimeoutError:
+            # Start over on a fresh connection rather than risk replaying stale audio
+            await self.close()
+        self.clearing = False
+
+    async def stream(self, text):
+        async with self.lock:
+            ws = await self.connect()
+            if self.clearing:
+                await self.drain_cleared()
+                ws = await self.connect()
+            await ws.send(json.dumps({"type": "Speak", "text": text}))
+            await ws.send(json.dumps({"type": "Flush"}))
+            self.pending = True
+            try:
+                async for message in ws:
+                    if isinstance(message, bytes):
+                        yield message
+                    elif json.loads(message).get("type") == "Flushed":
+                        break
+                self.pending = False
+            finally:
+                # Abandoned mid-sentence (e.g. barge-in): make sure its audio never reaches the next one
+                if self.pending:
+                    await self.cancel()
+
+    async def cancel(self):
+        if self.ws is not None and self.pending:
+            await self.ws.send(json.dumps({"type": "Clear"}))
+            self.pending = False
+            self.clearing = True
+
+    async def close(self):
+        if self.ws is not None:
+            ws, self.ws = self.ws, None
+            try:
+                await ws.close()
+            except Exception:
+                pass
+
+
+class StubSynthesizer:
+    """Streams silence whose length is proportional to the text; no network needed."""
+
+    name = "stub"
+
+    def __init__(self, bytes_per_char=400, chunk_bytes=800, delay=0.0):
+        self.bytes_per_char = bytes_per_char
+        self.chunk_bytes = chunk_bytes
+        self.delay = delay
+        self.spoken = []
+
+    async def stream(self, text):
+        self.spoken.append(text)
+        remaining = len(text) * self.bytes_per_char
+        while remaining > 0:
+            if self.delay:
+                await asyncio.sleep(self.delay)
+            size = min(self.chunk_bytes, remaining)
+            remaining -= size
+            yield MULAW_SILENCE * size
+
+    async def cancel(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+SYNTHESIZERS = {synthesizer.name: synthesizer for synthesizer in (DeepgramSynthesizer, StubSynthesizer)}
+
+
+def create_synthesizer(backend=None):
+    try:
+        return SYNTHESIZERS[backend or TTS_BACKEND]()
+    except KeyError:
+        raise ValueError(f"Unknown TTS backend: {backend or TTS_BACKEND}")
+
+
+async def frames(chunks):
+    """Re-chunk an audio stream into FRAME_BYTES frames, padding the last with silence."""
+    buffer = bytearray()
+    try:
+        async for chunk in chunks:
+            buffer.extend(chunk)
+            while len(buffer) >= FRAME_BYTES:
+                yield bytes(buffer[:FRAME_BYTES])
+                del buffer[:FRAME_BYTES]
+    finally:
+        await chunks.aclose()
+    if buffer:
+        yield bytes(buffer).ljust(FRAME_BYTES, MULAW_SILENCE)
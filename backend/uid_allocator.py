@@ -0,0 +1,119 @@
+import os
+import threading
+from dotenv import load_dotenv
+from pymongo import ReturnDocument
+import database
+
+load_dotenv()
+
+COUNTER_ID = "resume_uid"
+UID_FILE = 'uid_count.txt'
+BLOCK_SIZE = int(os.getenv("UID_BLOCK_SIZE", 20))
+
+
+def seed_counter():
+    """Make sure the counter exists and is past every UID already handed out.
+
+    The counter stores the last allocated UID. `$max` keeps this idempotent, so
+    it is safe to run from every worker and to re-run after the migration.
+    """
+    last_uid = 0
+
+    # uid_count.txt held the *next* UID to hand out
+    if os.path.exists(UID_FILE):
+        with open(UID_FILE, 'r') as f:
+            content = f.read().strip()
+        if content:
+            last_uid = int(content) - 1
+
+    highest = database.get_resumes_collection().find_one({"UID": {"$type": "number"}}, {"UID": 1}, sort=[("UID", -1)])
+    if highest:
+        last_uid = max(last_uid, int(highest["UID"]))
+
+    database.get_counters_collection().update_one({"_id": COUNTER_ID}, {"$max": {"seq": last_uid}}, upsert=True)
+    return last_uid
+
+
+def reserve_uids(count):
+    """Atomically reserve `count` consecutive UIDs and return the first one."""
+    counter = database.get_counters_collection().find_one_and_update(
+        {"_id": COUNTER_ID},
+        {"$inc": {"seq": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["seq"] - count + 1
+
+
+class UIDAllocator:
+    """Hands out UIDs from blocks reserved in MongoDB so most allocations skip the round-trip."""
+
+    def __init__(self, block_size=BLOCK_SIZE):
+        self.block_size = block_size
+        self.lock = threading.Lock()
+        self.next_uid = 0
+        self.block_end = 0
+        self.seeded = False
+
+    def allocate(self):
+        with self.lock:
+            if not self.seeded:
+                seed_counter()
+                self.seeded = True
+            if self.next_uid >= self.block_end:
+                self.next_uid = reserve_uids(self.block_size)
+                self.block_end = self.next_uid + self.block_size
+            uid = self.next_uid
+            self.next_uid += 1
+            return uid
+
+    def reserve(self, count):
+        """Reserve a contiguous range for a batch insert, bypassing the local block."""
+        with self.lock:
+            if not self.seeded:
+                seed_counter()
+                self.seeded = True
+        return reserve_uids(count)
+
+
+allocator = UIDAllocator()
+
+
+def backfill_missing_uids():
+    """Give resumes without a numeric UID (e.g. created by hand before UIDs were assigned there) one from the counter."""
+    resumes = database.get_resumes_collection()
+    missing = [doc["_id"] for doc in resumes.find({"UID": {"$not": {"$type": "number"}}}, {"_id": 1})]
+    if not missing:
+        return 0
+    first_uid = reserve_uids(len(missing))
+    for offset, doc_id in enumerate(missing):
+        resumes.update_one({"_id": doc_id}, {"$set": {"UID": first_uid + offset}})
+    return len(missing)
+
+
+def migrate():
+    """One-time migration from uid_count.txt to the MongoDB counter."""
+    last_uid = seed_counter()
+    counter = database.get_counters_collection().find_one({"_id": COUNTER_ID})
+    print(f"Seeded UID counter from {UID_FILE} and existing documents (last UID {last_uid}, counter at {counter['seq']})")
+
+    # Seeding first keeps backfilled UIDs above every existing one
+    backfilled = backfill_missing_uids()
+    if backfilled:
+        print(f"Assigned UIDs to {backfilled} resumes that had none")
+
+    duplicates = list(database.get_resumes_collection().aggregate([
+        {"$group": {"_id": "$UID", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": 1}}}
+    ]))
+    if duplicates:
+        print(f"Cannot create unique UID index, duplicate UIDs found: {[d['_id'] for d in duplicates]}")
+        return False
+
+    database.ensure_indexes()
+    print("Unique index on UID is in place")
+    return True
+
+
+if __name__ == "__main__":
+    migrate()
@@ -1,48 +1,51 @@
-from PyPDF2 import PdfReader
-import re
 import os
 from pydantic import BaseModel
 from dotenv import load_dotenv
 from typing import Dict
-from pymongo import MongoClient
-import google.generativeai as genai
+import gemini
+import llm
+from uid_allocator import allocator
+import database
+from search import build_search_tokens
+from stats import invalidate_resume_caches
+from pinecone_utils import vectorize_resumes
+import text_store
+import dedup
+import score_cache
+import openings
+from pdf_text import extract_pdf_text
 import json
 
 load_dotenv()
 
-# Configure Gemini API
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
-gemini_model = genai.GenerativeModel('gemini-1.5-flash')
+def extract_resume(pdf_path):
+    """Hash and extract a PDF; safe to run in a worker process."""
+    return text_store.hash_file(pdf_path), extract_pdf_text(pdf_path)
 
-# PDF Text Extraction
-def extract_pdf_text(pdf_path):
-    reader = PdfReader(pdf_path)
-    text = ""
-    for page in reader.pages:
-        text += page.extract_text()
-    text = re.sub(r'\s+', ' ', text).strip()
-    return text
-
-
-def save_pdf(source_path, target_folder, new_name):
-    os.makedirs(target_folder, exist_ok=True)
 
+def unique_pdf_name(target_folder, new_name, taken=()):
+    """A file name in `target_folder` not used on disk or in `taken` (names picked but not written yet)."""
     new_name = new_name.replace(" ", "_")
     if not new_name.endswith('.pdf'):
         new_name += '.pdf'
 
     base, ext = os.path.splitext(new_name)
     counter = 1
-    target_path = os.path.join(target_folder, new_name)
-
-    while os.path.exists(target_path):
+    while new_name in taken or os.path.exists(os.path.join(target_folder, new_name)):
         new_name = f"{base}_{counter}{ext}"
-        target_path = os.path.join(target_folder, new_name)
         counter += 1
+    return new_name
 
-    with open(source_path, 'rb') as src, open(target_path, 'wb') as dst:
+
+def copy_pdf(source_path, target_folder, name):
+    os.makedirs(target_folder, exist_ok=True)
+    with open(source_path, 'rb') as src, open(os.path.join(target_folder, name), 'wb') as dst:
         dst.write(src.read())
 
+
+def save_pdf(source_path, target_folder, new_name):
+    new_name = unique_pdf_name(target_folder, new_name)
+    copy_pdf(source_path, target_folder, new_name)
     return new_name
 
 
@@ -59,103 +62,166 @@ class Result(BaseModel):
     technical_skills: str
 
 
-def process_pdf(pdf_path):
+SCORING_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string"},
+        "graduation_year": {"type": "integer"},
+        "years_of_experience": {"type": "integer"},
+        "education": {"type": "string"},
+        "gpa": {"type": "number"},
+        "email": {"type": "string"},
+        "phone": {"type": "string"},
+        "initial_score": {"type": "number"},
+        "notes": {"type": "string"},
+        "technical_skills": {"type": "string"}
+    },
+    "required": list(Result.__annotations__.keys())
+}
+
+# Bump whenever the scoring prompt or rubric changes so cached scores are not reused
+SCORING_PROMPT_VERSION = "1"
+SCORING_VERSION = score_cache.scoring_version(SCORING_PROMPT_VERSION, gemini.DEFAULT_MODEL, SCORING_SCHEMA)
+
+
+def scored_with(job):
+    """Tag stored next to a score so re-scoring can tell which job text and version produced it."""
+    return f"{score_cache.text_hash(job)}:{SCORING_VERSION}"
+
+
+def score_resume(resume_text, job):
+    """Ask Gemini to extract the applicant's details and score them against the job."""
+    system_prompt = f"""
+    You are part of a HR recruiting team whose job is to extract information from resumes and give an initial score to applicants based on just their resumes.
+    
+    This is the description of the job that you should use to grade the applicants:
+    {job}
+    
+    The Education section should be filled out in the following format: 
+    "<Major> - <University>"
+    
+    Scoring Rubric:
+    - 2 points for relevant work experience that directly aligns with the position's requirements, demonstrating progressive responsibility and quantifiable achievements
+    - 2 points for education and certifications that match or exceed the role's prerequisites
+    - 2 points for technical skills and competencies specifically mentioned in the job description
+    - 1.5 points for clear, professional formatting with no errors, consistent styling, and easy readability
+    - 1.5 points for compelling accomplishment statements that use strong action verbs and include measurable results or impacts
+    - 1 point for additional relevant elements like volunteer work, leadership roles, or professional memberships
+    
+    Total score will always be out of 10 points.
+
+    Additionally, summarize and add notes of anything that can help the recruiter make a decision about the applicant.
+    """
+
+    user_prompt = f"""
+    Extract and score this resume:
+    {resume_text}
+    """
+
+    response = llm.generate(
+        [{"role": "user", "parts": [system_prompt, user_prompt]}],
+        priority=llm.BATCH,
+        generation_config={
+            "response_mime_type": "application/json",
+            "response_schema": SCORING_SCHEMA
+        }
+    )
+
+    # Parse JSON manually since we don't have a native model
+    return json.loads(response.text.strip())
+
+
+def cached_score_resume(resume_text, job):
+    """score_resume, but identical (resume, job, prompt version) inputs never hit the LLM twice."""
+    cached = score_cache.get(resume_text, job, SCORING_VERSION)
+    if cached is not None:
+        return cached
+    applicant_data = score_resume(resume_text, job)
+    score_cache.put(resume_text, job, SCORING_VERSION, applicant_data)
+    return applicant_data
+
+
+def build_applicant_info(applicant_data, pdf_name, uid, file_hash=None, fingerprint=None):
+    """Shape the scored resume into the document stored in the data collection."""
+    applicant = type('obj', (object,), applicant_data)
+    applicant_info = {
+        "name": applicant.name,
+        "graduation_year": applicant.graduation_year,
+        "education": applicant.education,
+        "yoe": applicant.years_of_experience,
+        "gpa": applicant.gpa,
+        "email": applicant.email,
+        "phone": applicant.phone,
+        "initial_score": applicant.initial_score,
+        "notes": applicant.notes,
+        "phone_screen": "not completed",
+        "status": "new",
+        "secondary_score": 0,
+        "location": pdf_name,
+        "file_name": pdf_name,
+        "technical_skills": applicant.technical_skills,
+        "UID": uid
+    }
+    applicant_info["search_tokens"] = build_search_tokens(applicant_info)
+    if file_hash:
+        applicant_info["file_hash"] = file_hash
+    if fingerprint:
+        applicant_info.update(fingerprint)
+    return applicant_info
+
+
+def apply_to_job(job_id, candidate, resume_text, job):
+    """Add an existing candidate to another job's pool by scoring them against it.
+
+    Returns False if they already have a score for that job.
+    """
+    if openings.has_score(job_id, candidate["UID"]):
+        return False
+    applicant_data = cached_score_resume(resume_text, job)
+    openings.upsert_scores(job_id, [(candidate, applicant_data, scored_with(job))])
+    invalidate_resume_caches()
+    return True
+
+
+def vectorize_applicants(documents):
+    """Make freshly inserted resumes searchable; a failure here never fails the upload."""
     try:
-        resume_text = extract_pdf_text(pdf_path)
-        with open('job.txt', 'r') as f:
-            job = f.read().strip()
+        vectorize_resumes(documents)
+    except Exception as e:
+        print(f"Error vectorizing resumes: {str(e)}")
+
 
-        with open('uid_count.txt', 'r') as f:
-            uid = int(f.read().strip())
+def process_pdf(pdf_path, job_id=None):
+    """Score one resume against a job (the default job when `job_id` is None) and store it."""
+    try:
+        target_job = openings.get_job(job_id)
+        job_id = str(target_job["_id"])
+        job = target_job["job_description"].strip()
+
+        file_hash, resume_text = extract_resume(pdf_path)
+        text_store.store_resume_texts([(file_hash, resume_text)])
+
+        # Resumes we already have are only scored against this job if they are new to it
+        fingerprint = dedup.fingerprint_fields(resume_text)
+        duplicate = dedup.find_duplicate(file_hash, int(fingerprint["simhash"], 16), resume_text)
+        if duplicate:
+            print(f"Duplicate of existing applicant UID {duplicate['UID']} ({duplicate.get('name')}), skipping")
+            apply_to_job(job_id, duplicate, resume_text, job)
+            return True
 
         print("Processing pdf...")
+        applicant_data = cached_score_resume(resume_text, job)
 
-        system_prompt = f"""
-        You are part of a HR recruiting team whose job is to extract information from resumes and give an initial score to applicants based on just their resumes.
-        
-        This is the description of the job that you should use to grade the applicants:
-        {job}
-        
-        The Education section should be filled out in the following format: 
-        "<Major> - <University>"
-        
-        Scoring Rubric:
-        - 2 points for relevant work experience that directly aligns with the position's requirements, demonstrating progressive responsibility and quantifiable achievements
-        - 2 points for education and certifications that match or exceed the role's prerequisites
-        - 2 points for technical skills and competencies specifically mentioned in the job description
-        - 1.5 points for clear, professional formatting with no errors, consistent styling, and easy readability
-        - 1.5 points for compelling accomplishment statements that use strong action verbs and include measurable results or impacts
-        - 1 point for additional relevant elements like volunteer work, leadership roles, or professional memberships
-        
-        Total score will always be out of 10 points.
-
-        Additionally, summarize and add notes of anything that can help the recruiter make a decision about the applicant.
-        """
-
-        user_prompt = f"""
-        Extract and score this resume:
-        {resume_text}
-        """
-
-        response = gemini_model.generate_content(
-            contents=[{"role": "user", "parts": [system_prompt, user_prompt]}],
-            generation_config={
-                "response_mime_type": "application/json",
-                "response_schema": {
-                    "type": "object",
-                    "properties": {
-                        "name": {"type": "string"},
-                        "graduation_year": {"type": "integer"},
-                        "years_of_experience": {"type": "integer"},
-                        "education": {"type": "string"},
-                        "gpa": {"type": "number"},
-                        "email": {"type": "string"},
-                        "phone": {"type": "string"},
-                        "initial_score": {"type": "number"},
-                        "notes": {"type": "string"},
-                        "technical_skills": {"type": "string"}
-                    },
-                    "required": list(Result.__annotations__.keys())
-                }
-            }
-        )
-
-        # Parse JSON manually since we don't have a native model
-        applicant_data = json.loads(response.text.strip())
-        applicant = type('obj', (object,), applicant_data)
-
-        pdf_name = save_pdf(pdf_path, "resumes", f"{applicant.name}.pdf")
-
-        uri = os.getenv("DATABASE_URL")
-        mongo = MongoClient(uri)
-        db = mongo['user_data']
-        collection = db['data']
-
-        applicant_info = {
-            "name": applicant.name,
-            "graduation_year": applicant.graduation_year,
-            "education": applicant.education,
-            "yoe": applicant.years_of_experience,
-            "gpa": applicant.gpa,
-            "email": applicant.email,
-            "phone": applicant.phone,
-            "initial_score": applicant.initial_score,
-            "notes": applicant.notes,
-            "phone_screen": "not completed",
-            "status": "new",
-            "secondary_score": 0,
-            "location": pdf_name,
-            "file_name": pdf_name,
-            "technical_skills": applicant.technical_skills,
-            "UID": uid
-        }
+        pdf_name = save_pdf(pdf_path, "resumes", f"{applicant_data['name']}.pdf")
+
+        applicant_info = build_applicant_info(applicant_data, pdf_name, allocator.allocate(), file_hash, fingerprint)
 
         print(applicant_info)
         print("Inserting applicant into db...")
-        collection.insert_one(applicant_info)
-
-        with open('uid_count.txt', 'w') as f:
-            f.write(str(uid + 1))
+        database.get_resumes_collection().insert_one(applicant_info)
+        openings.upsert_scores(job_id, [(applicant_info, applicant_data, scored_with(job))])
+        invalidate_resume_caches()
+        vectorize_applicants([applicant_info])
 
         return True
 
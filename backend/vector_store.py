@@ -0,0 +1,310 @@
+import json
+import os
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+import numpy as np
+from dotenv import load_dotenv
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+load_dotenv()
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "pinecone")
+LOCAL_INDEX_DIR = os.getenv("LOCAL_VECTOR_DIR", os.path.join("vector_index"))
+PINECONE_INDEX_NAME = "hoyahacks"
+DIMENSION = 384  # Match 'all-MiniLM-L6-v2' embedding size
+# Appended vectors are folded into vectors.npy once the log reaches this many rows
+# (or a quarter of the compacted rows, whichever is larger)
+LOCAL_COMPACT_ROWS = int(os.getenv("LOCAL_VECTOR_COMPACT_ROWS", 1000))
+ROW_BYTES = DIMENSION * np.dtype(np.float32).itemsize
+
+
+class VectorStore(ABC):
+    """Minimal interface shared by the Pinecone and local backends.
+
+    `query` returns {"matches": [{"id", "score", "metadata"}, ...]} like Pinecone.
+    """
+
+    @abstractmethod
+    def upsert(self, vectors, namespace):
+        pass
+
+    @abstractmethod
+    def query(self, vector, top_k, namespace, include_metadata=True):
+        pass
+
+    @abstractmethod
+    def delete_all(self, namespace):
+        pass
+
+    @abstractmethod
+    def namespaces(self):
+        pass
+
+
+class PineconeVectorStore(VectorStore):
+    def __init__(self, index_name=PINECONE_INDEX_NAME):
+        from pinecone import Pinecone, ServerlessSpec
+
+        pc = Pinecone(api_key=os.getenv("PINECONE_API_KEY"))
+
+        # Connect to existing index or create one if needed
+        if index_name not in pc.list_indexes().names():
+            pc.create_index(
+                name=index_name,
+                dimension=DIMENSION,
+                metric='cosine',
+                spec=ServerlessSpec(cloud='aws', region='us-east-1')
+            )
+        self.index = pc.Index(index_name)
+
+    def upsert(self, vectors, namespace):
+        self.index.upsert(vectors=vectors, namespace=namespace)
+
+    def query(self, vector, top_k, namespace, include_metadata=True):
+        return self.index.query(vector=vector, top_k=top_k, include_metadata=include_metadata, namespace=namespace)
+
+    def delete_all(self, namespace):
+        self.index.delete(delete_all=True, namespace=namespace)
+
+    def namespaces(self):
+        return list(self.index.describe_index_stats().get("namespaces", {}))
+
+
+@contextmanager
+def file_lock(path):
+    """Exclusive lock shared by every process writing the same namespace."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'a+b') as f:
+        if fcntl:
+            fcntl.flock(f, fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def file_stamp(path):
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+class LocalNamespace:
+    """Unit-normalised float32 vectors plus ids and metadata for one namespace.
+
+    vectors.npy/metadata.json hold a compacted snapshot (memory-mapped); upserts are
+    appended to log_vectors.bin/log.jsonl under a file lock, so a write costs only
+    the new rows. A later row for the same id replaces the earlier one. Every read
+    and write first picks up what other processes appended or compacted.
+    """
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.vectors_path = os.path.join(directory, "vectors.npy")
+        self.meta_path = os.path.join(directory, "metadata.json")
+        self.log_vectors_path = os.path.join(directory, "log_vectors.bin")
+        self.log_meta_path = os.path.join(directory, "log.jsonl")
+        self.lock_path = os.path.join(directory, ".lock")
+        self.load()
+
+    def files(self):
+        return (self.vectors_path, self.meta_path, self.log_vectors_path, self.log_meta_path)
+
+    def load(self):
+        """Read the snapshot and the whole log from scratch."""
+        self.base_stamp = file_stamp(self.vectors_path)
+        self.matrix = np.zeros((0, DIMENSION), dtype=np.float32)
+        self.ids = []
+        self.metadata = []
+        if self.base_stamp and os.path.exists(self.meta_path):
+            # Memory-mapped: pages are loaded on demand and shared between processes
+            matrix = np.load(self.vectors_path, mmap_mode='r')
+            with open(self.meta_path, 'r') as f:
+                saved = json.load(f)
+            if len(saved["ids"]) == len(matrix):
+                self.matrix = matrix
+                self.ids = saved["ids"]
+                self.metadata = saved["metadata"]
+            else:
+                # Caught between the two renames of a compaction; the next read retries
+                self.base_stamp = None
+        self.log_matrix = np.zeros((0, DIMENSION), dtype=np.float32)
+        self.log_offset = 0
+        self.positions = {}
+        self.index_rows(0)
+        if not self.read_log():
+            self.base_stamp = None
+
+    def index_rows(self, start):
+        for row in range(start, len(self.ids)):
+            self.positions[self.ids[row]] = row
+        self.live = np.zeros(len(self.ids), dtype=bool)
+        self.live[list(self.positions.values())] = True
+
+    def read_log(self):
+        """Append log entries written since the last read; False if the log is inconsistent."""
+        try:
+            with open(self.log_meta_path, 'rb') as f:
+                f.seek(self.log_offset)
+                data = f.read()
+        except FileNotFoundError:
+            return self.log_offset == 0
+        # A writer may be part-way through a line; leave it for the next read
+        data = data[:data.rfind(b"\n") + 1]
+        if not data:
+            return True
+        entries = [json.loads(line) for line in data.splitlines()]
+
+        start = len(self.log_matrix)
+        with open(self.log_vectors_path, 'rb') as f:
+            f.seek(start * ROW_BYTES)
+            raw = f.read(len(entries) * ROW_BYTES)
+        if len(raw) < len(entries) * ROW_BYTES:
+            return False
+        rows = np.frombuffer(raw, dtype=np.float32).reshape(len(entries), DIMENSION)
+
+        first = len(self.ids)
+        self.log_matrix = np.vstack([self.log_matrix, rows])
+        self.ids.extend(entry["id"] for entry in entries)
+        self.metadata.extend(entry.get("metadata", {}) for entry in entries)
+        self.log_offset += len(data)
+        self.index_rows(first)
+        return True
+
+    def refresh(self):
+        """Catch up with other processes: reload after a compaction, else read new log entries."""
+        log_size = os.path.getsize(self.log_meta_path) if os.path.exists(self.log_meta_path) else 0
+        if file_stamp(self.vectors_path) != self.base_stamp or log_size < self.log_offset or not self.read_log():
+            self.load()
+
+    def upsert(self, vectors):
+        values = np.asarray([vector["values"] for vector in vectors], dtype=np.float32)
+        norms = np.linalg.norm(values, axis=1, keepdims=True)
+        values = values / np.where(norms == 0, 1, norms)
+        lines = "".join(json.dumps({"id": vector["id"], "metadata": vector.get("metadata", {})}) + "\n" for vector in vectors)
+
+        with file_lock(self.lock_path):
+            self.refresh()
+            # Drop anything a crashed writer left past the last complete entry
+            for path, size in ((self.log_vectors_path, len(self.log_matrix) * ROW_BYTES), (self.log_meta_path, self.log_offset)):
+                with open(path, 'ab') as f:
+                    f.truncate(size)
+            # Vectors first: a log line is only ever read once its row exists
+            with open(self.log_vectors_path, 'ab') as f:
+                f.write(values.tobytes())
+            with open(self.log_meta_path, 'ab') as f:
+                f.write(lines.encode())
+            self.read_log()
+            if len(self.log_matrix) >= max(LOCAL_COMPACT_ROWS, len(self.matrix) // 4):
+                self.compact()
+
+    def compact(self):
+        """Rewrite the snapshot with only the current row per id and empty the log (caller holds the lock)."""
+        rows = list(self.positions.values())
+        base_rows = [row for row in rows if row < len(self.matrix)]
+        log_rows = [row - len(self.matrix) for row in rows if row >= len(self.matrix)]
+        matrix = np.vstack([np.asarray(self.matrix[base_rows], dtype=np.float32), self.log_matrix[log_rows]])
+
+        tmp_vectors = self.vectors_path + ".tmp.npy"
+        tmp_meta = self.meta_path + ".tmp"
+        np.save(tmp_vectors, matrix)
+        with open(tmp_meta, 'w') as f:
+            json.dump({"ids": [self.ids[row] for row in rows], "metadata": [self.metadata[row] for row in rows]}, f)
+        os.replace(tmp_vectors, self.vectors_path)
+        os.replace(tmp_meta, self.meta_path)
+        for path in (self.log_vectors_path, self.log_meta_path):
+            with open(path, 'wb'):
+                pass
+        self.load()
+
+    def query(self, vector, top_k):
+        self.refresh()
+        if not self.positions:
+            return []
+        query = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = np.concatenate([self.matrix @ query, self.log_matrix @ query])
+        # Rows replaced by a later upsert of the same id never match
+        scores[~self.live] = -np.inf
+        k = min(top_k, len(self.positions))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(int(i), float(scores[i])) for i in top]
+
+    def delete(self):
+        with file_lock(self.lock_path):
+            for path in self.files():
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+class LocalVectorStore(VectorStore):
+    """In-process cosine index over NumPy matrices, persisted under `directory`."""
+
+    def __init__(self, directory=LOCAL_INDEX_DIR):
+        self.directory = directory
+        self.lock = threading.RLock()
+        self.loaded = {}
+
+    def namespace(self, name):
+        with self.lock:
+            if name not in self.loaded:
+                self.loaded[name] = LocalNamespace(os.path.join(self.directory, name))
+            return self.loaded[name]
+
+    def upsert(self, vectors, namespace):
+        if not vectors:
+            return
+        with self.lock:
+            self.namespace(namespace).upsert(vectors)
+
+    def query(self, vector, top_k, namespace, include_metadata=True):
+        with self.lock:
+            store = self.namespace(namespace)
+            hits = store.query(vector, top_k)
+            matches = []
+            for position, score in hits:
+                match = {"id": store.ids[position], "score": score}
+                if include_metadata:
+                    match["metadata"] = store.metadata[position]
+                matches.append(match)
+        return {"matches": matches}
+
+    def delete_all(self, namespace):
+        with self.lock:
+            self.namespace(namespace).delete()
+            self.loaded.pop(namespace, None)
+
+    def namespaces(self):
+        if not os.path.isdir(self.directory):
+            return []
+        return [
+            name for name in os.listdir(self.directory)
+            if any(os.path.exists(os.path.join(self.directory, name, file)) for file in ("vectors.npy", "log.jsonl"))
+        ]
+
+
+def create_vector_store(backend=VECTOR_BACKEND):
+    if backend == "local":
+        return LocalVectorStore()
+    if backend == "pinecone":
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown vector backend: {backend}")
@@ -0,0 +1,38 @@
+import os
+import threading
+import time
+from dotenv import load_dotenv
+
+load_dotenv()
+
+WARM_UP_ON_START = os.getenv("WARM_UP_ON_START", "false").lower() == "true"
+
+
+def warm_up():
+    """Create the heavy resources ahead of the first request that needs them."""
+    import database
+    import embeddings
+    import gemini
+    import pinecone_utils
+
+    steps = [
+        ("mongo", lambda: database.get_client().admin.command('ping')),
+        ("gemini", gemini.get_model),
+        ("embedding model", embeddings.get_embedding_model),
+        ("embedding cache", embeddings.get_embedding_cache),
+        ("vector store", pinecone_utils.get_vector_store),
+    ]
+    for name, step in steps:
+        started = time.perf_counter()
+        try:
+            step()
+            print(f"Warmed up {name} in {time.perf_counter() - started:.2f}s")
+        except Exception as e:
+            print(f"Warm-up of {name} failed: {e}")
+
+
+def start_background_warm_up():
+    """Warm up on a daemon thread so the server starts accepting requests immediately."""
+    thread = threading.Thread(target=warm_up, name="warm-up", daemon=True)
+    thread.start()
+    return thread
@@ -1,6 +1,6 @@
 'use client'
 
-import { Fragment, useState, useEffect } from 'react'
+import { Fragment, useState, useEffect, useRef } from 'react'
 import Image from 'next/image'
 import { Menu, Transition } from '@headlessui/react'
 import {
@@ -54,6 +54,8 @@ export default function Dashboard() {
   const [searchQuery, setSearchQuery] = useState('')
   const [noResults, setNoResults] = useState(false)
   const [showSuperSearch, setShowSuperSearch] = useState(false)
+  // Keyset cursor for each page number reached so far; jumping past them falls back to `page`
+  const pageCursors = useRef({})
 
   useEffect(() => {
     fetchResumes(currentPage)
@@ -80,8 +82,9 @@ export default function Dashboard() {
       setLoading(true)
       setNoResults(false)
       
+      const cursor = pageCursors.current[page]
       const queryParams = new URLSearchParams({
-        page: page,
+        ...(cursor && !searchQuery ? { cursor: cursor } : { page: page }),
         per_page: 5,
         ...Object.fromEntries(Object.entries(filters).filter(([_, v]) => v !== '')),
         ...(searchQuery && { search: searchQuery })
@@ -94,6 +97,9 @@ export default function Dashboard() {
       const data = await response.json()
       setResumes(data.resumes)
       setTotalPages(data.total_pages)
+      if (!searchQuery && data.next_cursor) {
+        pageCursors.current[page + 1] = data.next_cursor
+      }
       
       if (searchQuery && data.total === 0) {
         setNoResults(true)
@@ -110,11 +116,13 @@ export default function Dashboard() {
   }
 
   const handleFilterChange = (newFilters) => {
+    pageCursors.current = {}
     setFilters(newFilters)
     setCurrentPage(1)
   }
 
   const handleSearch = (query) => {
+    pageCursors.current = {}
     setSearchQuery(query)
     setCurrentPage(1)
   }